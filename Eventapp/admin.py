@@ -1,7 +1,22 @@
 from django.contrib import admin
 from . import models
 
-admin.site.register(models.Event)
+
+@admin.register(models.Event)
+class EventAdmin(admin.ModelAdmin):
+    readonly_fields = ['approved_subscribers_count', 'rating_count', 'rating_sum', 'image_variants']
+    actions = ['rebuild_subscriber_counts', 'rebuild_rating_aggregates']
+
+    @admin.action(description="بازسازی تعداد اعضای تایید شده")
+    def rebuild_subscriber_counts(self, request, queryset):
+        updated = queryset.rebuild_subscriber_counts()
+        self.message_user(request, f"{updated} رویداد به‌روزرسانی شد.")
+
+    @admin.action(description="بازسازی آمار امتیاز نظرها")
+    def rebuild_rating_aggregates(self, request, queryset):
+        updated = queryset.rebuild_rating_aggregates()
+        self.message_user(request, f"{updated} رویداد به‌روزرسانی شد.")
+
+
 admin.site.register(models.EventFeature)
 admin.site.register(models.UserEventRole)
-
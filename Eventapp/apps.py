@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class EventappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Eventapp'
-    verbose_name = 'جداول رویدادها'
\ No newline at end of file
+    verbose_name = 'جداول رویدادها'
+
+    def ready(self):
+        from . import signals  # noqa: F401
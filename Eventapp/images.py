@@ -0,0 +1,298 @@
+"""
+Upload pipeline for event images.
+
+``prepare_upload`` runs in the request. It decodes the upload once with
+Pillow and rejects anything that is not a JPEG, PNG or WebP picture, or that
+has more than ``IMAGE_MAX_PIXELS`` pixels (checked from the header, before
+decoding). It applies the EXIF orientation and re-encodes the picture
+without metadata (EXIF with GPS position, ICC profile, comments).
+``store_upload`` stores the result as ``event_images/<sha256>.<ext>``. The
+name is the SHA-256 of the uploaded bytes, which ``HashingUploadHandler``
+computes while it streams the upload to disk. When an event already has the
+same picture, its file and variants are reused and nothing is decoded.
+
+The thumbnails are made off the request path. Whenever ``Event.image``
+changes, ``Event.save`` clears ``image_variants`` and the ``post_save``
+signal calls ``schedule_variants``. Once the transaction commits, that
+function queues the event id and the stored name for a small thread pool.
+Only the name waits in the queue, not the decoded image, and at most
+``IMAGE_VARIANT_WORKERS`` images are decoded at once. A worker reads the
+stored file back. For every width in ``IMAGE_VARIANT_WIDTHS`` below the
+original width, it scales the image and encodes it as WebP and JPEG. The
+files are listed in ``Event.image_variants``. Pillow releases the GIL while
+it resizes and encodes, so the pool does not hold up the request threads.
+The ``generate_image_variants`` command creates variants that are missing,
+for example for older events or when a worker died with tasks still queued.
+"""
+import hashlib
+import io
+import logging
+import os
+import posixpath
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from YekiKamePrj import response_cache
+from YekiKamePrj.metrics import IMAGE_VARIANT_TASKS
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+# فرمت‌های مجاز تصویر اصلی: (پسوند، تنظیمات ذخیره دوباره)
+FORMATS = {
+    'JPEG': ('jpg', {'quality': 90, 'optimize': True}),
+    'PNG': ('png', {'optimize': True}),
+    'WEBP': ('webp', {'quality': 90}),
+}
+# فرمت‌های نسخه‌های کوچک: (فرمت Pillow، پسوند، تنظیمات)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+IMAGES_DIR = 'event_images'
+VARIANTS_DIR = 'event_images/variants'
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class PreparedImage:
+    def __init__(self, content, extension):
+        self.content = content
+        self.extension = extension
+
+
+class StoredImage:
+    def __init__(self, name, created=False, variants=None):
+        self.name = name
+        # آیا فایل در همین درخواست ذخیره شده است (و در صورت خطا باید حذف شود)
+        self.created = created
+        # نسخه‌های کوچک رویدادی که همین تصویر را دارد؛ خالی یعنی باید ساخته شوند
+        self.variants = variants or []
+
+
+def _normalize_mode(image):
+    # شفافیت palette یا tRNS در info است و همراه متادیتا حذف می‌شود، پس به RGBA تبدیل می‌شود
+    if image.mode in ('LA', 'PA', 'RGBa', 'La') or 'transparency' in image.info:
+        return image.convert('RGBA')
+    if image.mode in ('RGB', 'RGBA', 'L'):
+        return image
+    return image.convert('RGB')
+
+
+def decode(file):
+    """Validate and decode ``file``; return the upright image without metadata and its format."""
+    try:
+        with Image.open(file) as original:
+            if original.format not in FORMATS:
+                raise InvalidImage("Only JPEG, PNG and WebP images are accepted.")
+            if original.width * original.height > settings.IMAGE_MAX_PIXELS:
+                raise InvalidImage("The image dimensions are too large.")
+            image_format = original.format
+            # exif_transpose یک کپی decode شده برمی‌گرداند و orientation را اعمال می‌کند
+            image = ImageOps.exif_transpose(original)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise InvalidImage("The file is not a valid image.") from e
+
+    image = _normalize_mode(image)
+    # PNG و WebP در صورت نبودن تنظیمات، ICC و EXIF را از info برمی‌دارند
+    image.info = {}
+    return image, image_format
+
+
+def prepare_upload(upload):
+    """Validate, decode and re-encode ``upload`` without metadata."""
+    image, image_format = decode(upload)
+    extension, options = FORMATS[image_format]
+    if image_format == 'JPEG' and image.mode == 'RGBA':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return PreparedImage(ContentFile(buffer.getvalue()), extension)
+
+
+def content_hash(upload):
+    # HashingUploadHandler هش را هنگام دریافت حساب کرده است؛ برای فایل‌های دیگر اینجا خوانده می‌شود
+    digest = getattr(upload, 'sha256', None)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        for chunk in upload.chunks():
+            sha256.update(chunk)
+        upload.seek(0)
+        digest = sha256.hexdigest()
+    return digest
+
+
+def save_once(name, content):
+    """
+    Store ``content`` as ``name`` unless that file exists; return whether this call created it.
+
+    Names here are derived from the content, so an existing file already has
+    the same bytes. ``Storage.save`` would pick another name instead.
+    """
+    if isinstance(default_storage, FileSystemStorage):
+        path = default_storage.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # اول در فایل موقت نوشته می‌شود تا فایل نیمه‌کاره هیچ‌وقت با نام اصلی دیده نشود؛
+        # link اگر فایل وجود داشته باشد به صورت اتمیک خطا می‌دهد
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            os.chmod(temporary, default_storage.file_permissions_mode or 0o644)
+            try:
+                os.link(temporary, path)
+            except FileExistsError:
+                return False
+            return True
+        finally:
+            os.unlink(temporary)
+
+    if default_storage.exists(name):
+        return False
+    saved = default_storage.save(name, content)
+    if saved != name:
+        # درخواست دیگری همزمان همین فایل را ذخیره کرده است
+        default_storage.delete(saved)
+        return False
+    return True
+
+
+def store_upload(upload):
+    """Store ``upload`` under a name derived from its content (see the module docstring)."""
+    if upload.size > settings.UPLOAD_MAX_BYTES:
+        raise InvalidImage("The image file is too large.")
+    digest = content_hash(upload)
+    names = [f'{IMAGES_DIR}/{digest}.{extension}' for extension, _ in FORMATS.values()]
+    existing = (
+        Event.objects.filter(image__in=names).exclude(image_variants=[])
+        .values_list('image', 'image_variants').first()
+    )
+    if existing:
+        return StoredImage(existing[0], variants=existing[1])
+
+    prepared = prepare_upload(upload)
+    name = f'{IMAGES_DIR}/{digest}.{prepared.extension}'
+    # اگر فایل وجود داشته باشد (درخواست همزمان یا رویدادی که حذف شده) دوباره نوشته نمی‌شود
+    return StoredImage(name, created=save_once(name, prepared.content))
+
+
+def _flatten(image):
+    """JPEG has no alpha channel; transparent areas become white."""
+    if image.mode != 'RGBA':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def generate_variants(event_id, name):
+    """Store the variants of the image file ``name`` and record them on the event."""
+    with default_storage.open(stored_name(name)) as file:
+        image, _ = decode(file)
+    stem = posixpath.splitext(posixpath.basename(stored_name(name)))[0]
+    variants = []
+    source = image
+    # از بزرگ به کوچک؛ هر نسخه از نسخه بزرگ‌تر قبلی ساخته می‌شود که سریع‌تر از کوچک کردن تصویر اصلی است
+    for width in sorted(settings.IMAGE_VARIANT_WIDTHS, reverse=True):
+        if width >= image.width:
+            continue
+        height = max(1, round(image.height * width / image.width))
+        source = source.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for variant_format, (pillow_format, extension, options) in VARIANT_FORMATS.items():
+            buffer = io.BytesIO()
+            stored = f'{VARIANTS_DIR}/{stem}_{width}.{extension}'
+            # نام تصویر اصلی یکتاست، پس فایل موجود همین نسخه است
+            if not default_storage.exists(stored):
+                picture = _flatten(source) if pillow_format == 'JPEG' else source
+                picture.save(buffer, pillow_format, **options)
+                save_once(stored, ContentFile(buffer.getvalue()))
+            variants.append({'width': width, 'height': height, 'format': variant_format, 'name': stored})
+    variants.sort(key=lambda variant: (variant['format'], variant['width']))
+    # اگر تصویر رویداد در این فاصله عوض شده باشد نسخه‌های قدیمی ثبت نمی‌شوند
+    if Event.objects.filter(pk=event_id, image=name).update(image_variants=variants):
+        # update سیگنال post_save را نمی‌فرستد
+        response_cache.invalidate('event')
+    return variants
+
+
+class VariantWorker:
+    def __init__(self, workers):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variants')
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _run(self, event_id, name):
+        try:
+            generate_variants(event_id, name)
+        except Exception:
+            IMAGE_VARIANT_TASKS.labels('failed').inc()
+            logger.exception("Creating the image variants of event %s failed", event_id)
+        else:
+            IMAGE_VARIANT_TASKS.labels('done').inc()
+        finally:
+            # هر thread اتصال دیتابیس خودش را دارد
+            connection.close()
+
+    def submit(self, event_id, name):
+        future = self.executor.submit(self._run, event_id, name)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def flush(self, timeout=None):
+        """Wait for the tasks submitted so far (used by tests)."""
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.result(timeout)
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = VariantWorker(settings.IMAGE_VARIANT_WORKERS)
+    return _worker
+
+
+def schedule_variants(event_id, name):
+    """Create the variants in the background once the current transaction commits."""
+    transaction.on_commit(lambda: get_worker().submit(event_id, name))
+
+
+def stored_name(value):
+    """The storage name of an ``Event.image`` value; older events stored the URL."""
+    if value.startswith(settings.MEDIA_URL):
+        return value[len(settings.MEDIA_URL):]
+    return value
+
+
+def image_url(value):
+    if not value:
+        return None
+    # مقدارهای قدیمی (URL کامل یا مسیری که با MEDIA_URL شروع می‌شود) همان‌طور برگردانده می‌شوند
+    if value.startswith('/') or '://' in value:
+        return value
+    return default_storage.url(value)
@@ -0,0 +1,115 @@
+"""
+Request-scoped batch loaders for the Event GraphQL relations.
+
+graphql-core executes list items one by one, so a loader cannot wait for
+sibling rows the way an async DataLoader does. Instead ``DataLoaderMiddleware``
+primes the loaders with every model instance a list resolver returns, and the
+first ``load()`` for a field fetches the whole primed batch in one query.
+"""
+from django.db.models import QuerySet
+
+from userapp.models import User
+from .models import Event, UserEventRole
+
+
+class DataLoader:
+    def __init__(self):
+        self._cache = {}
+        self._pending = set()
+
+    def batch_load(self, keys):
+        """Return a dict mapping each of ``keys`` to its value."""
+        raise NotImplementedError
+
+    def prime(self, keys):
+        self._pending.update(key for key in keys if key not in self._cache)
+
+    def load(self, key):
+        if key not in self._cache:
+            keys = self._pending | {key}
+            self._pending = set()
+            results = self.batch_load(list(keys))
+            for batch_key in keys:
+                self._cache[batch_key] = results.get(batch_key)
+        return self._cache[key]
+
+
+class UserLoader(DataLoader):
+    def batch_load(self, keys):
+        return User.objects.in_bulk(keys)
+
+
+class EventLoader(DataLoader):
+    def batch_load(self, keys):
+        return Event.objects.in_bulk(keys)
+
+
+class EventRoleLoader(DataLoader):
+    """Loads ``UserEventRole.role`` by ``(event_id, phone)``."""
+
+    def __init__(self):
+        super().__init__()
+        self._pending_events = set()
+
+    def prime_events(self, event_ids):
+        # phone تا زمان resolve مشخص نیست، پس فقط شناسه رویدادها نگه داشته می‌شود
+        self._pending_events.update(event_ids)
+
+    def load(self, key):
+        event_id, phone = key
+        self.prime((pending_event_id, phone) for pending_event_id in self._pending_events)
+        self._pending_events = set()
+        return super().load(key)
+
+    def batch_load(self, keys):
+        event_ids_by_phone = {}
+        for event_id, phone in keys:
+            event_ids_by_phone.setdefault(phone, []).append(event_id)
+        results = {}
+        for phone, event_ids in event_ids_by_phone.items():
+            roles = UserEventRole.objects.filter(
+                event_id__in=event_ids, user__phone=phone
+            ).values_list('event_id', 'role')
+            for event_id, role in roles:
+                results[(event_id, phone)] = role
+        return results
+
+
+class Loaders:
+    def __init__(self):
+        self.users = UserLoader()
+        self.events = EventLoader()
+        self.event_roles = EventRoleLoader()
+
+    def prime(self, objects):
+        for obj in objects:
+            if isinstance(obj, Event):
+                self.users.prime([obj.event_owner_id])
+                self.event_roles.prime_events([obj.id])
+            elif isinstance(obj, UserEventRole):
+                self.users.prime([obj.user_id])
+                self.events.prime([obj.event_id])
+
+
+def get_loaders(info):
+    context = info.context
+    if context is None:
+        # بدون context (مثلا schema.execute بدون context_value) batching ممکن نیست
+        return Loaders()
+    loaders = getattr(context, 'loaders', None)
+    if loaders is None:
+        loaders = Loaders()
+        context.loaders = loaders
+    return loaders
+
+
+class DataLoaderMiddleware:
+    """Graphene middleware that primes the request loaders with list results."""
+
+    def resolve(self, next, root, info, **args):
+        result = next(root, info, **args)
+        if isinstance(result, QuerySet):
+            result = list(result)
+        if isinstance(result, list) and result:
+            get_loaders(info).prime(result)
+        return result
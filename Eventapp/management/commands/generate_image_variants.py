@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from Eventapp.images import InvalidImage, generate_variants, stored_name
+from Eventapp.models import Event
+
+
+class Command(BaseCommand):
+    help = "Create the missing image variants of events (older events, or tasks lost when a worker stopped)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', type=int, help="Only these events (default: all).")
+        parser.add_argument('--all', action='store_true', help="Also rebuild the variant list of events that have one; existing files are kept.")
+
+    def handle(self, *args, **options):
+        events = Event.objects.exclude(Q(image__isnull=True) | Q(image=''))
+        if options['event_ids']:
+            events = events.filter(id__in=options['event_ids'])
+        if not options['all']:
+            events = events.filter(image_variants=[])
+
+        done = failed = 0
+        for event_id, value in events.values_list('id', 'image').iterator():
+            name = stored_name(value)
+            if name != value:
+                # رویدادهای قدیمی URL تصویر را ذخیره کرده بودند
+                Event.objects.filter(pk=event_id, image=value).update(image=name)
+            try:
+                generate_variants(event_id, name)
+            except (InvalidImage, OSError) as e:
+                failed += 1
+                self.stderr.write(f"Event {event_id}: {name}: {e}")
+                continue
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f"Created image variants for {done} events ({failed} failed)."))
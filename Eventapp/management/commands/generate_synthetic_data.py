@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Eventapp.synthetic_data import BATCH_SIZE, PASSWORD, generate
+
+
+class Command(BaseCommand):
+    help = "Bulk-create realistic synthetic users, events, reviews, comments and tickets for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--events', type=int, default=200000)
+        parser.add_argument('--tickets', type=int, help="Default: one ticket per 20 users.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--force', action='store_true', help="Run even when DEBUG is off.")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Refusing to add synthetic data with DEBUG off; pass --force if this is intended.")
+        if options['users'] < 2:
+            raise CommandError("At least 2 users are needed.")
+
+        tickets = options['tickets']
+        if tickets is None:
+            tickets = options['users'] // 20
+        counts = generate(
+            options['users'], options['events'], tickets, seed=options['seed'], batch_size=options['batch_size'],
+            progress=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        summary = ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary}. Every user's password is '{PASSWORD}'."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from Eventapp.models import Event
+
+
+class Command(BaseCommand):
+    help = "Recompute the review rating count, sum and histogram of events from their Review rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', type=int, help="Only rebuild these events (default: all).")
+
+    def handle(self, *args, **options):
+        events = Event.objects.all()
+        if options['event_ids']:
+            events = events.filter(id__in=options['event_ids'])
+        updated = events.rebuild_rating_aggregates()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating aggregates for {updated} events."))
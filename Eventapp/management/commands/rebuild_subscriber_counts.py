@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from Eventapp.models import Event
+
+
+class Command(BaseCommand):
+    help = "Recompute Event.approved_subscribers_count from the approved UserEventRole rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', type=int, help="Only rebuild these events (default: all).")
+
+    def handle(self, *args, **options):
+        events = Event.objects.all()
+        if options['event_ids']:
+            events = events.filter(id__in=options['event_ids'])
+        updated = events.rebuild_subscriber_counts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt subscriber counts for {updated} events."))
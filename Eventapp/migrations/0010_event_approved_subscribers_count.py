@@ -0,0 +1,33 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:47
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_approved_subscribers_count(apps, schema_editor):
+    Event = apps.get_model('Eventapp', 'Event')
+    UserEventRole = apps.get_model('Eventapp', 'UserEventRole')
+    approved_count = UserEventRole.objects.filter(
+        event=OuterRef('pk'),
+        is_approved=True
+    ).exclude(
+        user=OuterRef('event_owner')
+    ).values('event').annotate(count=Count('id')).values('count')
+    Event.objects.update(approved_subscribers_count=Coalesce(Subquery(approved_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Eventapp', '0009_usereventrole_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='approved_subscribers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_approved_subscribers_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:52
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# وزن‌ها: عنوان (A)، درباره رویداد (B)، توضیحات کامل (C)
+CREATE_SEARCH_SQL = '''
+CREATE OR REPLACE FUNCTION eventapp_event_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.about_event, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.full_description, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER eventapp_event_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, about_event, full_description ON "Eventapp_event"
+    FOR EACH ROW EXECUTE FUNCTION eventapp_event_search_vector_update();
+
+UPDATE "Eventapp_event" SET title = title;
+
+CREATE INDEX eventapp_event_search_vector_gin ON "Eventapp_event" USING GIN (search_vector);
+CREATE INDEX eventapp_event_title_trgm_gin ON "Eventapp_event" USING GIN (title gin_trgm_ops);
+'''
+
+DROP_SEARCH_SQL = '''
+DROP INDEX IF EXISTS eventapp_event_title_trgm_gin;
+DROP INDEX IF EXISTS eventapp_event_search_vector_gin;
+DROP TRIGGER IF EXISTS eventapp_event_search_vector_trigger ON "Eventapp_event";
+DROP FUNCTION IF EXISTS eventapp_event_search_vector_update();
+'''
+
+
+def create_search_objects(apps, schema_editor):
+    # trigger و ایندکس‌های GIN فقط روی PostgreSQL ساخته می‌شوند
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SEARCH_SQL)
+
+
+def drop_search_objects(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SEARCH_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Eventapp', '0010_event_approved_subscribers_count'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='event',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_objects, drop_search_objects),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:53
+
+import Eventapp.models
+from django.db import migrations, models
+from django.db.models.functions import Random
+
+
+def randomize_existing_events(apps, schema_editor):
+    # AddField مقدار پیش‌فرض را یک بار حساب می‌کند، پس برای هر سطر دوباره مقدار تصادفی می‌گذاریم
+    Event = apps.get_model('Eventapp', 'Event')
+    Event.objects.update(random_key=Random())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Eventapp', '0011_event_search'),
+        ('userapp', '0002_usersession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='random_key',
+            field=models.FloatField(default=Eventapp.models.generate_random_key, editable=False),
+        ),
+        migrations.RunPython(randomize_existing_events, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['city', 'event_category', 'random_key'], name='event_related_random_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Eventapp', '0012_event_random_key'),
+        ('userapp', '0002_usersession'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['city', '-start_date'], name='event_city_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['city', 'event_category', '-start_date'], name='event_city_category_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['city', 'neighborhood', '-start_date'], name='event_city_nbhd_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['-start_date', '-id'], name='event_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['event_owner', '-start_date'], name='event_owner_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usereventrole',
+            index=models.Index(fields=['user', 'role', 'is_approved'], name='role_user_role_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usereventrole',
+            index=models.Index(condition=models.Q(('is_approved__isnull', True)), fields=['event', 'created_at'], name='role_pending_event_idx'),
+        ),
+    ]
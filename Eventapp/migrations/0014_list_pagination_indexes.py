@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Eventapp', '0013_event_filter_indexes'),
+        ('userapp', '0002_usersession'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['review', '-created_at', '-id'], name='comment_review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['event', '-created_at', '-id'], name='review_event_created_idx'),
+        ),
+    ]
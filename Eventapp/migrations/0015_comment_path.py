@@ -0,0 +1,39 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:40
+
+from django.db import migrations, models
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+
+def populate_comment_paths(apps, schema_editor):
+    Comment = apps.get_model('Eventapp', 'Comment')
+    # همان comment_path_segment در models، به صورت SQL
+    segment = LPad(Cast('id', CharField(max_length=20)), 10, Value('0'))
+    Comment.objects.filter(parent_comment=None).update(path=segment)
+    parent_path = Comment.objects.filter(pk=OuterRef('parent_comment')).values('path')
+    # هر دور یک سطح دیگر از درخت پر می‌شود
+    while Comment.objects.filter(path='', parent_comment__path__gt='').update(
+        path=Concat(Subquery(parent_path), segment, output_field=CharField())
+    ):
+        pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Eventapp', '0014_list_pagination_indexes'),
+        ('userapp', '0002_usersession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_comment_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['review', 'path'], name='comment_review_path_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:43
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    Event = apps.get_model('Eventapp', 'Event')
+    Review = apps.get_model('Eventapp', 'Review')
+    reviews = Review.objects.filter(event=OuterRef('pk')).values('event')
+
+    def review_count(**filters):
+        count = reviews.filter(**filters).annotate(count=Count('id')).values('count')
+        return Coalesce(Subquery(count), 0)
+
+    rating_sum = reviews.annotate(total=Sum('rating')).values('total')
+    Event.objects.update(
+        rating_count=review_count(),
+        rating_sum=Coalesce(Subquery(rating_sum), 0.0),
+        rating_count_0=review_count(rating__lt=1),
+        rating_count_1=review_count(rating__gte=1, rating__lt=2),
+        rating_count_2=review_count(rating__gte=2, rating__lt=3),
+        rating_count_3=review_count(rating__gte=3, rating__lt=4),
+        rating_count_4=review_count(rating__gte=4, rating__lt=5),
+        rating_count_5=review_count(rating__gte=5),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Eventapp', '0015_comment_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_count_0',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_count_1',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_count_2',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_count_3',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_count_4',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_count_5',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='rating_sum',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
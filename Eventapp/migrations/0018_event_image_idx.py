@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Eventapp', '0017_event_image_variants'),
+        ('userapp', '0002_usersession'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['image'], name='event_image_idx'),
+        ),
+    ]
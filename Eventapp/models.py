@@ -1,8 +1,81 @@
+import random
+
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
 from userapp.models import User
 
 
+def generate_random_key():
+    return random.random()
+
+
+# دسته‌های هیستوگرام امتیاز؛ امتیاز اعشاری در دسته کف خود شمرده می‌شود
+RATING_BUCKETS = range(6)
+
+
+def rating_bucket_field(rating):
+    return f'rating_count_{max(0, min(int(rating), RATING_BUCKETS[-1]))}'
+
+
+RATING_FIELDS = ('rating_count', 'rating_sum', *(f'rating_count_{bucket}' for bucket in RATING_BUCKETS))
+
+
+class EventQuerySet(models.QuerySet):
+    def adjust_subscriber_count(self, user_id, delta):
+        # owner جزو approved_subscribers_count شمرده نمی‌شود
+        return self.exclude(event_owner_id=user_id).update(
+            approved_subscribers_count=F('approved_subscribers_count') + delta
+        )
+
+    def rebuild_subscriber_counts(self):
+        approved_count = UserEventRole.objects.filter(
+            event=OuterRef('pk'),
+            is_approved=True
+        ).exclude(
+            user=OuterRef('event_owner')
+        ).values('event').annotate(count=Count('id')).values('count')
+        return self.update(approved_subscribers_count=Coalesce(Subquery(approved_count), 0))
+
+    def adjust_rating(self, rating, delta):
+        return self.update(**{
+            'rating_count': F('rating_count') + delta,
+            'rating_sum': F('rating_sum') + rating * delta,
+            rating_bucket_field(rating): F(rating_bucket_field(rating)) + delta,
+        })
+
+    def rebuild_rating_aggregates(self):
+        reviews = Review.objects.filter(event=OuterRef('pk')).values('event')
+
+        def review_count(**filters):
+            count = reviews.filter(**filters).annotate(count=Count('id')).values('count')
+            return Coalesce(Subquery(count), 0)
+
+        # مثل rating_bucket_field، امتیازهای خارج از بازه در دسته اول یا آخر شمرده می‌شوند
+        first, last = RATING_BUCKETS[0], RATING_BUCKETS[-1]
+        buckets = {
+            rating_bucket_field(bucket): review_count(rating__gte=bucket, rating__lt=bucket + 1)
+            for bucket in RATING_BUCKETS[1:-1]
+        }
+        buckets[rating_bucket_field(first)] = review_count(rating__lt=first + 1)
+        buckets[rating_bucket_field(last)] = review_count(rating__gte=last)
+        rating_sum = reviews.annotate(total=Sum('rating')).values('total')
+        return self.update(
+            rating_count=review_count(),
+            rating_sum=Coalesce(Subquery(rating_sum), 0.0),
+            **buckets,
+        )
+
+
+class EventManager(models.Manager.from_queryset(EventQuerySet)):
+    def get_queryset(self):
+        # search_vector فقط داخل SQL جستجو استفاده می‌شود و نیازی به خواندن آن نیست
+        return super().get_queryset().defer('search_vector')
+
+
 class Event(models.Model):
     Category_CHOICES = [
         ('education', 'Education'),
@@ -15,6 +88,8 @@ class Event(models.Model):
     event_category = models.CharField(max_length=50, choices=Category_CHOICES, default='education')
     about_event = models.TextField()
     image = models.ImageField(upload_to='event_images/', null=True, blank=True)
+    # نسخه‌های کوچک تصویر ({width, height, format, name})؛ در پس‌زمینه توسط Eventapp.images ساخته می‌شوند
+    image_variants = models.JSONField(default=list, blank=True, editable=False)
     start_date = models.DateTimeField()
     end_date = models.DateTimeField()
     province = models.CharField(max_length=100, default='تهران')
@@ -28,13 +103,77 @@ class Event(models.Model):
     max_subscribers = models.PositiveIntegerField()
     event_owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_events')
     subscribers = models.ManyToManyField(User, through='UserEventRole', related_name='joined_events')
+    # تعداد اعضای تایید شده (بدون owner)؛ توسط UserEventRole به‌روز نگه داشته می‌شود
+    approved_subscribers_count = models.PositiveIntegerField(default=0, editable=False)
+    # روی PostgreSQL توسط trigger پر می‌شود (migration 0011)؛ در SQLite خالی می‌ماند
+    search_vector = SearchVectorField(null=True, editable=False)
+    # کلید تصادفی ایندکس شده برای انتخاب رویدادهای مرتبط در خود دیتابیس
+    random_key = models.FloatField(default=generate_random_key, editable=False)
+    # تعداد، مجموع و هیستوگرام امتیاز نظرها؛ توسط Review به‌روز نگه داشته می‌شود
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.FloatField(default=0, editable=False)
+    rating_count_0 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_1 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_2 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_3 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_4 = models.PositiveIntegerField(default=0, editable=False)
+    rating_count_5 = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = EventManager()
 
     def __str__(self):
         return f"{self.title} - {self.event_category} - {self.about_event[:15]}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        image = self.image.name or ''
+        if self._state.adding:
+            # CreateEvent برای تصویر تکراری نسخه‌های موجود را همراه رویداد ذخیره می‌کند
+            self._image_changed = bool(image) and not self.image_variants
+        elif update_fields is None or 'image' in update_fields:
+            previous = Event.objects.filter(pk=self.pk).values_list('image', flat=True).first()
+            self._image_changed = image != (previous or '')
+            if self._image_changed:
+                # نسخه‌های تصویر قبلی نباید برای تصویر جدید برگردانده شوند
+                self.image_variants = []
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'image_variants'}
+        super().save(*args, **kwargs)
+
+    @property
+    def subscriber_count(self):
+        # اعضای تایید شده به علاوه owner
+        return self.approved_subscribers_count + 1
+
+    @property
+    def rating_summary(self):
+        return {
+            'count': self.rating_count,
+            'sum': self.rating_sum,
+            'average': round(self.rating_sum / self.rating_count, 2) if self.rating_count else None,
+            'histogram': [getattr(self, rating_bucket_field(bucket)) for bucket in RATING_BUCKETS],
+        }
+
     class Meta:
         verbose_name = "رویداد"
         verbose_name_plural = "رویدادها"
+        indexes = [
+            models.Index(fields=['city', 'event_category', 'random_key'], name='event_related_random_idx'),
+            # searchEventsByCity و filteredEvents: فیلتر شهر (و دسته یا محله) با مرتب‌سازی start_date
+            models.Index(fields=['city', '-start_date'], name='event_city_start_idx'),
+            models.Index(fields=['city', 'event_category', '-start_date'], name='event_city_category_start_idx'),
+            models.Index(fields=['city', 'neighborhood', '-start_date'], name='event_city_nbhd_start_idx'),
+            # recentEvents: خواندن به ترتیب start_date و id تا رسیدن به limit
+            models.Index(fields=['-start_date', '-id'], name='event_start_id_idx'),
+            # eventsByOwner
+            models.Index(fields=['event_owner', '-start_date'], name='event_owner_start_idx'),
+            # پیدا کردن تصویر تکراری با نام مبتنی بر محتوا در images.store_upload
+            models.Index(fields=['image'], name='event_image_idx'),
+        ]
+
+
+# فرستاده می‌شود وقتی UserEventRole.approve نقش را با update (بدون post_save) تایید می‌کند
+join_request_approved = Signal()
 
 
 class UserEventRole(models.Model):
@@ -51,12 +190,66 @@ class UserEventRole(models.Model):
 
     class Meta:
         unique_together = ('user', 'event')
+        indexes = [
+            # userEvents و adminEvents
+            models.Index(fields=['user', 'role', 'is_approved'], name='role_user_role_approved_idx'),
+            # pendingJoinRequests: فقط درخواست‌های در انتظار
+            models.Index(
+                fields=['event', 'created_at'],
+                condition=models.Q(is_approved__isnull=True),
+                name='role_pending_event_idx'
+            ),
+        ]
         verbose_name = "نقش کاربر در رویداد"
         verbose_name_plural = "نقش کاربرها در رویداد"
 
     def __str__(self):
         return f"{self.user.fullname} - {self.event.title} - {self.role}"
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = UserEventRole.objects.select_for_update().filter(pk=self.pk).values(
+                    'event_id', 'user_id', 'is_approved'
+                ).first()
+            super().save(*args, **kwargs)
+
+            # به‌روزرسانی شمارنده اعضای تایید شده رویداد فقط در صورت تغییر وضعیت تایید
+            current = {'event_id': self.event_id, 'user_id': self.user_id, 'is_approved': self.is_approved}
+            if previous == current:
+                return
+            if previous and previous['is_approved'] is True:
+                Event.objects.filter(pk=previous['event_id']).adjust_subscriber_count(previous['user_id'], -1)
+            if self.is_approved is True:
+                Event.objects.filter(pk=self.event_id).adjust_subscriber_count(self.user_id, 1)
+
+    def approve(self, role='regular'):
+        """
+        Approve the join request if the event still has a free seat.
+
+        The seat is claimed with a conditional UPDATE on the event row, so
+        concurrent approvals cannot push the event over ``max_subscribers``.
+        Returns False when the event is full.
+        """
+        with transaction.atomic():
+            current = UserEventRole.objects.select_for_update().get(pk=self.pk)
+            if current.is_approved is not True:
+                event = Event.objects.filter(pk=self.event_id)
+                seat_claimed = event.filter(
+                    approved_subscribers_count__lt=F('max_subscribers')
+                ).adjust_subscriber_count(self.user_id, 1)
+                # owner صندلی اشغال نمی‌کند، پس update صفر سطر برای او به معنی پر بودن ظرفیت نیست
+                if not seat_claimed and not event.filter(event_owner_id=self.user_id).exists():
+                    return False
+            # شمارنده بالا به‌روز شده، پس از update به جای save استفاده می‌شود
+            UserEventRole.objects.filter(pk=self.pk).update(is_approved=True, role=role)
+            # update سیگنال post_save نمی‌فرستد
+            join_request_approved.send(sender=UserEventRole, instance=self)
+        self.is_approved = True
+        self.role = role
+        return True
+
 
 class EventFeature(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='custom_features')
@@ -87,6 +280,35 @@ class Review(models.Model):
     def __str__(self):
         return f'Review by {self.user.fullname} for {self.event.title}'
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if self.pk is not None:
+                previous = Review.objects.select_for_update().filter(pk=self.pk).values('event_id', 'rating').first()
+            super().save(*args, **kwargs)
+
+            # امتیاز قبلی از رویداد قبلی کم و امتیاز جدید اضافه می‌شود
+            current = {'event_id': self.event_id, 'rating': self.rating}
+            if previous == current:
+                return
+            if previous:
+                Event.objects.filter(pk=previous['event_id']).adjust_rating(previous['rating'], -1)
+            Event.objects.filter(pk=self.event_id).adjust_rating(self.rating, 1)
+
+    class Meta:
+        indexes = [
+            # reviewsByEvent و نسخه صفحه‌بندی شده آن
+            models.Index(fields=['event', '-created_at', '-id'], name='review_event_created_idx'),
+        ]
+
+
+# هر بخش path شناسه یک نظر با طول ثابت است تا مرتب‌سازی رشته‌ای همان ترتیب درخت باشد
+COMMENT_PATH_STEP = 10
+
+
+def comment_path_segment(comment_id):
+    return f'{comment_id:0{COMMENT_PATH_STEP}d}'
+
 
 class Comment(models.Model):
     review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='comments')  # ارتباط با نظر اصلی
@@ -97,10 +319,21 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)  # زمان ایجاد پاسخ
     level = models.PositiveIntegerField(default=1)  # سطح نظر (1 برای نظر اصلی, 2 برای اولین پاسخ و ...)
     is_active = models.BooleanField(default=False)  # فیلد جدید برای فعال یا غیرفعال بودن نظر
+    # path والد به اضافه شناسه خود نظر؛ مرتب‌سازی بر اساس آن کل رشته گفتگو را به ترتیب نمایش می‌دهد
+    path = models.CharField(max_length=255, default='', editable=False)
 
     def __str__(self):
         return f'Comment by {self.user.fullname} on review {self.review.id}'
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if not self.path:
+                # شناسه نظر فقط بعد از INSERT معلوم است
+                prefix = self.parent_comment.path if self.parent_comment_id else ''
+                self.path = prefix + comment_path_segment(self.pk)
+                Comment.objects.filter(pk=self.pk).update(path=self.path)
+
     class Meta:
         constraints = [
             models.CheckConstraint(
@@ -108,6 +341,12 @@ class Comment(models.Model):
                 name='max_level_3'
             )
         ]
+        indexes = [
+            # commentsByReview و نسخه صفحه‌بندی شده آن
+            models.Index(fields=['review', '-created_at', '-id'], name='comment_review_created_idx'),
+            # commentThread: کل رشته یک review به ترتیب درخت
+            models.Index(fields=['review', 'path'], name='comment_review_path_idx'),
+        ]
 class NotificationStatus(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     user_event_role = models.ForeignKey(UserEventRole, on_delete=models.CASCADE)
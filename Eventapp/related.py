@@ -0,0 +1,53 @@
+"""
+Random related events picked on the database side.
+
+Each event carries an indexed ``random_key``. A sample is the rows right
+after a random point on the ``(city, event_category, random_key)`` index,
+wrapping around once, so memory use doesn't depend on how many events a city
+has. A sampled pool per (city, category) is cached for a short time so
+repeated event detail views don't query the table at all.
+"""
+import hashlib
+import random
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Event
+
+RELATED_EVENTS_COUNT = 5
+POOL_SIZE = 50
+POOL_TIMEOUT = 60
+
+
+def _pool_cache_key(city, event_category):
+    digest = hashlib.md5(f'{city}:{event_category}'.encode()).hexdigest()
+    return f'related_events_pool:{digest}'
+
+
+def sample_events(city, event_category, size):
+    events = Event.objects.filter(
+        city=city,
+        event_category=event_category,
+        registration_end_date__gte=timezone.now()  # فقط رویدادهای فعال
+    )
+    point = random.random()
+    sample = list(events.filter(random_key__gte=point).order_by('random_key')[:size])
+    if len(sample) < size:
+        sample += events.filter(random_key__lt=point).order_by('random_key')[:size - len(sample)]
+    return sample
+
+
+def related_events(event, count=RELATED_EVENTS_COUNT):
+    cache_key = _pool_cache_key(event.city, event.event_category)
+    pool = cache.get(cache_key)
+    if pool is None:
+        pool = sample_events(event.city, event.event_category, POOL_SIZE)
+        cache.set(cache_key, pool, POOL_TIMEOUT)
+
+    current_date = timezone.now()
+    candidates = [
+        candidate for candidate in pool
+        if candidate.id != event.id and candidate.registration_end_date >= current_date
+    ]
+    return random.sample(candidates, min(len(candidates), count))
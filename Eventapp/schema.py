@@ -1,38 +1,73 @@
 import graphene
-from django.db.models import Count
 from graphene_django.types import DjangoObjectType
-from .models import Event, Review, Comment, EventFeature, UserEventRole, NotificationStatus
+from .models import RATING_FIELDS, Event, Review, Comment, EventFeature, UserEventRole, NotificationStatus
 from userapp.models import User
-import random
 from django.db.models import Q
 from django.core.exceptions import PermissionDenied
 from graphene_file_upload.scalars import Upload
 from django.utils import timezone
 from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from .loaders import get_loaders
+from .search import search_events
+from .related import related_events
+from .images import InvalidImage, image_url, store_upload
+from YekiKamePrj.pagination import DEFAULT_PAGE_SIZE, PageType, paginate
+
+class RatingSummaryType(graphene.ObjectType):
+    count = graphene.Int()
+    sum = graphene.Float()
+    average = graphene.Float()
+    histogram = graphene.List(graphene.Int, description="Number of reviews rated 0, 1, 2, 3, 4 and 5.")
+
+
+class ImageVariantType(graphene.ObjectType):
+    width = graphene.Int()
+    height = graphene.Int()
+    format = graphene.String(description="webp or jpeg.")
+    url = graphene.String()
+
+    def resolve_width(self, info):
+        return self['width']
+
+    def resolve_height(self, info):
+        return self['height']
+
+    def resolve_format(self, info):
+        return self['format']
+
+    def resolve_url(self, info):
+        return default_storage.url(self['name'])
+
 
 class EventType(DjangoObjectType):
     subscriber_count = graphene.Int()
+    rating = graphene.Field(RatingSummaryType)
+    image = graphene.String()
+    image_variants = graphene.List(
+        ImageVariantType, description="Smaller copies of the image; empty until they have been created."
+    )
 
     class Meta:
         model = Event
+        exclude = ('search_vector', *RATING_FIELDS)
+
+    def resolve_image(self, info):
+        return image_url(self.image.name)
+
+    def resolve_image_variants(self, info):
+        return self.image_variants
 
     def resolve_subscriber_count(self, info):
-        # شمارش کاربران تایید شده به علاوه owner
-        approved_count = UserEventRole.objects.filter(
-            event=self,
-            is_approved=True
-        ).count()
-        
-        # اگر owner در subscribers نیست، یک نفر اضافه می‌کنیم
-        owner_is_subscriber = UserEventRole.objects.filter(
-            event=self,
-            user=self.event_owner
-        ).exists()
-        
-        if not owner_is_subscriber:
-            approved_count += 1
-            
-        return approved_count
+        # شمارنده ذخیره شده اعضای تایید شده به علاوه owner
+        return self.subscriber_count
+
+    def resolve_rating(self, info):
+        # از ستون‌های خود رویداد، بدون کوئری اضافه
+        return self.rating_summary
+
+    def resolve_event_owner(self, info):
+        return get_loaders(info).users.load(self.event_owner_id)
 
 class PastEventType(DjangoObjectType):
     role = graphene.String()
@@ -43,20 +78,14 @@ class PastEventType(DjangoObjectType):
         convert_choices_to_enum = False
     def resolve_role(self, info):
         context = info.context
-        try:
-            # ابتدا بررسی می‌کنیم که آیا کاربر owner است
-            if self.event_owner.phone == context.phone:
-                return "owner"
-            
-            # اگر owner نبود، سایر نقش‌ها را بررسی می‌کنیم
-            user_role = UserEventRole.objects.get(
-                event=self,
-                user__phone=context.phone
-            )
-            return user_role.role  # می‌تواند "admin" یا "regular" باشد
-            
-        except UserEventRole.DoesNotExist:
-            return None
+        loaders = get_loaders(info)
+
+        # ابتدا بررسی می‌کنیم که آیا کاربر owner است
+        if loaders.users.load(self.event_owner_id).phone == context.phone:
+            return "owner"
+
+        # اگر owner نبود، سایر نقش‌ها را بررسی می‌کنیم
+        return loaders.event_roles.load((self.id, context.phone))  # می‌تواند "admin" یا "regular" یا None باشد
 
 class ReviewType(DjangoObjectType):
     class Meta:
@@ -70,6 +99,18 @@ class CommentType(DjangoObjectType):
         fields = ('id', 'review', 'user', 'comment_text', 'created_at', 'level', 'is_active')
 
 
+class CommentThreadType(DjangoObjectType):
+    replies = graphene.List(lambda: CommentThreadType)
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'user', 'comment_text', 'created_at', 'level', 'is_active')
+
+    def resolve_replies(self, info):
+        # توسط resolve_comment_thread پر می‌شود، بدون کوئری اضافه
+        return self.thread_replies
+
+
 class UserType(DjangoObjectType):
     class Meta:
         model = User
@@ -79,20 +120,32 @@ class UserType(DjangoObjectType):
 class EventDetailType(DjangoObjectType):
     class Meta:
         model = Event
-        fields = '__all__'
+        exclude = ('search_vector', *RATING_FIELDS)
 
     event_owner = graphene.Field(UserType)
     event_category = graphene.String()
     subscriber_count = graphene.Int()
+    rating = graphene.Field(RatingSummaryType)
+    image = graphene.String()
+    image_variants = graphene.List(ImageVariantType)
 
     def resolve_event_owner(self, info):
-        return self.event_owner
+        return get_loaders(info).users.load(self.event_owner_id)
+
+    def resolve_image(self, info):
+        return image_url(self.image.name)
+
+    def resolve_image_variants(self, info):
+        return self.image_variants
 
     def resolve_event_category(self, info):
         return self.event_category
 
     def resolve_subscriber_count(self, info):
-        return self.subscribers.count()  # محاسبه تعداد subscribers
+        return self.subscriber_count
+
+    def resolve_rating(self, info):
+        return self.rating_summary
 
 class JoinRequestType(DjangoObjectType):
     user = graphene.Field(UserType)
@@ -103,7 +156,31 @@ class JoinRequestType(DjangoObjectType):
         fields = ('id', 'role', 'is_approved', 'created_at')
 
     def resolve_user(self, info):
-        return self.user
+        return get_loaders(info).users.load(self.user_id)
+
+class EventSearchPageType(PageType):
+    events = graphene.List(EventType)
+
+
+class EventPageType(PageType):
+    events = graphene.List(EventType)
+
+
+class PastEventPageType(PageType):
+    events = graphene.List(PastEventType)
+
+
+class ReviewPageType(PageType):
+    reviews = graphene.List(ReviewType)
+
+
+class CommentPageType(PageType):
+    comments = graphene.List(CommentType)
+
+
+class JoinRequestPageType(PageType):
+    requests = graphene.List(JoinRequestType)
+
 
 class EventDetailResponseType(graphene.ObjectType):
     event = graphene.Field(EventDetailType)
@@ -161,20 +238,21 @@ class NotificationType(DjangoObjectType):
         fields = ('id', 'event', 'role', 'is_approved', 'created_at')
 
     def resolve_event_title(self, info):
-        return self.event.title
+        return get_loaders(info).events.load(self.event_id).title
 
     def resolve_event_id(self, info):
-        return self.event.id  # برگرداندن ID رویداد
+        return self.event_id  # برگرداندن ID رویداد
 
     def resolve_status_message(self, info):
+        if self.is_approved is None:
+            return None
+        event_title = get_loaders(info).events.load(self.event_id).title
         if self.is_approved is True:
             if self.role == "admin":
-                return f"شما به عنوان ادمین در رویداد {self.event.title} پذیرفته شدید"
+                return f"شما به عنوان ادمین در رویداد {event_title} پذیرفته شدید"
             else:
-                return f"درخواست عضویت شما در رویداد {self.event.title} پذیرفته شد"
-        elif self.is_approved is False:
-            return f"درخواست عضویت شما در رویداد {self.event.title} رد شد"
-        return None
+                return f"درخواست عضویت شما در رویداد {event_title} پذیرفته شد"
+        return f"درخواست عضویت شما در رویداد {event_title} رد شد"
 
     def resolve_user_event_role_id(self, info):
         return self.id
@@ -193,6 +271,7 @@ class Query(graphene.ObjectType):
     recent_events = graphene.List(EventType)
     reviews_by_event = graphene.List(ReviewType, event_id=graphene.ID(required=True))
     comments_by_review = graphene.List(CommentType, review_id=graphene.ID(required=True))
+    comment_thread = graphene.List(CommentThreadType, review_id=graphene.ID(required=True))
     event_details = graphene.Field(EventDetailResponseType, event_id=graphene.ID(required=True))
     related_events = graphene.List(EventType, event_id=graphene.ID(required=True))
     filtered_events = graphene.List(
@@ -212,6 +291,12 @@ class Query(graphene.ObjectType):
         title=graphene.String(required=True),
         limit=graphene.Int(default_value=10) 
     )
+    search_events = graphene.Field(
+        EventSearchPageType,
+        text=graphene.String(required=True),
+        limit=graphene.Int(default_value=10),
+        after=graphene.String()
+    )
     past_events = graphene.List(PastEventType, phone=graphene.String(required=True))
     pending_join_requests = graphene.List(
         JoinRequestType,
@@ -223,6 +308,90 @@ class Query(graphene.ObjectType):
         user_event_role_id=graphene.ID(required=True),
         phone=graphene.String(required=True)
     )
+
+    # نسخه صفحه‌بندی شده (cursor) لیست‌ها
+    filtered_events_page = graphene.Field(
+        EventPageType,
+        city=graphene.String(required=True),
+        event_category=graphene.String(),
+        neighborhood=graphene.String(),
+        has_image=graphene.Boolean(),
+        limit=graphene.Int(default_value=DEFAULT_PAGE_SIZE),
+        after=graphene.String()
+    )
+    search_events_by_city_page = graphene.Field(
+        EventPageType,
+        city=graphene.String(required=True),
+        limit=graphene.Int(default_value=DEFAULT_PAGE_SIZE),
+        after=graphene.String()
+    )
+    events_by_owner_page = graphene.Field(
+        EventPageType,
+        phone=graphene.String(required=True),
+        limit=graphene.Int(default_value=DEFAULT_PAGE_SIZE),
+        after=graphene.String()
+    )
+    past_events_page = graphene.Field(
+        PastEventPageType,
+        phone=graphene.String(required=True),
+        limit=graphene.Int(default_value=DEFAULT_PAGE_SIZE),
+        after=graphene.String()
+    )
+    reviews_by_event_page = graphene.Field(
+        ReviewPageType,
+        event_id=graphene.ID(required=True),
+        limit=graphene.Int(default_value=DEFAULT_PAGE_SIZE),
+        after=graphene.String()
+    )
+    comments_by_review_page = graphene.Field(
+        CommentPageType,
+        review_id=graphene.ID(required=True),
+        limit=graphene.Int(default_value=DEFAULT_PAGE_SIZE),
+        after=graphene.String()
+    )
+    pending_join_requests_page = graphene.Field(
+        JoinRequestPageType,
+        event_id=graphene.ID(required=True),
+        owner_phone=graphene.String(required=True),
+        limit=graphene.Int(default_value=DEFAULT_PAGE_SIZE),
+        after=graphene.String()
+    )
+
+    def resolve_filtered_events_page(self, info, limit, after=None, **filters):
+        events = Query.resolve_filtered_events(self, info, **filters)
+        events, next_cursor = paginate(events, ('-start_date', '-id'), limit, after)
+        return EventPageType(events=events, next_cursor=next_cursor)
+
+    def resolve_search_events_by_city_page(self, info, city, limit, after=None):
+        events = Query.resolve_search_events_by_city(self, info, city)
+        events, next_cursor = paginate(events, ('-start_date', '-id'), limit, after)
+        return EventPageType(events=events, next_cursor=next_cursor)
+
+    def resolve_events_by_owner_page(self, info, phone, limit, after=None):
+        events = Query.resolve_events_by_owner(self, info, phone)
+        events, next_cursor = paginate(events, ('-start_date', '-id'), limit, after)
+        return EventPageType(events=events, next_cursor=next_cursor)
+
+    def resolve_past_events_page(self, info, phone, limit, after=None):
+        events = Query.resolve_past_events(self, info, phone)
+        events, next_cursor = paginate(events, ('-start_date', '-id'), limit, after)
+        return PastEventPageType(events=events, next_cursor=next_cursor)
+
+    def resolve_reviews_by_event_page(self, info, event_id, limit, after=None):
+        reviews = Query.resolve_reviews_by_event(self, info, event_id)
+        reviews, next_cursor = paginate(reviews, ('-created_at', '-id'), limit, after)
+        return ReviewPageType(reviews=reviews, next_cursor=next_cursor)
+
+    def resolve_comments_by_review_page(self, info, review_id, limit, after=None):
+        comments = Query.resolve_comments_by_review(self, info, review_id)
+        comments, next_cursor = paginate(comments, ('-created_at', '-id'), limit, after)
+        return CommentPageType(comments=comments, next_cursor=next_cursor)
+
+    def resolve_pending_join_requests_page(self, info, event_id, owner_phone, limit, after=None):
+        requests = Query.resolve_pending_join_requests(self, info, event_id, owner_phone)
+        requests, next_cursor = paginate(requests, ('created_at', 'id'), limit, after)
+        return JoinRequestPageType(requests=requests, next_cursor=next_cursor)
+
     def resolve_admin_events(self, info, phone):
         try:
             user = User.objects.get(phone=phone)
@@ -270,8 +439,6 @@ class Query(graphene.ObjectType):
         current_date = timezone.now()
         return Event.objects.filter(
             registration_end_date__gte=current_date  # فقط رویدادهایی که هنوز تمام نشده‌اند
-        ).annotate(
-            subscriber_count=Count('subscribers')
         ).order_by('-start_date', '-id')[:10]
 
     def resolve_reviews_by_event(self, info, event_id):
@@ -280,6 +447,18 @@ class Query(graphene.ObjectType):
     def resolve_comments_by_review(self, info, review_id):
         return Comment.objects.filter(review_id=review_id).order_by('-created_at')
 
+    def resolve_comment_thread(self, info, review_id):
+        # یک کوئری روی ایندکس (review, path)؛ هر پاسخ بعد از والدش می‌آید
+        comments = Comment.objects.filter(review_id=review_id).select_related('user').order_by('path')
+        roots = []
+        by_id = {}
+        for comment in comments:
+            comment.thread_replies = []
+            by_id[comment.id] = comment
+            parent = by_id.get(comment.parent_comment_id)
+            (parent.thread_replies if parent else roots).append(comment)
+        return roots
+
     def resolve_event_details(self, info, event_id):
         try:
             event = Event.objects.get(id=event_id)
@@ -289,17 +468,9 @@ class Query(graphene.ObjectType):
 
     def resolve_related_events(self, info, event_id):
         try:
-            current_date = timezone.now()
-            main_event = Event.objects.get(id=event_id)
-
-            related_events = Event.objects.filter(
-                Q(event_category=main_event.event_category) &
-                Q(city=main_event.city) &
-                Q(registration_end_date__gte=current_date)  # فقط رویدادهای فعال
-            ).exclude(id=main_event.id)
-
-            related_events = random.sample(list(related_events), min(len(related_events), 5))
-            return related_events
+            main_event = Event.objects.only('id', 'city', 'event_category').get(id=event_id)
+            # نمونه‌گیری تصادفی در دیتابیس (و کش کوتاه‌مدت) به جای بارگذاری همه رویدادهای شهر
+            return related_events(main_event)
         except Event.DoesNotExist:
             return []
 
@@ -321,12 +492,13 @@ class Query(graphene.ObjectType):
 
         return Event.objects.filter(filters).order_by('-start_date')
     def resolve_search_events_by_title(self, info, title, limit=10):
-        current_date = timezone.now()
+        # صفحه اول نتایج رتبه‌بندی شده موتور جستجو
+        events, _ = search_events(title, limit)
+        return events
 
-        return Event.objects.filter(
-            Q(title__icontains=title) &  # جستجو در عنوان (case-insensitive)
-            Q(registration_end_date__gte=current_date) 
-        ).order_by('-start_date')[:limit]
+    def resolve_search_events(self, info, text, limit=10, after=None):
+        events, next_cursor = search_events(text, limit, after)
+        return EventSearchPageType(events=events, next_cursor=next_cursor)
     def resolve_past_events(self, info, phone):
         current_date = timezone.now()
         try:
@@ -458,48 +630,46 @@ class CreateEvent(graphene.Mutation):
         except User.DoesNotExist:
             raise ValueError("User with this phone number does not exist")
 
-        # مدیریت آپلود تصویر
-        image_url = None
+        # نام فایل از هش محتوا ساخته می‌شود؛ تصویر تکراری دوباره ذخیره و decode نمی‌شود
+        stored = None
         if image:
             try:
-                # ایجاد نام یکتا برای فایل با استفاده از timestamp
-                timestamp = timezone.now().strftime('%Y%m%d_%H%M%S')
-                file_name = f"event_images/{timestamp}_{image.name}"
-                
-                # ذخیره فایل با استفاده از default_storage
-                filename = default_storage.save(file_name, image)
-                image_url = default_storage.url(filename)
-            except Exception as e:
-                raise ValueError(f"Error uploading image: {str(e)}")
+                stored = store_upload(image)
+            except InvalidImage as e:
+                raise ValueError(str(e))
 
         try:
-            # ایجاد رویداد
-            event = Event.objects.create(
-                title=title,
-                event_category=event_category,
-                about_event=about_event,
-                start_date=start_date,
-                end_date=end_date,
-                registration_start_date=registration_start_date,
-                registration_end_date=registration_end_date,
-                province=province,
-                city=city,
-                neighborhood=neighborhood,
-                postal_address=postal_address,
-                postal_code=postal_code,
-                full_description=full_description,
-                max_subscribers=max_subscribers,
-                event_owner=event_owner,
-                image=image_url
-            )
+            with transaction.atomic():
+                # ایجاد رویداد
+                event = Event.objects.create(
+                    title=title,
+                    event_category=event_category,
+                    about_event=about_event,
+                    start_date=start_date,
+                    end_date=end_date,
+                    registration_start_date=registration_start_date,
+                    registration_end_date=registration_end_date,
+                    province=province,
+                    city=city,
+                    neighborhood=neighborhood,
+                    postal_address=postal_address,
+                    postal_code=postal_code,
+                    full_description=full_description,
+                    max_subscribers=max_subscribers,
+                    event_owner=event_owner,
+                    image=stored.name if stored else None,
+                    # برای تصویر تکراری نسخه‌های موجود؛ وگرنه Event.save ساخت آن‌ها را زمان‌بندی می‌کند
+                    image_variants=stored.variants if stored else []
+                )
 
             return CreateEvent(event=event)
-            
+
         except Exception as e:
             # اگر در ایجاد رویداد خطایی رخ داد، فایل آپلود شده را حذف می‌کنیم
-            if image_url:
+            # فایل مبتنی بر محتوا ممکن است در همین فاصله توسط رویداد دیگری استفاده شده باشد
+            if stored and stored.created and not Event.objects.filter(image=stored.name).exists():
                 try:
-                    default_storage.delete(filename)
+                    default_storage.delete(stored.name)
                 except:
                     pass
             raise ValueError(f"Error creating event: {str(e)}")
@@ -656,31 +826,31 @@ class RequestJoinEvent(graphene.Mutation):
             user = User.objects.get(phone=phone)
 
             # بررسی اینکه آیا کاربر owner است
-            if event.event_owner == user:
+            if event.event_owner_id == user.id:
                 return RequestJoinEvent(
                     success=False,
                     message="شما مالک این رویداد هستید و نیازی به درخواست عضویت ندارید."
                 )
 
-            # بررسی تعداد اعضای فعلی
-            current_members = UserEventRole.objects.filter(
-                event=event,
-                is_approved=True
-            ).count()
-
-            if current_members >= event.max_subscribers:
+            # بررسی تعداد اعضای فعلی از روی شمارنده ذخیره شده
+            # (ظرفیت هنگام تایید درخواست به صورت اتمیک دوباره بررسی می‌شود)
+            if event.approved_subscribers_count >= event.max_subscribers:
                 return RequestJoinEvent(
                     success=False,
                     message="ظرفیت این رویداد تکمیل شده است."
                 )
 
-            # بررسی وضعیت فعلی درخواست
-            existing_request = UserEventRole.objects.filter(
-                user=user,
-                event=event
-            ).first()
-
-            if existing_request:
+            # ایجاد درخواست جدید؛ درخواست تکراری توسط unique_together رد می‌شود
+            try:
+                with transaction.atomic():
+                    UserEventRole.objects.create(
+                        user=user,
+                        event=event,
+                        role="regular",
+                        is_approved=None
+                    )
+            except IntegrityError:
+                existing_request = UserEventRole.objects.get(user=user, event=event)
                 if existing_request.is_approved is True:
                     return RequestJoinEvent(
                         success=False,
@@ -697,14 +867,6 @@ class RequestJoinEvent(graphene.Mutation):
                         message="درخواست قبلی شما در حال بررسی است."
                     )
 
-            # ایجاد درخواست جدید
-            UserEventRole.objects.create(
-                user=user,
-                event=event,
-                role="regular",
-                is_approved=None
-            )
-
             return RequestJoinEvent(
                 success=True,
                 message="درخواست عضویت شما با موفقیت ثبت شد."
@@ -741,28 +903,26 @@ class ReviewJoinRequest(graphene.Mutation):
         try:
             event = Event.objects.get(id=event_id)
             owner = User.objects.get(phone=owner_phone)
-            if event.event_owner != owner:
+            if event.event_owner_id != owner.id:
                 raise PermissionDenied("You are not authorized to review join requests for this event.")
 
             user_event_role = UserEventRole.objects.get(event=event, user_id=user_id)
-            user = User.objects.get(id=user_id)
 
             if action == "approve":
-                user_event_role.is_approved = True
-                user_event_role.role = role if role in ["regular", "admin"] else "regular"
-                user_event_role.save()
-                
-                # اضافه کردن کاربر به subscribers
-                event.subscribers.add(user)
-                
+                # تایید و گرفتن صندلی در یک تراکنش کوتاه؛ ظرفیت دوباره بررسی می‌شود
+                role = role if role in ["regular", "admin"] else "regular"
+                if not user_event_role.approve(role):
+                    return ReviewJoinRequest(success=False, message="Event capacity is full.")
+
                 return ReviewJoinRequest(success=True, message=f"User request approved successfully with role '{user_event_role.role}'.")
             elif action == "reject":
-                user_event_role.is_approved = False
-                user_event_role.save()
-                
-                # حذف کاربر از subscribers اگر قبلاً اضافه شده بود
-                event.subscribers.remove(user)
-                
+                with transaction.atomic():
+                    user_event_role.is_approved = False
+                    user_event_role.save()
+
+                    # حذف کاربر از subscribers اگر قبلاً اضافه شده بود
+                    event.subscribers.remove(user_event_role.user_id)
+
                 return ReviewJoinRequest(success=True, message="User request rejected successfully.")
             else:
                 return ReviewJoinRequest(success=False, message="Invalid action provided.")
@@ -0,0 +1,69 @@
+"""
+Ranked event search over ``title``, ``about_event`` and ``full_description``.
+
+On PostgreSQL the query runs against the ``search_vector`` column (kept in
+sync by a trigger, see migration 0011) and pg_trgm similarity on the title, so
+misspelled Persian words still match. Both go through GIN indexes. Other
+backends (SQLite in tests) fall back to weighted ``icontains`` matching with
+the same ranking and cursor behaviour.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from YekiKamePrj.pagination import paginate
+from .models import Event
+
+# هم‌وزن با وزن‌های پیش‌فرض ts_rank برای A/B/C
+FALLBACK_WEIGHTS = (('title', 1.0), ('about_event', 0.4), ('full_description', 0.2))
+
+
+def _terms(text):
+    return re.findall(r'\w+', text)
+
+
+def _postgres_matches(text, terms):
+    # هر کلمه به صورت prefix جستجو می‌شود تا جستجو حین تایپ هم نتیجه بدهد
+    search_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='simple')
+    rank = SearchRank(F('search_vector'), search_query) + TrigramSimilarity('title', text)
+    return Event.objects.annotate(
+        rank=Cast(rank, FloatField())
+    ).filter(
+        Q(search_vector=search_query) | Q(title__trigram_similar=text)
+    )
+
+
+def _fallback_matches(terms):
+    filters = Q()
+    rank = Value(0.0)
+    for term in terms:
+        term_filter = Q()
+        for field, weight in FALLBACK_WEIGHTS:
+            term_filter |= Q(**{f'{field}__icontains': term})
+            rank = rank + Case(
+                When(**{f'{field}__icontains': term}, then=Value(weight)),
+                default=Value(0.0),
+            )
+        filters &= term_filter
+    return Event.objects.annotate(rank=Cast(rank, FloatField())).filter(filters)
+
+
+def search_events(text, limit=10, after=None):
+    """
+    Return one page of active events matching ``text`` as
+    ``(events, next_cursor)``, best matches first.
+    """
+    terms = _terms(text)
+    if not terms:
+        return [], None
+
+    if connection.vendor == 'postgresql':
+        events = _postgres_matches(text, terms)
+    else:
+        events = _fallback_matches(terms)
+    events = events.filter(registration_end_date__gte=timezone.now())
+    return paginate(events, ('-rank', '-id'), limit, after)
@@ -0,0 +1,39 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from YekiKamePrj import response_cache
+from .images import schedule_variants
+from .models import Comment, Event, EventFeature, Review, UserEventRole, join_request_approved
+
+
+@receiver(post_delete, sender=UserEventRole)
+def release_subscriber_slot(sender, instance, **kwargs):
+    # حذف نقش (از جمله حذف گروهی در ادمین و subscribers.remove) شمارنده را کم می‌کند
+    if instance.is_approved is True:
+        Event.objects.filter(pk=instance.event_id).adjust_subscriber_count(instance.user_id, -1)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    # حذف گروهی و حذف همراه رویداد هم از همین مسیر می‌گذرند
+    Event.objects.filter(pk=instance.event_id).adjust_rating(instance.rating, -1)
+
+
+@receiver(post_save, sender=Event)
+def schedule_image_variants(sender, instance, **kwargs):
+    # Event.save مشخص می‌کند که تصویر عوض شده است (از جمله از طریق ادمین و UpdateEventDetail)
+    if instance.__dict__.pop('_image_changed', False) and instance.image:
+        schedule_variants(instance.pk, instance.image.name)
+
+
+@receiver([post_save, post_delete], sender=Event)
+@receiver([post_save, post_delete, join_request_approved], sender=UserEventRole)
+@receiver([post_save, post_delete], sender=Review)
+@receiver([post_save, post_delete], sender=Comment)
+@receiver([post_save, post_delete], sender=EventFeature)
+def invalidate_event_responses(sender, **kwargs):
+    # بعد از commit تا درخواست هم‌زمان داده قدیمی را با نسخه جدید کش نکند
+    transaction.on_commit(partial(response_cache.invalidate, 'event'))
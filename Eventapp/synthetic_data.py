@@ -0,0 +1,352 @@
+"""
+Synthetic data for load tests and benchmarks.
+
+``generate`` bulk-creates users, events, join requests, reviews with comment
+threads and support tickets with messages, ``batch_size`` events at a time.
+The data is shaped like production rather than uniform noise:
+
+- a few organisers own most of the events (Zipf-like weights),
+- most events are in a few big cities,
+- subscribers per event and messages per ticket are long-tailed,
+- only past events have reviews, and ratings lean towards 4 and 5,
+- timestamps are spread over the last two years instead of all being "now".
+
+The same seed gives the same data. Model signals are not sent, so the
+subscriber counters and rating aggregates are computed here and the response
+cache is invalidated at the end. Every user's password is ``PASSWORD``.
+"""
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from userapp.models import User
+from YekiKamePrj import response_cache
+
+from .models import Comment, Event, Review, UserEventRole, comment_path_segment
+
+BATCH_SIZE = 2000
+PASSWORD = 'password123'
+# شماره‌های ساختگی با این پیشوند ساخته می‌شوند تا با کاربران واقعی تداخل نداشته باشند
+PHONE_PREFIX = '099'
+# از هر این تعداد کاربر یکی ادمین (پشتیبان تیکت‌ها) است
+STAFF_EVERY = 5000
+
+# شهر: (استان، وزن)
+CITIES = {
+    'تهران': ('تهران', 40),
+    'مشهد': ('خراسان رضوی', 10),
+    'اصفهان': ('اصفهان', 9),
+    'شیراز': ('فارس', 8),
+    'تبریز': ('آذربایجان شرقی', 7),
+    'کرج': ('البرز', 7),
+    'اهواز': ('خوزستان', 4),
+    'قم': ('قم', 4),
+    'رشت': ('گیلان', 4),
+    'کرمان': ('کرمان', 3),
+    'یزد': ('یزد', 2),
+    'همدان': ('همدان', 2),
+}
+NEIGHBORHOODS = ['مرکز', 'شمال', 'جنوب', 'شرق', 'غرب', 'ونک', 'تجریش', 'سعادت‌آباد', 'نارمک', 'پونک']
+CATEGORY_WEIGHTS = {'education': 30, 'social': 25, 'sport': 20, 'entertainment': 15, 'game': 10}
+ACTIVITIES = {
+    'education': ['کارگاه پایتون', 'کلاس زبان انگلیسی', 'دوره جنگو', 'کارگاه عکاسی', 'کلاس نقاشی'],
+    'social': ['دورهمی', 'کتابخوانی', 'شب شعر', 'گپ و گفت', 'داوطلبی'],
+    'sport': ['کوهنوردی', 'فوتبال', 'دوچرخه‌سواری', 'یوگا', 'والیبال'],
+    'entertainment': ['کنسرت', 'سینما', 'تئاتر', 'موسیقی زنده', 'استندآپ'],
+    'game': ['شطرنج', 'بازی فکری', 'مافیا', 'بازی رومیزی', 'مسابقه بازی'],
+}
+QUALIFIERS = ['آخرهفته', 'شبانه', 'مقدماتی', 'پیشرفته', 'ماهانه', 'دوستانه', 'رایگان', 'گروهی']
+WORDS = [
+    'برنامه', 'همراه', 'دوستان', 'تجربه', 'یادگیری', 'جذاب', 'فضای', 'باز', 'ثبت‌نام', 'ظرفیت',
+    'محدود', 'هزینه', 'پذیرایی', 'ساعت', 'شروع', 'آدرس', 'حضور', 'لطفا', 'به', 'موقع', 'و', 'با',
+]
+FIRST_NAMES = ['علی', 'محمد', 'زهرا', 'فاطمه', 'رضا', 'مریم', 'حسین', 'سارا', 'امیر', 'نرگس', 'مهدی', 'نازنین']
+LAST_NAMES = ['احمدی', 'محمدی', 'حسینی', 'رضایی', 'کریمی', 'موسوی', 'جعفری', 'صادقی', 'رحیمی', 'کاظمی']
+# امتیاز: وزن
+RATING_WEIGHTS = {5: 40, 4: 33, 3: 15, 2: 7, 1: 5}
+EVENT_DURATIONS_HOURS = [2, 3, 4, 8, 24, 48]
+# سهم رویدادهای دارای تصویر، برای فیلتر has_image
+IMAGE_RATIO = 0.35
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let ``bulk_create`` keep the given ``auto_now``/``auto_now_add`` values."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+class Generator:
+    def __init__(self, seed=0, batch_size=BATCH_SIZE, progress=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.progress = progress or (lambda message: None)
+        self.now = timezone.now()
+        self.counts = dict.fromkeys(
+            ('users', 'events', 'roles', 'reviews', 'comments', 'tickets', 'ticket_messages'), 0
+        )
+
+    def text(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words))
+
+    def moment(self, start, end):
+        """A random datetime between ``start`` and ``end``, never in the future."""
+        end = min(end, self.now)
+        if end <= start:
+            return end
+        return start + (end - start) * self.rng.random()
+
+    def users(self, count):
+        rng = self.rng
+        offset = User.objects.filter(phone__startswith=PHONE_PREFIX).count()
+        password = make_password(PASSWORD)
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for i in range(start, min(start + self.batch_size, count)):
+                number = offset + i
+                batch.append(User(
+                    phone=f'{PHONE_PREFIX}{number:08d}',
+                    email=f'user{number}@example.com',
+                    fullname=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    password=password,
+                    is_admin=number % STAFF_EVERY == 0,
+                ))
+            User.objects.bulk_create(batch)
+            self.counts['users'] += len(batch)
+            self.progress(f"{self.counts['users']} users")
+        ids = list(
+            User.objects.filter(phone__startswith=PHONE_PREFIX).order_by('id').values_list('id', 'is_admin')
+        )
+        self.user_ids = [user_id for user_id, _ in ids]
+        self.staff_ids = [user_id for user_id, is_admin in ids if is_admin] or self.user_ids[:1]
+        # وزن Zipf برای مالک رویدادها: ترتیب تصادفی کاربران، وزن 1/rank
+        owners = self.user_ids[:]
+        rng.shuffle(owners)
+        self.owners = owners
+        self.owner_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(owners))))
+
+    def events(self, count):
+        cities = list(CITIES)
+        city_weights = list(accumulate(weight for _, weight in CITIES.values()))
+        categories = list(CATEGORY_WEIGHTS)
+        category_weights = list(accumulate(CATEGORY_WEIGHTS.values()))
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            owners = self.rng.choices(self.owners, cum_weights=self.owner_weights, k=size)
+            with transaction.atomic():
+                events, roles = [], []
+                for owner_id in owners:
+                    city = self.rng.choices(cities, cum_weights=city_weights)[0]
+                    category = self.rng.choices(categories, cum_weights=category_weights)[0]
+                    event = self.event(owner_id, city, category)
+                    events.append(event)
+                    roles.append(self.roles(event))
+                Event.objects.bulk_create(events, batch_size=self.batch_size)
+                for event, event_roles in zip(events, roles):
+                    for role in event_roles:
+                        role.event_id = event.id
+                roles = [role for event_roles in roles for role in event_roles]
+                with explicit_timestamps(UserEventRole):
+                    UserEventRole.objects.bulk_create(roles, batch_size=self.batch_size)
+                self.reviews(events, roles)
+                Event.objects.filter(id__in=[event.id for event in events]).rebuild_rating_aggregates()
+            self.counts['events'] += size
+            self.counts['roles'] += len(roles)
+            self.progress(f"{self.counts['events']} events")
+
+    def event(self, owner_id, city, category):
+        rng = self.rng
+        start_date = self.now + timedelta(days=rng.uniform(-540, 120))
+        registration_start = start_date - timedelta(days=rng.uniform(7, 60))
+        neighborhood = rng.choice(NEIGHBORHOODS) if rng.random() < 0.7 else None
+        return Event(
+            title=f'{rng.choice(ACTIVITIES[category])} {rng.choice(QUALIFIERS)}',
+            event_category=category,
+            about_event=self.text(12),
+            full_description=self.text(60),
+            image=f'event_images/synthetic/{rng.randrange(50)}.jpg' if rng.random() < IMAGE_RATIO else None,
+            start_date=start_date,
+            end_date=start_date + timedelta(hours=rng.choice(EVENT_DURATIONS_HOURS)),
+            registration_start_date=registration_start,
+            registration_end_date=start_date - timedelta(days=rng.uniform(0, 3)),
+            province=CITIES[city][0],
+            city=city,
+            neighborhood=neighborhood,
+            postal_address=f'{city}، {neighborhood or "مرکز"}، پلاک {rng.randint(1, 300)}',
+            postal_code=f'{rng.randrange(10 ** 10):010d}',
+            max_subscribers=max(2, int(rng.lognormvariate(3, 0.8))),
+            event_owner_id=owner_id,
+        )
+
+    def roles(self, event):
+        """Join requests of ``event``; sets its ``approved_subscribers_count``."""
+        rng = self.rng
+        past = event.start_date < self.now
+        wanted = min(int(rng.lognormvariate(1.8, 1.1)), int(event.max_subscribers * 1.3), len(self.user_ids) - 1)
+        users = [user_id for user_id in rng.sample(self.user_ids, wanted) if user_id != event.event_owner_id]
+        # رویدادهای گذشته بیشتر درخواست‌های تایید شده دارند؛ بعد از پر شدن ظرفیت درخواست‌ها در انتظار می‌مانند
+        approve_ratio = 0.8 if past else 0.6
+        roles = []
+        approved = 0
+        for user_id in users:
+            draw = rng.random()
+            if draw < approve_ratio and approved < event.max_subscribers:
+                is_approved = True
+                approved += 1
+            elif draw < 0.9:
+                is_approved = None
+            else:
+                is_approved = False
+            roles.append(UserEventRole(
+                user_id=user_id,
+                role='admin' if is_approved and rng.random() < 0.03 else 'regular',
+                is_approved=is_approved,
+                created_at=self.moment(event.registration_start_date, event.registration_end_date),
+            ))
+        event.approved_subscribers_count = approved
+        return roles
+
+    def reviews(self, events, roles):
+        rng = self.rng
+        members = {}
+        for role in roles:
+            if role.is_approved:
+                members.setdefault(role.event_id, []).append(role.user_id)
+        ratings = list(RATING_WEIGHTS)
+        rating_weights = list(accumulate(RATING_WEIGHTS.values()))
+        reviews = []
+        for event in events:
+            if event.end_date >= self.now or event.id not in members:
+                continue
+            reviewers = members[event.id]
+            count = min(len(reviewers), int(rng.expovariate(1 / 3)))
+            for user_id in rng.sample(reviewers, count):
+                created_at = self.moment(event.end_date, event.end_date + timedelta(days=14))
+                reviews.append(Review(
+                    event_id=event.id,
+                    user_id=user_id,
+                    rating=float(rng.choices(ratings, cum_weights=rating_weights)[0]),
+                    comment_text=self.text(rng.randint(5, 30)) if rng.random() < 0.7 else None,
+                    created_at=created_at,
+                    updated_at=created_at,
+                ))
+        with explicit_timestamps(Review):
+            Review.objects.bulk_create(reviews, batch_size=self.batch_size)
+        self.counts['reviews'] += len(reviews)
+        owners = {event.id: event.event_owner_id for event in events}
+        self.comments(reviews, {review.id: owners[review.event_id] for review in reviews})
+
+    def comments(self, reviews, owners):
+        rng = self.rng
+        parents = []
+        for review in reviews:
+            for _ in range(int(rng.expovariate(1 / 0.8))):
+                parents.append(self.comment(review.id, review.created_at, (owners[review.id], review.user_id)))
+        # هر سطح بعد از ساخته شدن سطح قبل ساخته می‌شود تا parent_comment_id و path والد معلوم باشد
+        prefixes = [''] * len(parents)
+        for level in (1, 2, 3):
+            for comment in parents:
+                comment.level = level
+            with explicit_timestamps(Comment):
+                Comment.objects.bulk_create(parents, batch_size=self.batch_size)
+            # bulk_create متد save را صدا نمی‌زند
+            for comment, prefix in zip(parents, prefixes):
+                comment.path = prefix + comment_path_segment(comment.id)
+            Comment.objects.bulk_update(parents, ['path'], batch_size=self.batch_size)
+            self.counts['comments'] += len(parents)
+            replies, prefixes = [], []
+            for parent in parents:
+                if rng.random() < 0.3:
+                    for _ in range(rng.randint(1, 2)):
+                        reply = self.comment(
+                            parent.review_id, parent.created_at, (parent.user_id, owners[parent.review_id])
+                        )
+                        reply.parent_comment_id = parent.id
+                        replies.append(reply)
+                        prefixes.append(parent.path)
+            parents = replies
+            if level == 3 or not parents:
+                break
+
+    def comment(self, review_id, after, participants):
+        rng = self.rng
+        # صاحب رویداد و نویسنده نظر یا پاسخ قبلی بیشتر از بقیه در گفتگو شرکت می‌کنند
+        participant = rng.random() < 0.45
+        return Comment(
+            review_id=review_id,
+            user_id=rng.choice(participants) if participant else rng.choice(self.user_ids),
+            comment_text=self.text(rng.randint(3, 20)),
+            created_at=self.moment(after, after + timedelta(days=rng.expovariate(1 / 2))),
+            is_active=rng.random() < 0.95,
+        )
+
+    def tickets(self, count):
+        from Support.models import Ticket, TicketMessage
+
+        rng = self.rng
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            tickets, threads = [], []
+            for _ in range(size):
+                created_by = rng.choice(self.user_ids)
+                created_at = self.now - timedelta(days=rng.uniform(0, 730))
+                messages = []
+                sent_at = created_at
+                for index in range(1 + int(rng.expovariate(1 / 2.5))):
+                    sent_at = self.moment(sent_at, sent_at + timedelta(hours=rng.expovariate(1 / 12)))
+                    messages.append(TicketMessage(
+                        user_id=created_by if index % 2 == 0 else rng.choice(self.staff_ids),
+                        message=self.text(rng.randint(5, 40)),
+                        created_at=sent_at,
+                    ))
+                if created_at < self.now - timedelta(days=30) and rng.random() < 0.6:
+                    status = 'closed'
+                else:
+                    status = 'waiting' if len(messages) % 2 else 'answered'
+                tickets.append(Ticket(
+                    title=self.text(4),
+                    content=self.text(rng.randint(10, 60)),
+                    department='technical' if rng.random() < 0.7 else 'financial',
+                    priority=rng.choices(['low', 'medium', 'high'], weights=[30, 50, 20])[0],
+                    status=status,
+                    created_by_id=created_by,
+                    created_at=created_at,
+                    updated_at=sent_at,
+                ))
+                threads.append(messages)
+            with transaction.atomic(), explicit_timestamps(Ticket, TicketMessage):
+                Ticket.objects.bulk_create(tickets, batch_size=self.batch_size)
+                for ticket, messages in zip(tickets, threads):
+                    for message in messages:
+                        message.ticket_id = ticket.id
+                messages = [message for thread in threads for message in thread]
+                TicketMessage.objects.bulk_create(messages, batch_size=self.batch_size)
+            self.counts['tickets'] += size
+            self.counts['ticket_messages'] += len(messages)
+            self.progress(f"{self.counts['tickets']} tickets")
+
+
+def generate(users, events, tickets, seed=0, batch_size=BATCH_SIZE, progress=None):
+    """Create the synthetic rows and return the number created per kind."""
+    generator = Generator(seed, batch_size, progress)
+    generator.users(users)
+    generator.events(events)
+    generator.tickets(tickets)
+    response_cache.invalidate('event')
+    return generator.counts
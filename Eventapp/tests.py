@@ -1,11 +1,31 @@
 import graphene
-from django.test import TestCase
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
 from graphene.test import Client
 from .schema import schema
+from YekiKamePrj.query_plan import QueryPlanTestMixin
+from .loaders import DataLoaderMiddleware
+from .related import sample_events
+from .images import StoredImage, get_worker, save_once
 from .models import Event, Review, Comment, UserEventRole, EventFeature
 from datetime import datetime, timedelta
 from userapp.models import User  # اضافه کردن مدل User
 from django.utils.timezone import make_aware
+from django.utils import timezone
 
 
 class EventSchemaTests(TestCase):
@@ -452,6 +472,79 @@ class CommentSchemaTests(TestCase):
         self.assertEqual(data[0]["level"], 1, "The level field should be 1.")
 
 
+class TestCommentThread(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone="09123456789", password="password123", fullname="Ali")
+        cls.event = Event.objects.create(
+            title="Event", about_event="About", full_description="Full", max_subscribers=10,
+            start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1), event_owner=cls.user,
+        )
+        cls.review = Review.objects.create(event=cls.event, user=cls.user, rating=4)
+
+    def setUp(self):
+        self.client = Client(schema)
+
+    def comment(self, text, parent=None):
+        return Comment.objects.create(
+            review=self.review, user=self.user, comment_text=text, parent_comment=parent,
+            level=parent.level + 1 if parent else 1, is_active=True,
+        )
+
+    def test_path_extends_parent_path(self):
+        first = self.comment("first")
+        reply = self.comment("reply", first)
+        self.assertEqual(first.path, f"{first.id:010d}")
+        self.assertEqual(reply.path, f"{first.id:010d}{reply.id:010d}")
+        reply.refresh_from_db()
+        self.assertEqual(reply.path, f"{first.id:010d}{reply.id:010d}")
+
+    def test_create_comment_mutation_stores_path(self):
+        parent = self.comment("parent")
+        response = self.client.execute('''
+            mutation {
+                createComment(reviewId: "%s", userId: "%s", commentText: "reply", parentCommentId: "%s") {
+                    comment { id }
+                }
+            }
+        ''' % (self.review.id, self.user.id, parent.id))
+        reply = Comment.objects.get(id=response["data"]["createComment"]["comment"]["id"])
+        self.assertEqual(reply.path, parent.path + f"{reply.id:010d}")
+
+    def test_thread_is_nested_in_display_order_with_one_query(self):
+        first = self.comment("first")
+        second = self.comment("second")
+        first_reply = self.comment("first reply", first)
+        self.comment("second reply", second)
+        self.comment("nested reply", first_reply)
+        self.comment("first reply 2", first)
+        other_review = Review.objects.create(event=self.event, user=self.user, rating=3)
+        Comment.objects.create(review=other_review, user=self.user, comment_text="other", level=1)
+
+        query = '''
+        query {
+            commentThread(reviewId: "%s") {
+                commentText level user { fullname }
+                replies { commentText user { fullname } replies { commentText replies { commentText } } }
+            }
+        }
+        ''' % self.review.id
+        with self.assertNumQueries(1):
+            response = self.client.execute(query)
+
+        self.assertNotIn("errors", response)
+        thread = response["data"]["commentThread"]
+        self.assertEqual([comment["commentText"] for comment in thread], ["first", "second"])
+        self.assertEqual(thread[0]["user"], {"fullname": "Ali"})
+        self.assertEqual(
+            [reply["commentText"] for reply in thread[0]["replies"]], ["first reply", "first reply 2"]
+        )
+        self.assertEqual(
+            thread[0]["replies"][0]["replies"], [{"commentText": "nested reply", "replies": []}]
+        )
+        self.assertEqual([reply["commentText"] for reply in thread[1]["replies"]], ["second reply"])
+
+
 class EventDetailPage(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -1623,4 +1716,950 @@ class TestAdminEventsQuery(TestCase):
         events = response.get("data", {}).get("adminEvents", [])
 
         # بررسی اینکه هیچ رویدادی یافت نشده است
-        self.assertEqual(len(events), 0, "There should be no admin events for a non-existent user.")
\ No newline at end of file
+        self.assertEqual(len(events), 0, "There should be no admin events for a non-existent user.")
+
+class TestDataLoaderBatching(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(phone="09120000000", password="ownerpassword")
+        cls.other_owner = User.objects.create_user(phone="09120000001", password="ownerpassword")
+        cls.members = [
+            User.objects.create_user(phone=f"0912100000{i}", password="memberpassword")
+            for i in range(5)
+        ]
+
+        now = timezone.now()
+        cls.events = [
+            Event.objects.create(
+                title=f"Batched Event {i}",
+                event_category="education",
+                city="تهران",
+                start_date=now + timedelta(days=i),
+                end_date=now + timedelta(days=i, hours=2),
+                registration_end_date=now + timedelta(days=i),
+                max_subscribers=10,
+                event_owner=cls.owner if i % 2 == 0 else cls.other_owner
+            )
+            for i in range(10)
+        ]
+        cls.past_events = [
+            Event.objects.create(
+                title=f"Past Event {i}",
+                event_category="sport",
+                city="مشهد",
+                start_date=now - timedelta(days=10 + i),
+                end_date=now - timedelta(days=9 + i),
+                max_subscribers=10,
+                event_owner=cls.owner if i == 0 else cls.other_owner
+            )
+            for i in range(4)
+        ]
+
+        # دو عضو تایید شده در رویداد اول و یک درخواست در انتظار
+        UserEventRole.objects.create(user=cls.members[0], event=cls.events[0], is_approved=True)
+        UserEventRole.objects.create(user=cls.members[1], event=cls.events[0], is_approved=True, role="admin")
+        UserEventRole.objects.create(user=cls.members[2], event=cls.events[0], is_approved=None)
+        # owner رویداد دوم خودش عضو رویداد است
+        UserEventRole.objects.create(user=cls.other_owner, event=cls.events[1], is_approved=True)
+
+        # اعلان‌های عضو اول
+        for event in cls.events[1:6]:
+            UserEventRole.objects.create(user=cls.members[0], event=event, is_approved=event.id % 2 == 0)
+
+        # رویدادهای گذشته عضو اول
+        for event in cls.past_events[1:]:
+            UserEventRole.objects.create(user=cls.members[0], event=event, is_approved=True, role="admin")
+
+    def setUp(self):
+        self.client = Client(schema, middleware=[DataLoaderMiddleware()])
+
+    def execute(self, query):
+        return self.client.execute(query, context_value=RequestFactory().post('/graphql/'))
+
+    def test_event_owners_are_batched(self):
+        query = '''
+        query {
+            searchEventsByCity(city: "تهران") {
+                id
+                subscriberCount
+                eventOwner {
+                    phone
+                }
+            }
+        }
+        '''
+        # رویدادها + owner ها؛ تعداد اعضا از ستون ذخیره شده خوانده می‌شود
+        with self.assertNumQueries(2):
+            response = self.execute(query)
+
+        events = {int(event["id"]): event for event in response["data"]["searchEventsByCity"]}
+        self.assertEqual(len(events), 10)
+        self.assertEqual(events[self.events[0].id]["subscriberCount"], 3)
+        self.assertEqual(events[self.events[1].id]["subscriberCount"], 2)
+        self.assertEqual(events[self.events[2].id]["eventOwner"]["phone"], self.owner.phone)
+        self.assertEqual(events[self.events[3].id]["eventOwner"]["phone"], self.other_owner.phone)
+
+    def test_batched_results_match_unbatched(self):
+        query = '''
+        query {
+            searchEventsByCity(city: "تهران") {
+                id
+                subscriberCount
+                eventOwner {
+                    phone
+                }
+            }
+        }
+        '''
+        batched = self.execute(query)
+        unbatched = Client(schema).execute(query)
+        self.assertEqual(batched, unbatched)
+
+    def test_notifications_are_batched(self):
+        query = '''
+        query {
+            userNotifications(phone: "%s") {
+                eventId
+                eventTitle
+                statusMessage
+            }
+        }
+        ''' % self.members[0].phone
+        # کاربر + اعلان‌ها + رویدادها
+        with self.assertNumQueries(3):
+            response = self.execute(query)
+
+        notifications = response["data"]["userNotifications"]
+        self.assertEqual(len(notifications), 6)
+        for notification in notifications:
+            self.assertIn(notification["eventTitle"], notification["statusMessage"])
+
+    def test_pending_join_requests_users_are_batched(self):
+        query = '''
+        query {
+            pendingJoinRequests(eventId: %d, ownerPhone: "%s") {
+                user {
+                    phone
+                }
+            }
+        }
+        ''' % (self.events[0].id, self.owner.phone)
+        # رویداد + owner درخواستی + owner رویداد + درخواست‌ها + کاربران
+        with self.assertNumQueries(5):
+            response = self.execute(query)
+
+        requests = response["data"]["pendingJoinRequests"]
+        self.assertEqual([request["user"]["phone"] for request in requests], [self.members[2].phone])
+
+    def test_past_event_roles_are_batched(self):
+        query = '''
+        query {
+            pastEvents(phone: "%s") {
+                title
+                role
+            }
+        }
+        ''' % self.members[0].phone
+        # کاربر + رویدادها + owner ها + نقش‌ها
+        with self.assertNumQueries(4):
+            response = self.execute(query)
+
+        roles = {event["title"]: event["role"] for event in response["data"]["pastEvents"]}
+        self.assertEqual(roles, {"Past Event 1": "admin", "Past Event 2": "admin", "Past Event 3": "admin"})
+
+
+class TestSubscriberCounter(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(phone="09123456789", password="ownerpassword")
+        cls.user = User.objects.create_user(phone="09123456788", password="userpassword")
+        cls.other_user = User.objects.create_user(phone="09123456787", password="userpassword")
+        cls.event = Event.objects.create(
+            title="Counter Event",
+            event_category="social",
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=2),
+            city="تهران",
+            max_subscribers=10,
+            event_owner=cls.owner
+        )
+
+    def setUp(self):
+        self.client = Client(schema)
+
+    def review(self, user, action):
+        mutation = '''
+        mutation {
+            reviewJoinRequest(eventId: %d, userId: %d, action: "%s", ownerPhone: "%s") {
+                success
+            }
+        }
+        ''' % (self.event.id, user.id, action, self.owner.phone)
+        return self.client.execute(mutation)
+
+    def test_counter_follows_join_request_review(self):
+        UserEventRole.objects.create(user=self.user, event=self.event)
+        UserEventRole.objects.create(user=self.other_user, event=self.event)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.approved_subscribers_count, 0)
+
+        self.review(self.user, "approve")
+        self.review(self.other_user, "approve")
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.approved_subscribers_count, 2)
+
+        self.review(self.other_user, "reject")
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.approved_subscribers_count, 1)
+
+    def test_counter_on_role_delete(self):
+        role = UserEventRole.objects.create(user=self.user, event=self.event, is_approved=True)
+        UserEventRole.objects.create(user=self.other_user, event=self.event, is_approved=True)
+        role.delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.approved_subscribers_count, 1)
+
+        UserEventRole.objects.filter(event=self.event).delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.approved_subscribers_count, 0)
+
+    def test_owner_role_is_not_counted(self):
+        UserEventRole.objects.create(user=self.owner, event=self.event, is_approved=True)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.approved_subscribers_count, 0)
+        self.assertEqual(self.event.subscriber_count, 1)
+
+    def test_subscriber_count_reads_stored_column(self):
+        UserEventRole.objects.create(user=self.user, event=self.event, is_approved=True)
+        query = '''
+        query {
+            eventDetails(eventId: "%s") {
+                event {
+                    subscriberCount
+                }
+            }
+        }
+        ''' % self.event.id
+        # فقط یک کوئری برای خود رویداد
+        with self.assertNumQueries(1):
+            response = self.client.execute(query)
+        self.assertEqual(response["data"]["eventDetails"]["event"]["subscriberCount"], 2)
+
+    def test_rebuild_subscriber_counts_command(self):
+        UserEventRole.objects.create(user=self.user, event=self.event, is_approved=True)
+        Event.objects.filter(pk=self.event.pk).update(approved_subscribers_count=7)
+
+        call_command("rebuild_subscriber_counts", stdout=StringIO())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.approved_subscribers_count, 1)
+
+
+# SQLite قفل سطری ندارد و نوشتن‌های همزمان را با خطای locked رد می‌کند
+@skipUnlessDBFeature('has_select_for_update')
+class TestJoinCapacityConcurrency(TransactionTestCase):
+    JOINERS = 200
+    SEATS = 10
+
+    def setUp(self):
+        self.owner = User.objects.create_user(phone="09120000000", password="ownerpassword")
+        self.event = Event.objects.create(
+            title="Popular Event",
+            event_category="entertainment",
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=2),
+            city="تهران",
+            max_subscribers=self.SEATS,
+            event_owner=self.owner
+        )
+        User.objects.bulk_create([
+            User(phone=f"0913{i:07d}", password="!") for i in range(self.JOINERS)
+        ])
+        self.users = list(User.objects.exclude(pk=self.owner.pk).values_list('id', 'phone'))
+
+    def join_and_approve(self, user_id, phone):
+        client = Client(schema)
+        try:
+            client.execute('''
+            mutation {
+                requestJoinEvent(eventId: "%s", phone: "%s") {
+                    success
+                }
+            }
+            ''' % (self.event.id, phone))
+            response = client.execute('''
+            mutation {
+                reviewJoinRequest(eventId: "%s", userId: "%s", action: "approve", ownerPhone: "%s") {
+                    success
+                }
+            }
+            ''' % (self.event.id, user_id, self.owner.phone))
+            return response["data"]["reviewJoinRequest"]["success"]
+        finally:
+            connection.close()
+
+    def test_parallel_joins_never_oversubscribe(self):
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            results = list(executor.map(lambda user: self.join_and_approve(*user), self.users))
+
+        self.event.refresh_from_db()
+        self.assertEqual(results.count(True), self.SEATS)
+        self.assertEqual(UserEventRole.objects.filter(event=self.event, is_approved=True).count(), self.SEATS)
+        self.assertEqual(self.event.approved_subscribers_count, self.SEATS)
+
+
+class TestJoinCapacity(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(phone="09120000000", password="ownerpassword")
+        cls.users = [
+            User.objects.create_user(phone=f"0912100000{i}", password="userpassword") for i in range(3)
+        ]
+        cls.event = Event.objects.create(
+            title="Small Event",
+            event_category="game",
+            start_date=timezone.now() + timedelta(days=1),
+            end_date=timezone.now() + timedelta(days=2),
+            city="تهران",
+            max_subscribers=2,
+            event_owner=cls.owner
+        )
+        for user in cls.users:
+            UserEventRole.objects.create(user=user, event=cls.event)
+
+    def test_approve_rechecks_capacity(self):
+        roles = UserEventRole.objects.filter(event=self.event).order_by('id')
+        self.assertEqual([role.approve() for role in roles], [True, True, False])
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.approved_subscribers_count, 2)
+        self.assertIsNone(roles.last().is_approved)
+
+    def test_review_join_request_reports_full_event(self):
+        for role in UserEventRole.objects.filter(event=self.event).order_by('id')[:2]:
+            role.approve()
+
+        response = Client(schema).execute('''
+        mutation {
+            reviewJoinRequest(eventId: "%s", userId: "%s", action: "approve", ownerPhone: "%s") {
+                success
+                message
+            }
+        }
+        ''' % (self.event.id, self.users[2].id, self.owner.phone))
+        data = response["data"]["reviewJoinRequest"]
+        self.assertFalse(data["success"])
+        self.assertEqual(data["message"], "Event capacity is full.")
+
+
+class TestSearchEvents(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone="09123456789", password="password123")
+        now = timezone.now()
+
+        def create_event(title, about_event="", full_description="", registration_end_date=None):
+            return Event.objects.create(
+                title=title,
+                about_event=about_event,
+                full_description=full_description,
+                start_date=now + timedelta(days=2),
+                end_date=now + timedelta(days=3),
+                registration_end_date=registration_end_date or now + timedelta(days=1),
+                max_subscribers=20,
+                event_owner=cls.user
+            )
+
+        cls.description_match = create_event("Board games night", full_description="Chess and backgammon")
+        cls.title_match = create_event("Chess tournament")
+        cls.about_match = create_event("Weekend meetup", about_event="Casual chess for beginners")
+        cls.expired = create_event(
+            "Chess classic", registration_end_date=now - timedelta(days=1)
+        )
+        for i in range(5):
+            create_event(f"Football match {i}")
+
+    def setUp(self):
+        self.client = Client(schema)
+
+    def search(self, text, limit=10, after=None):
+        query = '''
+        query ($text: String!, $limit: Int, $after: String) {
+            searchEvents(text: $text, limit: $limit, after: $after) {
+                events {
+                    id
+                    title
+                }
+                nextCursor
+                hasNextPage
+            }
+        }
+        '''
+        response = self.client.execute(query, variables={"text": text, "limit": limit, "after": after})
+        return response["data"]["searchEvents"]
+
+    def test_results_are_ranked_by_field(self):
+        page = self.search("chess")
+        titles = [event["title"] for event in page["events"]]
+        self.assertEqual(titles, ["Chess tournament", "Weekend meetup", "Board games night"])
+        self.assertFalse(page["hasNextPage"])
+        self.assertIsNone(page["nextCursor"])
+
+    def test_cursor_pagination_has_no_overlap(self):
+        first_page = self.search("football", limit=2)
+        self.assertTrue(first_page["hasNextPage"])
+
+        seen = [event["id"] for event in first_page["events"]]
+        cursor = first_page["nextCursor"]
+        while cursor:
+            page = self.search("football", limit=2, after=cursor)
+            seen.extend(event["id"] for event in page["events"])
+            cursor = page["nextCursor"]
+
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_invalid_cursor(self):
+        response = self.client.execute('''
+        query {
+            searchEvents(text: "chess", after: "not-a-cursor") {
+                nextCursor
+            }
+        }
+        ''')
+        self.assertEqual(response["errors"][0]["message"], "Invalid cursor.")
+
+    def test_search_events_by_title_keeps_limit(self):
+        response = self.client.execute('''
+        query {
+            searchEventsByTitle(title: "football", limit: 3) {
+                title
+            }
+        }
+        ''')
+        self.assertEqual(len(response["data"]["searchEventsByTitle"]), 3)
+
+
+class TestRelatedEventsSampling(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone="09123456789", password="password123")
+        now = timezone.now()
+
+        def create_event(title, city="تهران", event_category="education", registration_end_date=None):
+            return Event.objects.create(
+                title=title,
+                event_category=event_category,
+                city=city,
+                start_date=now + timedelta(days=2),
+                end_date=now + timedelta(days=3),
+                registration_end_date=registration_end_date or now + timedelta(days=1),
+                max_subscribers=20,
+                event_owner=cls.user
+            )
+
+        cls.main_event = create_event("Main Event")
+        cls.related = [create_event(f"Related Event {i}") for i in range(12)]
+        create_event("Other Category", event_category="sport")
+        create_event("Other City", city="شیراز")
+        create_event("Closed Event", registration_end_date=now - timedelta(days=1))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client(schema)
+        self.query = '''
+        query {
+            relatedEvents(eventId: "%s") {
+                id
+                title
+            }
+        }
+        ''' % self.main_event.id
+
+    def test_related_events_are_active_and_distinct(self):
+        related_ids = {str(event.id) for event in self.related}
+        for _ in range(10):
+            cache.clear()
+            events = self.client.execute(self.query)["data"]["relatedEvents"]
+            ids = [event["id"] for event in events]
+            self.assertEqual(len(ids), 5)
+            self.assertEqual(len(set(ids)), 5)
+            self.assertTrue(set(ids) <= related_ids)
+
+    def test_sample_wraps_around_random_point(self):
+        events = sample_events("تهران", "education", 50)
+        self.assertEqual(len(events), 13)
+
+    def test_pool_is_cached(self):
+        self.client.execute(self.query)
+        # فقط رویداد اصلی از دیتابیس خوانده می‌شود
+        with self.assertNumQueries(1):
+            events = self.client.execute(self.query)["data"]["relatedEvents"]
+        self.assertEqual(len(events), 5)
+
+
+class TestEventQueryPlans(QueryPlanTestMixin, TestCase):
+    EVENTS = 100000
+    CITIES = 250
+    TABLES = ("Eventapp_event", "Eventapp_usereventrole")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owners = [
+            User.objects.create_user(phone=f"0912{i:07d}", password="password123") for i in range(20)
+        ]
+        cls.member = User.objects.create_user(phone="09130000000", password="password123")
+        categories = [choice for choice, _ in Event.Category_CHOICES]
+        now = timezone.now()
+
+        events = [
+            Event(
+                title=f"Event {i}",
+                event_category=categories[i % len(categories)],
+                about_event="",
+                full_description="",
+                city=f"city-{i % cls.CITIES}",
+                neighborhood=f"neighborhood-{i % 20}",
+                start_date=now + timedelta(hours=i % 5000 - 2500),
+                end_date=now + timedelta(hours=i % 5000 - 2400),
+                registration_end_date=now + timedelta(hours=i % 5000 - 2600),
+                max_subscribers=50,
+                event_owner=cls.owners[i % len(cls.owners)]
+            )
+            for i in range(cls.EVENTS)
+        ]
+        Event.objects.bulk_create(events, batch_size=5000)
+
+        joined = Event.objects.filter(city="city-7").values_list("id", flat=True)
+        UserEventRole.objects.bulk_create([
+            UserEventRole(user=cls.member, event_id=event_id, is_approved=index % 3 != 0)
+            for index, event_id in enumerate(joined)
+        ])
+        cls.event = Event.objects.filter(city="city-7").first()
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        self.client = Client(schema)
+
+    def assertQueryUsesIndexes(self, query):
+        def execute():
+            response = self.client.execute(query)
+            self.assertNotIn("errors", response)
+
+        self.assertNoSequentialScan(execute, self.TABLES)
+
+    def test_filtered_events(self):
+        self.assertQueryUsesIndexes('query { filteredEvents(city: "city-3") { id } }')
+        self.assertQueryUsesIndexes('query { filteredEvents(city: "city-3", eventCategory: "sport") { id } }')
+        self.assertQueryUsesIndexes('query { filteredEvents(city: "city-3", neighborhood: "neighborhood-3") { id } }')
+
+    def test_search_events_by_city(self):
+        self.assertQueryUsesIndexes('query { searchEventsByCity(city: "city-3") { id } }')
+
+    def test_recent_events(self):
+        self.assertQueryUsesIndexes('query { recentEvents { id } }')
+
+    def test_user_events(self):
+        self.assertQueryUsesIndexes('query { userEvents(phone: "%s") { id } }' % self.member.phone)
+        self.assertQueryUsesIndexes('query { adminEvents(phone: "%s") { id } }' % self.member.phone)
+
+    def test_events_by_owner(self):
+        self.assertQueryUsesIndexes('query { eventsByOwner(phone: "%s") { id } }' % self.owners[0].phone)
+
+    def test_pending_join_requests(self):
+        self.assertQueryUsesIndexes(
+            'query { pendingJoinRequests(eventId: %d, ownerPhone: "%s") { id } }'
+            % (self.event.id, self.event.event_owner.phone)
+        )
+
+    def test_filtered_events_page(self):
+        response = self.client.execute('query { filteredEventsPage(city: "city-3", limit: 5) { nextCursor } }')
+        cursor = response["data"]["filteredEventsPage"]["nextCursor"]
+        self.assertQueryUsesIndexes(
+            'query { filteredEventsPage(city: "city-3", limit: 5, after: "%s") { events { id } } }' % cursor
+        )
+
+
+class TestCursorPagination(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(phone="09123456789", password="password123")
+        cls.reviewer = User.objects.create_user(phone="09123456780", password="password123")
+        start_date = timezone.now() + timedelta(days=2)
+        # همه رویدادها start_date یکسان دارند تا ترتیب با id شکسته شود
+        cls.events = [
+            Event.objects.create(
+                title=f"Event {i}",
+                city="Tehran",
+                event_category="sport" if i % 2 else "education",
+                start_date=start_date,
+                end_date=start_date + timedelta(hours=2),
+                registration_end_date=start_date - timedelta(days=1),
+                max_subscribers=20,
+                event_owner=cls.owner
+            )
+            for i in range(7)
+        ]
+        cls.reviews = [
+            Review.objects.create(event=cls.events[0], user=cls.reviewer, comment_text=f"Review {i}", rating=4)
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client = Client(schema)
+
+    def fetch_pages(self, field, items, arguments, limit):
+        ids = []
+        after = None
+        while True:
+            after_argument = f', after: "{after}"' if after else ''
+            response = self.client.execute(
+                f'query {{ {field}({arguments}, limit: {limit}{after_argument}) '
+                f'{{ {items} {{ id }} nextCursor hasNextPage }} }}'
+            )
+            self.assertNotIn("errors", response)
+            page = response["data"][field]
+            self.assertLessEqual(len(page[items]), limit)
+            ids.extend(int(item["id"]) for item in page[items])
+            self.assertEqual(page["hasNextPage"], page["nextCursor"] is not None)
+            if not page["hasNextPage"]:
+                return ids
+            after = page["nextCursor"]
+
+    def test_events_pages_do_not_overlap(self):
+        ids = self.fetch_pages("searchEventsByCityPage", "events", 'city: "Tehran"', limit=3)
+        self.assertEqual(ids, sorted((event.id for event in self.events), reverse=True))
+
+    def test_filtered_events_page_keeps_filters(self):
+        ids = self.fetch_pages(
+            "filteredEventsPage", "events", 'city: "Tehran", eventCategory: "sport"', limit=2
+        )
+        expected = [event.id for event in self.events if event.event_category == "sport"]
+        self.assertEqual(ids, sorted(expected, reverse=True))
+
+    def test_reviews_pages_do_not_overlap(self):
+        ids = self.fetch_pages("reviewsByEventPage", "reviews", f"eventId: {self.events[0].id}", limit=2)
+        self.assertEqual(ids, sorted((review.id for review in self.reviews), reverse=True))
+
+    def test_page_of_unknown_owner_is_empty(self):
+        response = self.client.execute(
+            'query { eventsByOwnerPage(phone: "09000000000") { events { id } hasNextPage } }'
+        )
+        self.assertEqual(response["data"]["eventsByOwnerPage"], {"events": [], "hasNextPage": False})
+
+    def test_invalid_cursor(self):
+        response = self.client.execute(
+            'query { searchEventsByCityPage(city: "Tehran", after: "not-a-cursor") { events { id } } }'
+        )
+        self.assertEqual(response["errors"][0]["message"], "Invalid cursor.")
+
+
+
+class TestRatingAggregates(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(phone="09123456789", password="password123")
+        cls.reviewer = User.objects.create_user(phone="09123456780", password="password123")
+        cls.event = Event.objects.create(
+            title="Event", about_event="About", full_description="Full", max_subscribers=10,
+            start_date=timezone.now() - timedelta(days=2), end_date=timezone.now() - timedelta(days=1),
+            event_owner=cls.owner,
+        )
+
+    def setUp(self):
+        self.client = Client(schema)
+
+    def summary(self):
+        self.event.refresh_from_db()
+        return self.event.rating_summary
+
+    def test_create_review_mutation_updates_aggregates(self):
+        for rating in (5, 4.5, 2):
+            response = self.client.execute('''
+                mutation {
+                    createReview(eventId: "%s", userId: "%s", rating: %s, commentText: "ok") { review { id } }
+                }
+            ''' % (self.event.id, self.reviewer.id, rating))
+            self.assertNotIn("errors", response)
+        self.assertEqual(
+            self.summary(), {"count": 3, "sum": 11.5, "average": 3.83, "histogram": [0, 0, 1, 0, 1, 1]}
+        )
+
+    def test_changing_and_deleting_reviews(self):
+        review = Review.objects.create(event=self.event, user=self.reviewer, rating=1)
+        Review.objects.create(event=self.event, user=self.owner, rating=3)
+        review.rating = 4
+        review.save()
+        self.assertEqual(self.summary()["histogram"], [0, 0, 0, 1, 1, 0])
+
+        review.delete()
+        self.assertEqual(self.summary(), {"count": 1, "sum": 3, "average": 3, "histogram": [0, 0, 0, 1, 0, 0]})
+        Review.objects.filter(event=self.event).delete()
+        self.assertEqual(self.summary(), {"count": 0, "sum": 0, "average": None, "histogram": [0] * 6})
+
+    def test_rebuild_command(self):
+        Review.objects.create(event=self.event, user=self.reviewer, rating=0)
+        Review.objects.create(event=self.event, user=self.owner, rating=5)
+        expected = self.summary()
+        Event.objects.filter(pk=self.event.pk).update(rating_count=9, rating_sum=1, rating_count_5=7)
+
+        call_command("rebuild_rating_aggregates", stdout=StringIO())
+        self.assertEqual(self.summary(), expected)
+        self.assertEqual(expected["histogram"], [1, 0, 0, 0, 0, 1])
+
+    def test_rating_on_event_lists_needs_no_extra_queries(self):
+        Review.objects.create(event=self.event, user=self.reviewer, rating=4)
+        with CaptureQueriesContext(connection) as without_rating:
+            self.client.execute('query { eventsByOwner(phone: "09123456789") { id title } }')
+        with CaptureQueriesContext(connection) as with_rating:
+            response = self.client.execute(
+                'query { eventsByOwner(phone: "09123456789") { id title rating { count average histogram } } }'
+            )
+        self.assertEqual(len(with_rating), len(without_rating))
+        self.assertEqual(
+            response["data"]["eventsByOwner"][0]["rating"], {"count": 1, "average": 4.0, "histogram": [0, 0, 0, 0, 1, 0]}
+        )
+
+    def test_event_details_rating(self):
+        Review.objects.create(event=self.event, user=self.reviewer, rating=2.5)
+        response = self.client.execute(
+            'query { eventDetails(eventId: "%s") { event { rating { count sum average } } } }' % self.event.id
+        )
+        self.assertEqual(response["data"]["eventDetails"]["event"]["rating"], {"count": 1, "sum": 2.5, "average": 2.5})
+
+
+def make_image_upload(name="photo.jpg", size=(1600, 900), image_format="JPEG", mode="RGB", **save_options):
+    buffer = BytesIO()
+    Image.new(mode, size, "red").save(buffer, image_format, **save_options)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+class EventImageMixin:
+    CREATE_EVENT = '''
+        mutation ($image: Upload) {
+            createEvent(
+                title: "Photo event", eventCategory: "social", aboutEvent: "About", image: $image,
+                startDate: "2030-01-02T09:00:00Z", endDate: "2030-01-02T17:00:00Z",
+                registrationStartDate: "2029-12-01T09:00:00Z", registrationEndDate: "2030-01-01T09:00:00Z",
+                province: "تهران", city: "تهران", fullDescription: "Full", maxSubscribers: 10,
+                eventOwnerPhone: "09123456789"
+            ) {
+                event { id image imageVariants { width height format url } }
+            }
+        }
+    '''
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, IMAGE_VARIANT_WIDTHS=[320, 640])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = Client(schema)
+
+    def create_event(self, image):
+        return self.client.execute(self.CREATE_EVENT, variables={"image": image})
+
+
+class TestEventImages(EventImageMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(phone="09123456789", password="password123")
+
+    def test_upload_is_stored_without_metadata(self):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera maker"
+        exif[0x0112] = 6  # چرخش ۹۰ درجه
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.create_event(make_image_upload(size=(400, 200), exif=exif.tobytes()))
+        self.assertNotIn("errors", response)
+
+        event = Event.objects.get(pk=response["data"]["createEvent"]["event"]["id"])
+        self.assertEqual(response["data"]["createEvent"]["event"]["image"], default_storage.url(event.image.name))
+        with default_storage.open(event.image.name) as file, Image.open(file) as stored:
+            self.assertEqual(stored.format, "JPEG")
+            # orientation اعمال شده و EXIF حذف شده است
+            self.assertEqual(stored.size, (200, 400))
+            self.assertEqual(len(stored.getexif()), 0)
+
+    def test_invalid_uploads_are_rejected(self):
+        not_an_image = SimpleUploadedFile("photo.jpg", b"not an image", content_type="image/jpeg")
+        gif = make_image_upload("photo.gif", image_format="GIF", mode="P")
+        for upload in (not_an_image, gif):
+            response = self.create_event(upload)
+            self.assertIn("errors", response)
+        with override_settings(IMAGE_MAX_PIXELS=1000):
+            response = self.create_event(make_image_upload())
+        self.assertIn("too large", response["errors"][0]["message"])
+        self.assertFalse(Event.objects.exists())
+
+    def test_variants_are_exposed(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.create_event(make_image_upload("transparent.png", image_format="PNG", mode="RGBA"))
+        event = Event.objects.get(pk=response["data"]["createEvent"]["event"]["id"])
+        self.assertEqual(event.image_variants, [])
+
+        call_command("generate_image_variants", stdout=StringIO())
+        response = self.client.execute(
+            'query { eventDetails(eventId: "%s") { event { imageVariants { width height format url } } } }' % event.id
+        )
+        variants = response["data"]["eventDetails"]["event"]["imageVariants"]
+        self.assertEqual(
+            [(variant["format"], variant["width"], variant["height"]) for variant in variants],
+            [("jpeg", 320, 180), ("jpeg", 640, 360), ("webp", 320, 180), ("webp", 640, 360)],
+        )
+        for variant in variants:
+            name = variant["url"][len("/media/"):]
+            with default_storage.open(name) as file, Image.open(file) as stored:
+                self.assertEqual(stored.format, variant["format"].upper())
+                self.assertEqual(stored.width, variant["width"])
+
+    def test_concurrent_saves_of_the_same_content_share_one_file(self):
+        name = f"event_images/{'a' * 64}.jpg"
+        with ThreadPoolExecutor(4) as pool:
+            created = list(pool.map(lambda _: save_once(name, ContentFile(b"same bytes")), range(8)))
+        self.assertEqual(created.count(True), 1)
+        self.assertEqual(default_storage.listdir("event_images")[1], [f"{'a' * 64}.jpg"])
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), b"same bytes")
+
+    def test_failed_event_keeps_a_file_used_by_another_event(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.create_event(make_image_upload())
+        name = Event.objects.get(pk=response["data"]["createEvent"]["event"]["id"]).image.name
+
+        failing = self.CREATE_EVENT.replace("maxSubscribers: 10", "maxSubscribers: -1")
+        with mock.patch("Eventapp.schema.store_upload", return_value=StoredImage(name, created=True)):
+            response = self.client.execute(failing, variables={"image": make_image_upload()})
+        self.assertIn("errors", response)
+        self.assertTrue(default_storage.exists(name))
+
+    def test_same_image_reuses_file_and_variants(self):
+        upload = make_image_upload()
+        content = upload.read()
+        with self.captureOnCommitCallbacks(execute=False):
+            first = self.create_event(SimpleUploadedFile("a.jpg", content))
+        call_command("generate_image_variants", stdout=StringIO())
+        with mock.patch("Eventapp.signals.schedule_variants") as schedule_variants:
+            second = self.create_event(SimpleUploadedFile("b.jpg", content))
+        schedule_variants.assert_not_called()
+
+        first, second = (
+            Event.objects.get(pk=response["data"]["createEvent"]["event"]["id"]) for response in (first, second)
+        )
+        self.assertEqual(first.image.name, f"event_images/{hashlib.sha256(content).hexdigest()}.jpg")
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(second.image_variants, first.image_variants)
+        self.assertEqual(len(second.image_variants), 4)
+
+    def test_small_images_are_not_upscaled(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.create_event(make_image_upload(size=(500, 500)))
+        call_command("generate_image_variants", stdout=StringIO())
+        event = Event.objects.get(pk=response["data"]["createEvent"]["event"]["id"])
+        self.assertEqual({variant["width"] for variant in event.image_variants}, {320})
+
+    def test_command_accepts_legacy_image_urls(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.create_event(make_image_upload())
+        event = Event.objects.get(pk=response["data"]["createEvent"]["event"]["id"])
+        Event.objects.filter(pk=event.pk).update(image="/media/" + event.image.name)
+
+        call_command("generate_image_variants", stdout=StringIO())
+        event.refresh_from_db()
+        self.assertFalse(event.image.name.startswith("/"))
+        self.assertEqual(len(event.image_variants), 4)
+
+    def test_changing_the_image_replaces_the_variants(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.create_event(make_image_upload())
+        call_command("generate_image_variants", stdout=StringIO())
+        event = Event.objects.get(pk=response["data"]["createEvent"]["event"]["id"])
+        old_variants = event.image_variants
+
+        new_image = default_storage.save("event_images/new.png", make_image_upload(image_format="PNG"))
+        with mock.patch("Eventapp.signals.schedule_variants") as schedule_variants:
+            response = self.client.execute(
+                'mutation { updateEventDetail(eventId: "%s", phone: "09123456789", image: "%s") { success } }'
+                % (event.id, new_image)
+            )
+        self.assertTrue(response["data"]["updateEventDetail"]["success"])
+        schedule_variants.assert_called_once_with(event.id, new_image)
+        event.refresh_from_db()
+        self.assertEqual(event.image_variants, [])
+
+        # تصویر قبلی دیگر نسخه‌های رویداد را به رویدادهای جدید با همان تصویر نمی‌دهد
+        call_command("generate_image_variants", stdout=StringIO())
+        event.refresh_from_db()
+        self.assertEqual(len(event.image_variants), 4)
+        self.assertTrue(all(variant["name"].startswith("event_images/variants/new_") for variant in event.image_variants))
+        self.assertFalse({variant["name"] for variant in event.image_variants} & {v["name"] for v in old_variants})
+
+    def test_saving_without_changing_the_image_keeps_the_variants(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.create_event(make_image_upload())
+        call_command("generate_image_variants", stdout=StringIO())
+        event = Event.objects.get(pk=response["data"]["createEvent"]["event"]["id"])
+        with mock.patch("Eventapp.signals.schedule_variants") as schedule_variants:
+            event.title = "Renamed"
+            event.save()
+        schedule_variants.assert_not_called()
+        event.refresh_from_db()
+        self.assertEqual(len(event.image_variants), 4)
+
+
+class TestEventImageWorker(EventImageMixin, TransactionTestCase):
+    def test_variants_are_created_in_background(self):
+        User.objects.create_user(phone="09123456789", password="password123")
+        response = self.create_event(make_image_upload())
+        self.assertNotIn("errors", response)
+        get_worker().flush(timeout=30)
+
+        event = Event.objects.get(pk=response["data"]["createEvent"]["event"]["id"])
+        self.assertEqual(len(event.image_variants), 4)
+
+
+@override_settings(DEBUG=True)
+class TestSyntheticData(TestCase):
+    def generate(self, **options):
+        call_command("generate_synthetic_data", users=300, events=400, tickets=30, stdout=StringIO(), **options)
+
+    def test_counters_and_relations_are_consistent(self):
+        self.generate()
+        self.assertEqual(User.objects.count(), 300)
+        self.assertEqual(Event.objects.count(), 400)
+        self.assertTrue(UserEventRole.objects.exists())
+        self.assertTrue(Comment.objects.filter(level=2).exists())
+
+        events = Event.objects.order_by("id")
+        counters = ("id", "approved_subscribers_count", "rating_count", "rating_sum", "rating_count_5")
+        counts = list(events.values_list(*counters))
+        events.rebuild_subscriber_counts()
+        events.rebuild_rating_aggregates()
+        self.assertEqual(list(events.values_list(*counters)), counts)
+        self.assertFalse(Event.objects.filter(approved_subscribers_count__gt=F("max_subscribers")).exists())
+        # فقط رویدادهای تمام شده نظر دارند و تاریخ‌ها در آینده نیستند
+        self.assertFalse(Review.objects.filter(event__end_date__gt=F("created_at")).exists())
+        self.assertFalse(Comment.objects.filter(created_at__gt=timezone.now()).exists())
+        self.assertFalse(Comment.objects.exclude(parent_comment=None).filter(
+            level__lte=F("parent_comment__level")
+        ).exists())
+        for path, parent_path in Comment.objects.values_list("path", "parent_comment__path"):
+            self.assertTrue(path.startswith(parent_path or ""))
+            self.assertGreater(len(path), len(parent_path or ""))
+
+    def test_same_seed_gives_same_data(self):
+        self.generate(seed=3)
+        first = list(Event.objects.order_by("id").values_list("title", "city", "event_owner__phone"))
+        Event.objects.all().delete()
+        User.objects.all().delete()
+        self.generate(seed=3)
+        self.assertEqual(list(Event.objects.order_by("id").values_list("title", "city", "event_owner__phone")), first)
+
+    @override_settings(DEBUG=False)
+    def test_refuses_without_debug(self):
+        with self.assertRaises(CommandError):
+            self.generate()
+        self.assertFalse(User.objects.exists())
@@ -1,9 +1,25 @@
 from django.contrib import admin
+from django.utils import timezone
 
-from .models import FAQ, TicketMessage, Ticket, ContactUs
+from .models import FAQ, TicketMessage, Ticket, ContactUs, OutboxEmail
 
 # ثبت مدل‌ها در پنل ادمین
 admin.site.register(FAQ)
 admin.site.register(TicketMessage)
 admin.site.register(Ticket)
-admin.site.register(ContactUs)
\ No newline at end of file
+admin.site.register(ContactUs)
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    readonly_fields = ('attempts', 'last_error', 'created_at', 'sent_at')
+    actions = ['retry_now']
+
+    @admin.action(description="ارسال دوباره در اولین فرصت")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(
+            status='pending', attempts=0, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} ایمیل دوباره در صف قرار گرفت.")
@@ -5,3 +5,6 @@ class SupportConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Support'
     verbose_name = 'جداول پشتیبانی'
+
+    def ready(self):
+        from . import signals  # noqa: F401
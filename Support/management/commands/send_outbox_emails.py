@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Support.outbox import BATCH_SIZE, send_pending_emails
+
+
+class Command(BaseCommand):
+    help = "Send queued emails from the outbox, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Send the due emails and exit.")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to sleep when the queue is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_pending_emails(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent} emails, {failed} failed.")
+            # اگر batch پر بود احتمالا ایمیل‌های بیشتری در صف هست و بدون مکث ادامه می‌دهیم
+            if sent + failed < options['batch_size']:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
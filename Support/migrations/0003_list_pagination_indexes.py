@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Support', '0002_notice'),
+        ('userapp', '0002_usersession'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='ticket_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticketmessage',
+            index=models.Index(fields=['ticket', 'created_at', 'id'], name='ticketmsg_ticket_created_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-18 09:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Support', '0003_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=512, verbose_name='عنوان')),
+                ('body', models.TextField(verbose_name='متن')),
+                ('from_email', models.CharField(max_length=254, verbose_name='فرستنده')),
+                ('recipients', models.JSONField(default=list, verbose_name='گیرندگان')),
+                ('status', models.CharField(choices=[('pending', 'در صف ارسال'), ('sent', 'ارسال شده'), ('failed', 'ناموفق')], default='pending', max_length=10, verbose_name='وضعیت')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='تعداد تلاش')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='زمان تلاش بعدی')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخرین خطا')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='تاریخ ارسال')),
+            ],
+            options={
+                'verbose_name': 'ایمیل در صف',
+                'verbose_name_plural': 'صف ایمیل\u200cها',
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['next_attempt_at'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from userapp.models import User
 
 
@@ -49,6 +50,10 @@ class Ticket(models.Model):
     class Meta:
         verbose_name = "تیکت پشتیبانی"
         verbose_name_plural = "تیکت‌های پشتیبانی"
+        indexes = [
+            # userTickets
+            models.Index(fields=['created_by', '-created_at', '-id'], name='ticket_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.created_by.fullname}"
@@ -63,6 +68,10 @@ class TicketMessage(models.Model):
     class Meta:
         verbose_name = "پیام تیکت"
         verbose_name_plural = "پیام‌های تیکت"
+        indexes = [
+            # ticketMessages
+            models.Index(fields=['ticket', 'created_at', 'id'], name='ticketmsg_ticket_created_idx'),
+        ]
 
     def __str__(self):
         return f"پیام از {self.user.fullname} برای تیکت: {self.ticket.title}"
@@ -96,4 +105,38 @@ class Notice(models.Model):
         verbose_name_plural = "اطلاعیه‌ها"
 
     def __str__(self):
-        return f"{self.title} - {self.content[:50]} - {self.expiration_date}"
\ No newline at end of file
+        return f"{self.title} - {self.content[:50]} - {self.expiration_date}"
+
+class OutboxEmail(models.Model):
+    """ایمیل‌های در صف ارسال؛ توسط دستور send_outbox_emails فرستاده می‌شوند"""
+    STATUS_CHOICES = [
+        ('pending', 'در صف ارسال'),
+        ('sent', 'ارسال شده'),
+        ('failed', 'ناموفق'),
+    ]
+
+    subject = models.CharField(max_length=512, verbose_name="عنوان")
+    body = models.TextField(verbose_name="متن")
+    from_email = models.CharField(max_length=254, verbose_name="فرستنده")
+    recipients = models.JSONField(default=list, verbose_name="گیرندگان")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="وضعیت")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="تعداد تلاش")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="زمان تلاش بعدی")
+    last_error = models.TextField(blank=True, verbose_name="آخرین خطا")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="تاریخ ارسال")
+
+    class Meta:
+        verbose_name = "ایمیل در صف"
+        verbose_name_plural = "صف ایمیل‌ها"
+        indexes = [
+            # worker فقط ایمیل‌های در صف را به ترتیب زمان تلاش بعدی می‌خواند
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(status='pending'),
+                name='outbox_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} - {self.get_status_display()}"
@@ -0,0 +1,116 @@
+"""
+Transactional email outbox.
+
+``enqueue_email`` stores the message in the same transaction as the data it
+belongs to, so a request never waits on SMTP and an SMTP failure can't roll it
+back. ``send_pending_emails`` (run in a loop by ``manage.py
+send_outbox_emails``) claims a batch of due messages in a short transaction.
+The claim moves ``next_attempt_at`` ``CLAIM_TIMEOUT`` ahead, which works as a
+lease. The worker then sends the batch over one SMTP connection outside the
+transaction and saves each message's result on its own. Failures are
+rescheduled with exponential backoff. If a worker dies partway, the
+messages it has not sent are picked up again once the lease expires.
+"""
+import logging
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+# فاصله تلاش‌ها: 30 ثانیه، 1 دقیقه، 2 دقیقه، ... حداکثر یک ساعت
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 60 * 60
+# مدت اجاره ایمیل‌های برداشته شده؛ باید از زمان ارسال یک batch بیشتر باشد
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+
+def enqueue_email(subject, message, from_email, recipient_list):
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY))
+
+
+def _mark_failed_attempt(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = 'failed'
+        logger.error("Giving up on outbox email %s after %s attempts: %s", email.id, email.attempts, error)
+    else:
+        email.next_attempt_at = now + retry_delay(email.attempts)
+        logger.warning("Outbox email %s failed (attempt %s): %s", email.id, email.attempts, error)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def claim_due_emails(batch_size=BATCH_SIZE):
+    """Lease up to ``batch_size`` due emails to this worker for ``CLAIM_TIMEOUT``."""
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked تا چند worker هم‌زمان یک ایمیل را برندارند؛ قفل فقط تا پایان همین تراکنش کوتاه است
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                status='pending', next_attempt_at__lte=now
+            ).order_by('next_attempt_at')[:batch_size]
+        )
+        if batch:
+            # ایمیل‌هایی که worker آن‌ها را نفرستاده (مثلاً crash کرده) بعد از این زمان دوباره برداشته می‌شوند
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=now + CLAIM_TIMEOUT
+            )
+    return batch
+
+
+def send_pending_emails(batch_size=BATCH_SIZE):
+    """Send one batch of due emails; return ``(sent, failed)`` counts."""
+    sent = failed = 0
+    batch = claim_due_emails(batch_size)
+    if not batch:
+        return sent, failed
+
+    # ارسال بیرون از تراکنش؛ وضعیت هر ایمیل جداگانه ذخیره می‌شود تا خطای بعدی آن را برنگرداند
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in batch:
+            _mark_failed_attempt(email, error, timezone.now())
+        return sent, len(batch)
+
+    try:
+        for email in batch:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=email.recipients,
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                _mark_failed_attempt(email, error, timezone.now())
+                failed += 1
+                continue
+            email.status = 'sent'
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            email.last_error = ''
+            email.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+            sent += 1
+    finally:
+        connection.close()
+    return sent, failed
@@ -1,9 +1,11 @@
 import graphene
 from graphene_django.types import DjangoObjectType
 from .models import FAQ, ContactUs, Ticket, TicketMessage, Notice
-from django.core.mail import send_mail
+from django.db import transaction
 from userapp.models import User
 from django.utils.timezone import now
+from .outbox import enqueue_email
+from YekiKamePrj.pagination import DEFAULT_PAGE_SIZE, PageType, paginate
 
 
 class UserType(DjangoObjectType):
@@ -41,11 +43,31 @@ class TicketMessageType(DjangoObjectType):
         return self.user
 
 
+class TicketPageType(PageType):
+    tickets = graphene.List(TicketType)
+
+
+class TicketMessagePageType(PageType):
+    messages = graphene.List(TicketMessageType)
+
+
 class Query(graphene.ObjectType):
     all_faqs = graphene.List(FAQType)
     active_notices = graphene.List(NoticeType)
     user_tickets = graphene.List(TicketType, phone=graphene.String(required=True))
     ticket_messages = graphene.List(TicketMessageType, ticket_id=graphene.ID(required=True))
+    user_tickets_page = graphene.Field(
+        TicketPageType,
+        phone=graphene.String(required=True),
+        limit=graphene.Int(default_value=DEFAULT_PAGE_SIZE),
+        after=graphene.String()
+    )
+    ticket_messages_page = graphene.Field(
+        TicketMessagePageType,
+        ticket_id=graphene.ID(required=True),
+        limit=graphene.Int(default_value=DEFAULT_PAGE_SIZE),
+        after=graphene.String()
+    )
 
     def resolve_active_notices(self, info):
         return Notice.objects.filter(expiration_date__gt=now())
@@ -67,6 +89,16 @@ class Query(graphene.ObjectType):
         except Ticket.DoesNotExist:
             return []
 
+    def resolve_user_tickets_page(self, info, phone, limit, after=None):
+        tickets = Query.resolve_user_tickets(self, info, phone)
+        tickets, next_cursor = paginate(tickets, ('-created_at', '-id'), limit, after)
+        return TicketPageType(tickets=tickets, next_cursor=next_cursor)
+
+    def resolve_ticket_messages_page(self, info, ticket_id, limit, after=None):
+        messages = Query.resolve_ticket_messages(self, info, ticket_id)
+        messages, next_cursor = paginate(messages, ('created_at', 'id'), limit, after)
+        return TicketMessagePageType(messages=messages, next_cursor=next_cursor)
+
 
 class ContactUsType(DjangoObjectType):
     class Meta:
@@ -84,22 +116,22 @@ class CreateContactUs(graphene.Mutation):
     contact = graphene.Field(ContactUsType)
 
     def mutate(self, info, full_name, email, subject, message):
-        # ایجاد رکورد ContactUs
-        contact = ContactUs.objects.create(
-            full_name=full_name,
-            email=email,
-            subject=subject,
-            message=message
-        )
+        with transaction.atomic():
+            # ایجاد رکورد ContactUs
+            contact = ContactUs.objects.create(
+                full_name=full_name,
+                email=email,
+                subject=subject,
+                message=message
+            )
 
-        # ارسال ایمیل به صورت خودکار
-        send_mail(
-            subject=f"{full_name} - {subject}",
-            message=message,
-            from_email="no-reply@yekikame.com",  # آدرس ایمیل فرستنده
-            recipient_list=["aliahmadi79sh@gmail.com"],
-            fail_silently=False,
-        )
+            # ایمیل در صف قرار می‌گیرد و توسط send_outbox_emails ارسال می‌شود
+            enqueue_email(
+                subject=f"{full_name} - {subject}",
+                message=message,
+                from_email="no-reply@yekikame.com",  # آدرس ایمیل فرستنده
+                recipient_list=["aliahmadi79sh@gmail.com"],
+            )
 
         return CreateContactUs(contact=contact)
 
@@ -0,0 +1,18 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from YekiKamePrj import response_cache
+from .models import FAQ, Notice
+
+
+@receiver([post_save, post_delete], sender=FAQ)
+def invalidate_faq_responses(sender, **kwargs):
+    transaction.on_commit(partial(response_cache.invalidate, 'faq'))
+
+
+@receiver([post_save, post_delete], sender=Notice)
+def invalidate_notice_responses(sender, **kwargs):
+    transaction.on_commit(partial(response_cache.invalidate, 'notice'))
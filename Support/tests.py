@@ -1,13 +1,19 @@
 from django.test import TestCase
 from graphene.test import Client
 from .schema import schema
-from .models import FAQ, ContactUs, Ticket, TicketMessage, Notice
+from .models import FAQ, ContactUs, Ticket, TicketMessage, Notice, OutboxEmail
+from .outbox import CLAIM_TIMEOUT, MAX_ATTEMPTS, enqueue_email, send_pending_emails
 from userapp.models import User
 from datetime import datetime
 from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import override_settings
+from io import StringIO
 from django.utils import timezone
 from django.utils.timezone import now
 from datetime import timedelta
+from unittest import mock
 
 
 class FAQQueryTest(TestCase):
@@ -96,7 +102,12 @@ class ContactUsMutationTest(TestCase):
         # بررسی زمان created_at
         self.assertTrue(abs((contact.created_at - current_time).total_seconds()) < 5)
 
-        # چک کردن اینکه ایمیل به درستی ارسال شده باشد
+        # ایمیل فقط در صف قرار گرفته و هنوز ارسال نشده است
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.filter(status='pending').count(), 1)
+
+        # چک کردن اینکه ایمیل توسط worker به درستی ارسال شده باشد
+        call_command('send_outbox_emails', '--once', stdout=StringIO())
         self.assertEqual(len(mail.outbox), 1)
         sent_mail = mail.outbox[0]
         self.assertEqual(sent_mail.subject, "Ali Ahmadi - Inquiry")
@@ -478,4 +489,136 @@ class TestTicketMessagesQuery(TestCase):
         messages = response.get("data", {}).get("ticketMessages", [])
 
         # بررسی اینکه هیچ پیامی یافت نشده است
-        self.assertEqual(len(messages), 0, "There should be no messages for a non-existent ticket.")
\ No newline at end of file
+        self.assertEqual(len(messages), 0, "There should be no messages for a non-existent ticket.")
+
+class TestTicketPagination(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(phone="09123456789", password="userpassword")
+        cls.tickets = [
+            Ticket.objects.create(title=f"Ticket {i}", department="technical", created_by=cls.user)
+            for i in range(5)
+        ]
+        cls.messages = [
+            TicketMessage.objects.create(ticket=cls.tickets[0], user=cls.user, message=f"Message {i}")
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client = Client(schema)
+
+    def fetch_pages(self, field, items, arguments):
+        ids = []
+        after = None
+        while True:
+            after_argument = f', after: "{after}"' if after else ''
+            response = self.client.execute(
+                f'query {{ {field}({arguments}, limit: 2{after_argument}) {{ {items} {{ id }} nextCursor }} }}'
+            )
+            self.assertNotIn("errors", response)
+            page = response["data"][field]
+            ids.extend(int(item["id"]) for item in page[items])
+            if page["nextCursor"] is None:
+                return ids
+            after = page["nextCursor"]
+
+    def test_user_tickets_page(self):
+        ids = self.fetch_pages("userTicketsPage", "tickets", f'phone: "{self.user.phone}"')
+        self.assertEqual(ids, sorted((ticket.id for ticket in self.tickets), reverse=True))
+
+    def test_ticket_messages_page(self):
+        ids = self.fetch_pages("ticketMessagesPage", "messages", f"ticketId: {self.tickets[0].id}")
+        self.assertEqual(ids, [message.id for message in self.messages])
+
+    def test_invalid_cursor(self):
+        response = self.client.execute(
+            'query { userTicketsPage(phone: "%s", after: "bm90LWEtbGlzdA==") { tickets { id } } }'
+            % self.user.phone
+        )
+        self.assertEqual(response["errors"][0]["message"], "Invalid cursor.")
+
+
+class FailingEmailBackend(EmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("SMTP server unavailable")
+
+
+class CountingEmailBackend(EmailBackend):
+    opened = 0
+
+    def open(self):
+        CountingEmailBackend.opened += 1
+        return True
+
+
+class TestEmailOutbox(TestCase):
+    def enqueue(self, count=1):
+        for i in range(count):
+            enqueue_email(f"Subject {i}", "Body", "no-reply@yekikame.com", ["support@example.com"])
+
+    @override_settings(EMAIL_BACKEND='Support.tests.CountingEmailBackend')
+    def test_sends_batch_over_one_connection(self):
+        CountingEmailBackend.opened = 0
+        self.enqueue(5)
+
+        self.assertEqual(send_pending_emails(batch_size=3), (3, 0))
+        self.assertEqual(send_pending_emails(batch_size=3), (2, 0))
+        self.assertEqual(send_pending_emails(batch_size=3), (0, 0))
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(CountingEmailBackend.opened, 2)
+        self.assertFalse(OutboxEmail.objects.exclude(status='sent').exists())
+
+    @override_settings(EMAIL_BACKEND='Support.tests.FailingEmailBackend')
+    def test_failure_is_retried_with_backoff(self):
+        self.enqueue()
+        self.assertEqual(send_pending_emails(), (0, 1))
+
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, 'pending')
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("SMTP server unavailable", email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+        # تا زمان تلاش بعدی دوباره ارسال نمی‌شود
+        self.assertEqual(send_pending_emails(), (0, 0))
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_pending_emails(), (0, 1))
+        second_delay = OutboxEmail.objects.get().next_attempt_at - timezone.now()
+        self.assertGreater(second_delay, timedelta(seconds=45))
+
+    @override_settings(EMAIL_BACKEND='Support.tests.FailingEmailBackend')
+    def test_gives_up_after_max_attempts(self):
+        self.enqueue()
+        for _ in range(MAX_ATTEMPTS):
+            OutboxEmail.objects.update(next_attempt_at=timezone.now())
+            send_pending_emails()
+
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.status, 'failed')
+        self.assertEqual(email.attempts, MAX_ATTEMPTS)
+
+    def test_crash_partway_keeps_sent_emails_and_leases_the_rest(self):
+        self.enqueue(3)
+        sent_messages = []
+
+        def send(message, *args, **kwargs):
+            if sent_messages:
+                raise KeyboardInterrupt  # مثل کشته شدن worker وسط batch
+            sent_messages.append(message)
+            return 1
+
+        with mock.patch('Support.outbox.EmailMessage.send', autospec=True, side_effect=send):
+            with self.assertRaises(KeyboardInterrupt):
+                send_pending_emails()
+
+        self.assertEqual(OutboxEmail.objects.filter(status='sent').count(), 1)
+        pending = OutboxEmail.objects.filter(status='pending')
+        self.assertEqual(pending.count(), 2)
+        # تا پایان اجاره worker دیگری آن‌ها را برنمی‌دارد
+        self.assertEqual(send_pending_emails(), (0, 0))
+
+        pending.update(next_attempt_at=timezone.now() - CLAIM_TIMEOUT)
+        self.assertEqual(send_pending_emails(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
@@ -0,0 +1,79 @@
+import os
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# backendهایی که incr را اتمیک و بدون تغییر زمان انقضای کلید انجام می‌دهند
+ATOMIC_INCR_BACKENDS = (RedisCache, LocMemCache)
+# حداکثر زمان نگه داشتن قفل؛ اگر process صاحب قفل بمیرد قفل بعد از این مدت آزاد می‌شود
+LOCK_TIMEOUT = 5
+
+
+@contextmanager
+def _lock(backend, key):
+    if isinstance(backend, FileBasedCache) and fcntl is not None:
+        # کش فایلی فقط روی یک سرور مشترک است و add آن اتمیک نیست
+        os.makedirs(backend._dir, exist_ok=True)
+        with open(os.path.join(backend._dir, 'increment.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return
+    # add روی دیتابیس به خاطر کلید اصلی جدول اتمیک است
+    lock_key = f'{key}:lock'
+    while not backend.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        backend.delete(lock_key)
+
+
+def increment(key, timeout=None):
+    """
+    Add one to ``key``, creating it first if needed; return the new value.
+
+    ``timeout`` counts from the creation of the key and is not extended by
+    later increments. On Redis and locmem this uses the backend's atomic
+    ``incr``. On the other backends ``incr`` is a get followed by a set that
+    also resets the expiry, so the key is updated under a lock and the
+    deadline is kept in ``<key>:deadline``.
+    """
+    backend = caches['default']
+    if isinstance(backend, ATOMIC_INCR_BACKENDS):
+        # add فقط اگر کلید وجود نداشته باشد مقدار می‌گذارد
+        cache.add(key, 0, timeout=timeout)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # کلید بین add و incr منقضی شده است
+            cache.set(key, 1, timeout=timeout)
+            return 1
+
+    deadline_key = f'{key}:deadline'
+    with _lock(backend, key):
+        values = backend.get_many([key, deadline_key])
+        now = time.time()
+        deadline = values.get(deadline_key)
+        if key in values and (deadline is None or deadline > now):
+            value = values[key] + 1
+        else:
+            value = 1
+            deadline = None
+        if deadline is None and timeout is not None:
+            deadline = now + timeout
+        # زمان باقی‌مانده تا پایان همان بازه اول، نه timeout پیش‌فرض backend
+        remaining = None if deadline is None else max(1, int(deadline - now + 0.999))
+        backend.set_many({key: value, deadline_key: deadline}, timeout=remaining)
+        return value
@@ -0,0 +1,39 @@
+"""
+Database connection metrics for the current process.
+
+Counts how many connections were opened per alias (with ``CONN_MAX_AGE`` or
+a pool this stays far below the number of requests) and, in
+``DB_CONNECTION_MODE=pool``, adds the psycopg_pool statistics: pool size,
+idle connections, waiting clients, wait time and errors.
+"""
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_opened = Counter()
+
+
+def _count_connection(sender, connection, **kwargs):
+    _opened[connection.alias] += 1
+
+
+connection_created.connect(_count_connection)
+
+
+def connection_stats():
+    stats = {'pid': os.getpid(), 'mode': getattr(settings, 'DB_CONNECTION_MODE', 'none'), 'databases': {}}
+    for alias in connections:
+        connection = connections[alias]
+        alias_stats = {
+            'connections_opened': _opened[alias],
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+        }
+        pool = getattr(connection, 'pool', None)
+        if pool is not None:
+            alias_stats['pool'] = pool.get_stats()
+        stats['databases'][alias] = alias_stats
+    return stats
@@ -0,0 +1,93 @@
+"""
+Per-process cache of parsed and validated GraphQL documents.
+
+Parsing and validating a document against the schema costs more than running
+most of our resolvers, and the frontend only sends a few dozen distinct query
+strings. ``get_document`` keeps the result for each query text in a bounded
+LRU (``GRAPHQL_DOCUMENT_CACHE_SIZE`` entries), so every later request with the
+same text skips both steps. Valid documents also get their static cost
+(``query_cost``), and documents over the budget get validation errors.
+Documents that fail to parse are not cached.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from graphql import parse, validate
+
+from . import query_cost
+from .metrics import CACHE_LOOKUPS
+
+
+class DocumentLRU:
+    """Thread-safe LRU with hit/miss counters."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hit': self.hits,
+            'miss': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+documents = DocumentLRU(settings.GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+
+def get_document(schema, query, rules=None, max_errors=None):
+    """
+    Return ``(document, validation_errors, costs)`` for ``query``.
+
+    ``costs`` maps operation names to ``(cost, depth)`` and is empty if the
+    document is invalid. Raises ``GraphQLError`` on syntax errors.
+    """
+    entry = documents.get(query)
+    CACHE_LOOKUPS.labels('graphql_document', 'miss' if entry is None else 'hit').inc()
+    if entry is None:
+        document = parse(query)
+        errors = validate(schema, document, rules, max_errors)
+        costs = {}
+        if not errors:
+            costs = query_cost.analyze(schema, document)
+            errors = query_cost.check(costs)
+        entry = (document, errors, costs)
+        documents.set(query, entry)
+    return entry
+
+
+def stats():
+    return documents.stats()
@@ -0,0 +1,235 @@
+"""
+The ``/graphql/`` view.
+
+Extends graphene-file-upload's view (multipart uploads) with persisted
+queries (``persisted_queries``), the per-process cache of parsed and validated
+documents (``document_cache``), the query cost limit (``query_cost``),
+sampled profiling (``profiling``) and the public response cache from
+``response_cache``. Responses carry the cost of the operation, and the
+profile if enabled, in ``extensions``. Multipart uploads are streamed to disk
+by ``upload_handlers`` and refused with 413 once they exceed
+``UPLOAD_MAX_BYTES``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.http.response import HttpResponseBadRequest
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import HttpError
+from graphene_file_upload.django import FileUploadGraphQLView
+from graphql import ExecutionResult, GraphQLError, OperationType, execute, get_operation_ast, validate_schema
+
+from . import document_cache, persisted_queries, profiling, query_cost, response_cache
+from .upload_handlers import HashingUploadHandler, UploadTooLarge, check_content_length
+
+
+class GraphQLView(FileUploadGraphQLView):
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        cache_status = getattr(request, 'graphql_cache_status', None)
+        if cache_status:
+            response['X-GraphQL-Cache'] = cache_status
+        return response
+
+    def parse_body(self, request):
+        if self.get_content_type(request) == 'multipart/form-data':
+            # قبل از خواندن بدنه؛ بعد از دسترسی به request.POST دیگر نمی‌توان handler را عوض کرد
+            try:
+                check_content_length(request)
+            except UploadTooLarge as e:
+                raise HttpError(HttpResponse(status=413), str(e))
+            request.upload_handlers = [HashingUploadHandler(request)]
+            request.FILES  # بدنه همین‌جا با handler بالا خوانده می‌شود
+            if getattr(request, 'upload_too_large', False):
+                raise HttpError(
+                    HttpResponse(status=413), f"The upload is larger than {settings.UPLOAD_MAX_BYTES} bytes."
+                )
+        return super().parse_body(request)
+
+    def get_graphql_params(self, request, data):
+        query, variables, operation_name, id = super().get_graphql_params(request, data)
+        sha = persisted_queries.requested_hash(request, data)
+        if sha is None:
+            return query, variables, operation_name, id
+        if query:
+            try:
+                persisted_queries.register(sha, query)
+            except persisted_queries.PersistedQueryMismatch:
+                raise HttpError(HttpResponseBadRequest("provided sha does not match query"))
+        else:
+            try:
+                query = persisted_queries.lookup(sha)
+            except persisted_queries.PersistedQueryNotFound:
+                # طبق پروتکل Apollo با وضعیت 200 تا کلاینت متن کوئری را دوباره بفرستد
+                raise HttpError(HttpResponse(), "PersistedQueryNotFound")
+        return query, variables, operation_name, id
+
+    @staticmethod
+    def format_error(error):
+        formatted = FileUploadGraphQLView.format_error(error)
+        if isinstance(error, HttpError) and error.message == "PersistedQueryNotFound":
+            formatted['extensions'] = {'code': 'PERSISTED_QUERY_NOT_FOUND'}
+        return formatted
+
+    def get_response(self, request, data, show_graphiql=False):
+        query, variables, operation_name, _ = self.get_graphql_params(request, data)
+        policy = None
+        if query and not show_graphiql and response_cache.is_enabled(request):
+            try:
+                document, validation_errors, _ = self.get_document(request, query)
+            except GraphQLError:
+                document = None
+            if document is not None and not validation_errors:
+                policy = response_cache.cache_policy(document, operation_name)
+        if policy is None:
+            return self.build_response(request, data, show_graphiql)
+
+        ttl, tags = policy
+        key = response_cache.cache_key(document, variables, operation_name, tags)
+        cached = cache.get(key)
+        if cached is not None:
+            request.graphql_operation = profiling.operation_label(get_operation_ast(document, operation_name))
+            response_cache.record('hit')
+            request.graphql_cache_status = 'HIT'
+            return cached, 200
+
+        result, status_code = self.build_response(request, data, show_graphiql)
+        response_cache.record('miss')
+        request.graphql_cache_status = 'MISS'
+        # پاسخ‌های دارای خطا کش نمی‌شوند
+        if status_code == 200 and not request.graphql_errors:
+            cache.set(key, result, timeout=ttl)
+        return result, status_code
+
+    def build_response(self, request, data, show_graphiql=False):
+        # همان get_response در graphene-django، به علاوه extensions نتیجه اجرا
+        query, variables, operation_name, id = self.get_graphql_params(request, data)
+        execution_result = self.execute_graphql_request(
+            request, data, query, variables, operation_name, show_graphiql
+        )
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+        if not execution_result:
+            return None, 200
+
+        status_code = 200
+        response = {}
+        if execution_result.errors:
+            set_rollback()
+            response['errors'] = [self.format_error(e) for e in execution_result.errors]
+        if execution_result.errors and any(not getattr(e, 'path', None) for e in execution_result.errors):
+            status_code = 400
+        else:
+            response['data'] = execution_result.data
+        extensions = execution_result.extensions
+        profile = profiling.get_profile(request)
+        if profile is not None and settings.GRAPHQL_PROFILING_EXTENSIONS:
+            extensions = {**(extensions or {}), 'profile': profile.as_extensions()}
+        if extensions:
+            response['extensions'] = extensions
+        if self.batch:
+            response['id'] = id
+            response['status'] = status_code
+        return self.json_encode(request, response, pretty=show_graphiql), status_code
+
+    def get_middleware(self, request):
+        middleware = super().get_middleware(request)
+        profile = profiling.get_profile(request)
+        if profile is None:
+            return middleware
+        # آخرین middleware بیرونی‌ترین است؛ زمان loaderها هم جزو resolver حساب می‌شود
+        return [*(middleware or []), profiling.ResolverTimingMiddleware(profile)]
+
+    def get_document(self, request, query):
+        # نتیجه برای همین درخواست نگه داشته می‌شود تا get_response و اجرا دو بار از LRU نخوانند
+        memo = getattr(request, 'graphql_document', None)
+        if memo is not None and memo[0] == query:
+            return memo[1]
+        entry = document_cache.get_document(
+            self.schema.graphql_schema, query, self.validation_rules, graphene_settings.MAX_VALIDATION_ERRORS,
+        )
+        request.graphql_document = (query, entry)
+        return entry
+
+    def execute_graphql_request(self, request, data, query, variables, operation_name, show_graphiql=False):
+        result = self.execute_document(request, query, variables, operation_name, show_graphiql)
+        request.graphql_errors = bool(result and result.errors)
+        return result
+
+    def execute_document(self, request, query, variables, operation_name, show_graphiql=False):
+        # همان مراحل execute_graphql_request در graphene-django، با سند parse و validate شده از document_cache
+        if not query:
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return ExecutionResult(data=None, errors=schema_validation_errors)
+
+        try:
+            document, validation_errors, costs = self.get_document(request, query)
+        except GraphQLError as e:
+            request.graphql_operation = profiling.operation_label(None)
+            return ExecutionResult(errors=[e])
+
+        operation_ast = get_operation_ast(document, operation_name)
+        request.graphql_operation = profiling.operation_label(operation_ast)
+        extensions = None
+        if operation_ast is not None:
+            cost = costs.get(operation_ast.name.value if operation_ast.name else None)
+            if cost is not None:
+                extensions = query_cost.extensions(*cost)
+
+        if (
+            request.method.lower() == 'get'
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None
+            raise HttpError(HttpResponseNotAllowed(
+                ['POST'],
+                f"Can only perform a {operation_ast.operation.value} operation from a POST request.",
+            ))
+
+        if validation_errors:
+            return ExecutionResult(data=None, errors=validation_errors, extensions=extensions)
+
+        result = self.execute_operation(request, schema, document, operation_ast, variables, operation_name)
+        result.extensions = extensions
+        return result
+
+    def execute_operation(self, request, schema, document, operation_ast, variables, operation_name):
+        try:
+            execute_options = {
+                'root_value': self.get_root_value(request),
+                'context_value': self.get_context(request),
+                'variable_values': variables,
+                'operation_name': operation_name,
+                'middleware': self.get_middleware(request),
+            }
+            if self.execution_context_class:
+                execute_options['execution_context_class'] = self.execution_context_class
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get('ATOMIC_MUTATIONS', False) is True
+                )
+            ):
+                with transaction.atomic():
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                return result
+
+            return execute(schema, document, **execute_options)
+        except Exception as e:
+            return ExecutionResult(errors=[e])
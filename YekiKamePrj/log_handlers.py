@@ -0,0 +1,218 @@
+"""
+Logging handlers for running under several gunicorn workers.
+
+``QueueFileHandler`` only puts records on a bounded in-memory queue. A
+listener thread formats them and appends them to the file in batches, so a
+request never waits on disk I/O or on a rollover. When the queue is full, records are
+dropped and counted (``dropped`` and ``log_records_dropped_total`` in
+``/metrics``). A warning with the count is logged as soon as there is room
+again.
+
+``SharedRotatingFileHandler`` is a ``RotatingFileHandler`` that several
+processes can write to. Every write and rollover happens under an exclusive
+``flock`` on ``<filename>.lock``. A process that finds the file replaced by
+another process's rollover reopens it before writing. ``emit_batch`` writes
+many records under one lock and one flush. Without ``fcntl`` (Windows) it
+behaves like ``RotatingFileHandler``.
+
+``JSONFormatter`` writes one JSON object per line.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# حداکثر تعداد رکوردی که listener با یک قفل و یک flush می‌نویسد
+BATCH_SIZE = 500
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# فیلدهای استاندارد LogRecord؛ بقیه (مثل extra) در خروجی JSON آورده می‌شوند
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                data[key] = value
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock_path = self.baseFilename + '.lock'
+        self._lock_file = None
+        self._lock_pid = None
+
+    def _acquire_file_lock(self):
+        # قفل flock به file description بسته است و بعد از fork مشترک می‌ماند، پس هر process فایل خودش را باز می‌کند
+        if self._lock_pid != os.getpid():
+            self._lock_file = open(self.lock_path, 'a')
+            self._lock_pid = os.getpid()
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            rotated = os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            rotated = True
+        if rotated:
+            self.stream.close()
+            self.stream = self._open()
+
+    def emit(self, record):
+        self.emit_batch([record])
+
+    def emit_batch(self, records):
+        self.acquire()
+        try:
+            if fcntl is not None:
+                self._acquire_file_lock()
+            try:
+                self._write(records)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        except Exception:
+            for record in records:
+                self.handleError(record)
+        finally:
+            self.release()
+
+    def _write(self, records):
+        if self.stream is None:
+            self.stream = self._open()
+        else:
+            self._reopen_if_rotated()
+        # اندازه واقعی فایل روی دیسک (شامل نوشته‌های processهای دیگر)
+        size = os.fstat(self.stream.fileno()).st_size
+        for record in records:
+            message = self.format(record) + self.terminator
+            length = len(message.encode(self.encoding or 'utf-8', 'replace'))
+            if self.maxBytes and size and size + length > self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+                size = 0
+            self.stream.write(message)
+            size += length
+        self.stream.flush()
+
+    def close(self):
+        super().close()
+        if self._lock_file is not None and self._lock_pid == os.getpid():
+            self._lock_file.close()
+        self._lock_file = None
+
+
+class _BatchQueueListener(QueueListener):
+    def _monitor(self):
+        # مثل QueueListener، ولی هر بار همه رکوردهای آماده صف (تا BATCH_SIZE) با هم نوشته می‌شوند
+        while True:
+            batch = [self.dequeue(True)]
+            while len(batch) < BATCH_SIZE and batch[-1] is not self._sentinel:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not self._sentinel]
+            if records:
+                for handler in self.handlers:
+                    handler.emit_batch(records)
+            for _ in batch:
+                self.queue.task_done()
+            if batch[-1] is self._sentinel:
+                break
+
+
+class QueueFileHandler(QueueHandler):
+    """Writes to a ``SharedRotatingFileHandler`` from a listener thread."""
+
+    def __init__(self, filename, max_bytes=0, backup_count=0, encoding=None, queue_size=10000):
+        self.target = SharedRotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding, delay=True
+        )
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._unreported = 0
+        self.listener = None
+        super().__init__(None)
+        self._start()
+        # workerهایی که بعد از fork ساخته می‌شوند thread listener را به ارث نمی‌برند
+        os.register_at_fork(after_in_child=self._start)
+        atexit.register(self.close)
+
+    def _start(self):
+        self.queue = queue.Queue(self.queue_size)
+        self.listener = _BatchQueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        # فرمت کردن در thread listener انجام می‌شود
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # فقط متن پیام و traceback همین‌جا ساخته می‌شوند تا آرگومان‌ها بعداً تغییر نکنند
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self._unreported:
+            warning = logging.makeLogRecord({
+                'name': __name__,
+                'levelno': logging.WARNING,
+                'levelname': 'WARNING',
+                'msg': f"Dropped {self._unreported} log records because the logging queue was full",
+            })
+            try:
+                self.queue.put_nowait(warning)
+                self._unreported = 0
+            except queue.Full:
+                pass
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+            from .metrics import LOG_RECORDS_DROPPED
+            LOG_RECORDS_DROPPED.inc()
+
+    def flush(self):
+        """Wait until the listener has written every queued record."""
+        if self.listener is not None and self.listener._thread is not None:
+            self.queue.join()
+        self.target.flush()
+
+    def close(self):
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
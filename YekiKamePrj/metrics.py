@@ -0,0 +1,136 @@
+"""
+Prometheus metrics, served at ``/metrics``.
+
+Under gunicorn every worker writes its samples to files in
+``PROMETHEUS_MULTIPROC_DIR`` (set in ``gunicorn.conf.py``), and ``/metrics``
+merges them. Whichever worker answers the scrape reports the totals of the
+whole server. Without that variable (runserver, tests) the metrics cover the
+current process only.
+
+``MetricsMiddleware`` records the latency, outcome and SQL queries of every
+GraphQL request by operation name. The caches, OTPs and SMS delivery count
+their own events. The outbox depth is read from the database on each scrape.
+"""
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Min
+from django.utils import timezone
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+# نام عملیات را کلاینت تعیین می‌کند؛ برای محدود ماندن تعداد سری‌ها بقیه نام‌ها other می‌شوند
+MAX_OPERATIONS = 200
+
+REQUEST_LATENCY = Histogram(
+    'graphql_request_duration_seconds', "Latency of GraphQL requests.", ['operation'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter('graphql_requests', "GraphQL requests by outcome.", ['operation', 'status'])
+DB_QUERIES = Histogram(
+    'graphql_db_queries', "SQL queries per GraphQL request.", ['operation'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+DB_TIME = Histogram(
+    'graphql_db_duration_seconds', "Database time per GraphQL request.", ['operation'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+CACHE_LOOKUPS = Counter('cache_lookups', "Cache lookups by cache and result (hit/miss).", ['cache', 'result'])
+OTP_SENT = Counter('otp_sent', "One-time codes issued.", ['purpose'])
+OTP_RATE_LIMITED = Counter('otp_rate_limited', "OTP requests refused by the rate limit.")
+SMS_MESSAGES = Counter('sms_messages', "SMS deliveries by result.", ['result'])
+LOG_RECORDS_DROPPED = Counter('log_records_dropped', "Log records dropped because the logging queue was full.")
+IMAGE_VARIANT_TASKS = Counter('image_variant_tasks', "Background image variant tasks by result.", ['result'])
+
+_operations = set()
+_operations_lock = threading.Lock()
+
+
+def operation_label(operation):
+    if operation in _operations:
+        return operation
+    with _operations_lock:
+        if len(_operations) >= MAX_OPERATIONS:
+            return 'other'
+        _operations.add(operation)
+    return operation
+
+
+class OutboxCollector:
+    """Reports the mail outbox depth, read from the database at scrape time."""
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        from Support.models import OutboxEmail
+
+        counts = dict(
+            OutboxEmail.objects.filter(status__in=('pending', 'failed'))
+            .values_list('status').annotate(Count('id')).order_by()
+        )
+        emails = GaugeMetricFamily('mail_outbox_emails', "Emails in the outbox by status.", labels=['status'])
+        for status in ('pending', 'failed'):
+            emails.add_metric([status], counts.get(status, 0))
+        yield emails
+
+        oldest = OutboxEmail.objects.filter(status='pending').aggregate(oldest=Min('created_at'))['oldest']
+        yield GaugeMetricFamily(
+            'mail_outbox_oldest_pending_seconds', "Age of the oldest pending email.",
+            value=(timezone.now() - oldest).total_seconds() if oldest else 0,
+        )
+
+
+outbox_collector = OutboxCollector()
+REGISTRY.register(outbox_collector)
+
+
+def scrape_registry():
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(outbox_collector)
+    return registry
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        queries = _QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        operation = getattr(request, 'graphql_operation', None)
+        if operation is None:
+            return response
+
+        operation = operation_label(operation)
+        failed = response.status_code >= 400 or getattr(request, 'graphql_errors', False)
+        REQUEST_LATENCY.labels(operation).observe(time.perf_counter() - start)
+        REQUESTS.labels(operation, 'error' if failed else 'ok').inc()
+        DB_QUERIES.labels(operation).observe(queries.count)
+        DB_TIME.labels(operation).observe(queries.time)
+        return response
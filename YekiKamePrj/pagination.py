@@ -0,0 +1,84 @@
+"""
+Keyset (cursor) pagination for list queries.
+
+A cursor is the sort key of the last row of a page (for example
+``[start_date, id]``), JSON encoded and base64'd so clients treat it as
+opaque. The next page is fetched with a ``WHERE`` on that key instead of an
+``OFFSET``, so a page costs the same however deep it is.
+"""
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+import graphene
+from django.db.models import Q, QuerySet
+from graphql import GraphQLError
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(values):
+    payload = json.dumps(list(values), separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeError):
+        raise GraphQLError("Invalid cursor.")
+
+
+def _after_filter(fields, values, descending):
+    lookup = 'lt' if descending else 'gt'
+    # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y)
+    conditions = []
+    for index, field in enumerate(fields):
+        equal = {fields[i]: values[i] for i in range(index)}
+        conditions.append(Q(**equal, **{f'{field}__{lookup}': values[index]}))
+    # شرط اضافه روی ستون اول تا دیتابیس بتواند از ایندکس به صورت بازه استفاده کند
+    bound = Q(**{f'{fields[0]}__{lookup}e': values[0]})
+    return bound & reduce(or_, conditions)
+
+
+def paginate(queryset, ordering, limit=DEFAULT_PAGE_SIZE, after=None):
+    """
+    Return one page of ``queryset`` as ``(items, next_cursor)``.
+
+    ``ordering`` must end with a unique field (usually ``id``) and all of its
+    fields must sort in the same direction, e.g. ``('-start_date', '-id')``.
+    Anything that isn't a queryset (resolvers return ``[]`` when the parent
+    object is missing) is treated as an empty page.
+    """
+    if not isinstance(queryset, QuerySet):
+        return [], None
+    descending = ordering[0].startswith('-')
+    fields = [field.lstrip('-') for field in ordering]
+    if any(field.startswith('-') != descending for field in ordering):
+        raise ValueError("All ordering fields must sort in the same direction.")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if after:
+        values = decode_cursor(after)
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise GraphQLError("Invalid cursor.")
+        queryset = queryset.filter(_after_filter(fields, values, descending))
+
+    items = list(queryset.order_by(*ordering)[:limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(getattr(items[-1], field) for field in fields)
+    return items, next_cursor
+
+
+class PageType(graphene.ObjectType):
+    """Base for page types; subclasses add the list field for their items."""
+    next_cursor = graphene.String()
+    has_next_page = graphene.Boolean()
+
+    def resolve_has_next_page(self, info):
+        return self.next_cursor is not None
+
@@ -0,0 +1,61 @@
+"""
+Persisted queries, following Apollo's automatic persisted queries protocol.
+
+The client sends ``extensions.persistedQuery.sha256Hash`` instead of the query
+text. If the hash is unknown the server answers ``PersistedQueryNotFound``,
+and the client sends the text together with the hash once to register it. The
+text is stored in the shared cache so every worker knows the hash. Like any
+other query, the text is then parsed and validated only once per process
+(see ``document_cache``).
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+
+KEY_PREFIX = 'graphql:persisted'
+# متن کوئری‌ها کوچک است و با هر انتشار فرانت‌اند فقط چند هش جدید اضافه می‌شود
+TEXT_TIMEOUT = 30 * 24 * 60 * 60
+
+
+class PersistedQueryNotFound(Exception):
+    pass
+
+
+class PersistedQueryMismatch(Exception):
+    pass
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def requested_hash(request, data):
+    """Return the hash from ``extensions.persistedQuery``, if the client sent one."""
+    extensions = request.GET.get('extensions') or data.get('extensions')
+    if isinstance(extensions, str):
+        try:
+            extensions = json.loads(extensions)
+        except ValueError:
+            return None
+    if not isinstance(extensions, dict):
+        return None
+    persisted = extensions.get('persistedQuery')
+    if not isinstance(persisted, dict):
+        return None
+    sha = persisted.get('sha256Hash')
+    return sha.lower() if isinstance(sha, str) else None
+
+
+def register(sha, query):
+    if query_hash(query) != sha:
+        raise PersistedQueryMismatch
+    cache.set(f'{KEY_PREFIX}:{sha}', query, timeout=TEXT_TIMEOUT)
+
+
+def lookup(sha):
+    query = cache.get(f'{KEY_PREFIX}:{sha}')
+    if query is None:
+        raise PersistedQueryNotFound
+    return query
+
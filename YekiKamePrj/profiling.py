@@ -0,0 +1,180 @@
+"""
+Sampled profiling of GraphQL requests.
+
+``GraphQLProfilingMiddleware`` (Django) picks ``GRAPHQL_PROFILING_SAMPLE_RATE``
+of the requests when ``GRAPHQL_PROFILING`` is on and wraps the database
+connection to count the SQL queries and their time. For those requests the
+GraphQL view adds ``ResolverTimingMiddleware`` (graphene), which times every
+resolver and attributes each SQL query to the resolver that ran it, so an N+1
+shows up as one field with many queries. Unsampled requests pay a single
+attribute check and run no extra code per field.
+
+The totals of each GraphQL request go into ``histogram``, a per-process
+rolling histogram per operation name (see ``/graphql-profile-stats/``). With
+``GRAPHQL_PROFILING_EXTENSIONS`` the profile is also returned in
+``extensions.profile`` of the response.
+"""
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import connection
+
+# مرز bucketهای مدت درخواست به میلی‌ثانیه
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+WINDOW_SECONDS = 10 * 60
+SLOT_SECONDS = 60
+TOP_RESOLVERS = 20
+# نام عملیات را کلاینت تعیین می‌کند؛ بقیه نام‌ها زیر OTHER_OPERATIONS جمع می‌شوند
+MAX_OPERATIONS = 200
+OTHER_OPERATIONS = 'other'
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        # فیلد: [تعداد فراخوانی، زمان کل، تعداد کوئری SQL]
+        self.resolvers = defaultdict(lambda: [0, 0.0, 0])
+        self.current_field = None
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.sql_count += 1
+            if self.current_field is not None:
+                self.resolvers[self.current_field][2] += 1
+
+    def duration(self):
+        return time.perf_counter() - self.started
+
+    def as_extensions(self):
+        slowest = sorted(self.resolvers.items(), key=lambda item: item[1][1], reverse=True)[:TOP_RESOLVERS]
+        return {
+            'durationMs': round(self.duration() * 1000, 3),
+            'sqlQueries': self.sql_count,
+            'sqlTimeMs': round(self.sql_time * 1000, 3),
+            'resolvers': [
+                {'field': field, 'calls': calls, 'timeMs': round(total * 1000, 3), 'sqlQueries': queries}
+                for field, (calls, total, queries) in slowest
+            ],
+        }
+
+
+class ResolverTimingMiddleware:
+    """Graphene middleware that records resolver timings into a ``RequestProfile``."""
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def resolve(self, next, root, info, **args):
+        profile = self.profile
+        field = f'{info.parent_type.name}.{info.field_name}'
+        parent_field = profile.current_field
+        profile.current_field = field
+        start = time.perf_counter()
+        try:
+            return next(root, info, **args)
+        finally:
+            stats = profile.resolvers[field]
+            stats[0] += 1
+            stats[1] += time.perf_counter() - start
+            profile.current_field = parent_field
+
+
+class RollingHistogram:
+    """Per-key histograms over the last ``window`` seconds, kept in ``slot`` second slots."""
+
+    def __init__(self, buckets=BUCKETS_MS, window=WINDOW_SECONDS, slot=SLOT_SECONDS):
+        self.buckets = buckets
+        self.slot = slot
+        self.slots = window // slot
+        self._data = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def _new_slot(self, index):
+        return {'slot': index, 'counts': [0] * (len(self.buckets) + 1), 'count': 0, 'sum': 0.0,
+                'sql_queries': 0, 'sql_time': 0.0}
+
+    def observe(self, key, duration_ms, sql_queries=0, sql_time_ms=0.0, now=None):
+        index = int((time.time() if now is None else now) // self.slot)
+        with self._lock:
+            if key not in self._data and len(self._data) >= MAX_OPERATIONS:
+                key = OTHER_OPERATIONS
+            slots = self._data[key]
+            if not slots or slots[-1]['slot'] != index:
+                slots.append(self._new_slot(index))
+            while slots[0]['slot'] <= index - self.slots:
+                slots.popleft()
+            current = slots[-1]
+            bucket = next((i for i, bound in enumerate(self.buckets) if duration_ms <= bound), len(self.buckets))
+            current['counts'][bucket] += 1
+            current['count'] += 1
+            current['sum'] += duration_ms
+            current['sql_queries'] += sql_queries
+            current['sql_time'] += sql_time_ms
+
+    def snapshot(self, now=None):
+        oldest = int((time.time() if now is None else now) // self.slot) - self.slots
+        result = {}
+        with self._lock:
+            for key, slots in self._data.items():
+                live = [slot for slot in slots if slot['slot'] > oldest]
+                count = sum(slot['count'] for slot in live)
+                if not count:
+                    continue
+                counts = [sum(column) for column in zip(*(slot['counts'] for slot in live))]
+                cumulative = 0
+                buckets = {}
+                for bound, bucket_count in zip((*self.buckets, '+Inf'), counts):
+                    cumulative += bucket_count
+                    buckets[str(bound)] = cumulative
+                result[key] = {
+                    'count': count,
+                    'meanMs': sum(slot['sum'] for slot in live) / count,
+                    'meanSqlQueries': sum(slot['sql_queries'] for slot in live) / count,
+                    'meanSqlTimeMs': sum(slot['sql_time'] for slot in live) / count,
+                    'buckets': buckets,
+                }
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+histogram = RollingHistogram()
+
+
+def get_profile(request):
+    return getattr(request, 'graphql_profile', None)
+
+
+def operation_label(operation_ast):
+    if operation_ast is None:
+        return 'invalid'
+    return operation_ast.name.value if operation_ast.name else 'anonymous'
+
+
+class GraphQLProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.GRAPHQL_PROFILING or random.random() >= settings.GRAPHQL_PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profile = request.graphql_profile = RequestProfile()
+        with connection.execute_wrapper(profile.execute_wrapper):
+            response = self.get_response(request)
+        # فقط درخواست‌های GraphQL نام عملیات را ثبت می‌کنند
+        operation = getattr(request, 'graphql_operation', None)
+        if operation is not None:
+            histogram.observe(operation, profile.duration() * 1000, profile.sql_count, profile.sql_time * 1000)
+        return response
@@ -0,0 +1,164 @@
+"""
+Static cost analysis of GraphQL operations.
+
+Runs once per query text, right after validation (see ``document_cache``), so
+an expensive query is rejected before any resolver runs. An object field costs
+``FIELD_COSTS`` (1 by default) plus the cost of its selections; scalar fields
+are free. A list field multiplies that by the number of items it can return:
+
+- the ``limit`` argument if the field has one (page fields pass it on to their
+  list). A ``limit`` given as a variable always counts as ``MAX_PAGE_SIZE``,
+  whatever its default: the cost is computed once per query text, and the
+  client can send any value at run time,
+- otherwise ``LIST_SIZES``, or ``DEFAULT_LIST_SIZE`` for relations and
+  unpaginated lists.
+
+Introspection fields are not counted.
+"""
+from django.conf import settings
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    InlineFragmentNode,
+    IntValueNode,
+    OperationDefinitionNode,
+    get_named_type,
+    get_nullable_type,
+    is_list_type,
+)
+
+from .pagination import MAX_PAGE_SIZE
+
+# هزینه فیلدهایی که از یک SELECT ساده گران‌ترند
+FIELD_COSTS = {
+    ('Query', 'searchEvents'): 5,
+    ('Query', 'searchEventsByTitle'): 5,
+    ('Query', 'relatedEvents'): 3,
+}
+# اندازه لیست‌هایی که resolverشان تعداد را محدود می‌کند
+LIST_SIZES = {
+    ('Query', 'recentEvents'): 10,
+    ('Query', 'relatedEvents'): 5,
+    # کل رشته با یک کوئری خوانده می‌شود؛ این اندازه‌ها فقط حجم معمول پاسخ را تخمین می‌زنند
+    ('Query', 'commentThread'): 50,
+    ('CommentThreadType', 'replies'): 3,
+    # از ستون JSON خود رویداد خوانده می‌شود: دو فرمت برای هر عرض در IMAGE_VARIANT_WIDTHS
+    ('EventType', 'imageVariants'): 6,
+    ('EventDetailType', 'imageVariants'): 6,
+}
+DEFAULT_LIST_SIZE = 100
+
+
+class _Analyzer:
+    def __init__(self, schema, fragments):
+        self.schema = schema
+        self.fragments = fragments
+
+    def limit(self, field_def, node):
+        for argument in node.arguments:
+            if argument.name.value != 'limit':
+                continue
+            value = argument.value
+            # مقدار پیش‌فرض متغیر را خود کلاینت می‌نویسد و هنگام اجرا می‌تواند هر عددی بفرستد
+            if isinstance(value, IntValueNode):
+                return max(1, min(int(value.value), MAX_PAGE_SIZE))
+            return MAX_PAGE_SIZE
+        default = field_def.args['limit'].default_value
+        return max(1, min(default, MAX_PAGE_SIZE)) if isinstance(default, int) else MAX_PAGE_SIZE
+
+    def selection_set(self, parent_type, selection_set, page_size=None, fragments_seen=()):
+        """Return ``(cost, depth)`` of ``selection_set`` on ``parent_type``."""
+        cost = depth = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                selection_cost, selection_depth = self.field(parent_type, selection, page_size)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition:
+                    fragment_type = self.schema.get_type(selection.type_condition.name.value)
+                selection_cost, selection_depth = self.selection_set(
+                    fragment_type, selection.selection_set, page_size, fragments_seen
+                )
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.fragments.get(name)
+                # چرخه fragment ها در اعتبارسنجی خطا می‌دهد؛ اینجا فقط از حلقه بی‌پایان جلوگیری می‌شود
+                if fragment is None or name in fragments_seen:
+                    continue
+                selection_cost, selection_depth = self.selection_set(
+                    self.schema.get_type(fragment.type_condition.name.value),
+                    fragment.selection_set, page_size, (*fragments_seen, name),
+                )
+            else:
+                continue
+            cost += selection_cost
+            depth = max(depth, selection_depth)
+        return cost, depth
+
+    def field(self, parent_type, node, page_size):
+        name = node.name.value
+        fields = getattr(parent_type, 'fields', None)
+        if name.startswith('__') or not fields or name not in fields:
+            return 0, 0
+        field_def = fields[name]
+        key = (parent_type.name, name)
+        if node.selection_set is None:
+            return FIELD_COSTS.get(key, 0), 1
+
+        limit = self.limit(field_def, node) if 'limit' in field_def.args else None
+        if is_list_type(get_nullable_type(field_def.type)):
+            size = limit or LIST_SIZES.get(key) or page_size or DEFAULT_LIST_SIZE
+            child_page_size = None
+        else:
+            size = 1
+            child_page_size = limit
+        child_cost, child_depth = self.selection_set(
+            get_named_type(field_def.type), node.selection_set, child_page_size
+        )
+        return size * (FIELD_COSTS.get(key, 1) + child_cost), child_depth + 1
+
+
+def analyze(schema, document):
+    """Return ``{operation name: (cost, depth)}`` for every operation in ``document``."""
+    fragments = {
+        definition.name.value: definition for definition in document.definitions
+        if isinstance(definition, FragmentDefinitionNode)
+    }
+    costs = {}
+    for definition in document.definitions:
+        if not isinstance(definition, OperationDefinitionNode):
+            continue
+        analyzer = _Analyzer(schema, fragments)
+        root_type = schema.get_root_type(definition.operation)
+        name = definition.name.value if definition.name else None
+        costs[name] = analyzer.selection_set(root_type, definition.selection_set)
+    return costs
+
+
+def check(costs):
+    """Return a ``GraphQLError`` for every operation over ``GRAPHQL_MAX_QUERY_COST`` or ``GRAPHQL_MAX_QUERY_DEPTH``."""
+    errors = []
+    for cost, depth in costs.values():
+        if cost > settings.GRAPHQL_MAX_QUERY_COST:
+            errors.append(GraphQLError(
+                f"Query cost {cost} exceeds the maximum of {settings.GRAPHQL_MAX_QUERY_COST}.",
+                extensions={'code': 'QUERY_TOO_EXPENSIVE'},
+            ))
+        if depth > settings.GRAPHQL_MAX_QUERY_DEPTH:
+            errors.append(GraphQLError(
+                f"Query depth {depth} exceeds the maximum of {settings.GRAPHQL_MAX_QUERY_DEPTH}.",
+                extensions={'code': 'QUERY_TOO_DEEP'},
+            ))
+    return errors
+
+
+def extensions(cost, depth):
+    return {
+        'cost': {
+            'requested': cost,
+            'maximum': settings.GRAPHQL_MAX_QUERY_COST,
+            'depth': depth,
+        }
+    }
@@ -0,0 +1,57 @@
+"""
+Query plan helpers for tests.
+
+``QueryPlanTestMixin.assertNoSequentialScan`` runs a callable (usually a
+GraphQL query), captures the SQL it sends, runs ``EXPLAIN`` on every
+statement and fails if the planner falls back to a full scan of one of the
+given tables. PostgreSQL and SQLite plans are both understood.
+"""
+import json
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+def _postgres_seq_scans(plan):
+    scans = []
+    if plan.get('Node Type') == 'Seq Scan':
+        scans.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        scans.extend(_postgres_seq_scans(child))
+    return scans
+
+
+def sequential_scans(sql, tables, using='default'):
+    """Return the names of ``tables`` that ``sql`` reads with a full table scan."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scanned = _postgres_seq_scans(plan[0]['Plan'])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            # «SCAN table» بدون «USING INDEX» یعنی خواندن کامل جدول
+            scanned = [
+                detail.split()[1] for *_, detail in cursor.fetchall()
+                if detail.startswith('SCAN ') and ' USING ' not in detail
+            ]
+        else:
+            raise NotImplementedError(f"EXPLAIN is not supported for {connection.vendor}")
+    return [table for table in scanned if table in tables]
+
+
+class QueryPlanTestMixin:
+    def assertNoSequentialScan(self, func, tables, using='default'):
+        connection = connections[using]
+        with CaptureQueriesContext(connection) as captured:
+            func()
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            scans = sequential_scans(sql, tables, using)
+            if scans:
+                self.fail(f"Sequential scan on {', '.join(scans)} in query:\n{sql}")
@@ -0,0 +1,109 @@
+"""
+Whole-response cache for public GraphQL queries.
+
+A query is cached only if every root field is listed in ``CACHEABLE_FIELDS``
+and the request is anonymous. The key is the SHA-256 of the normalized
+document (``print_ast``), the operation name and the variables. It also
+includes the current generation of every tag the fields depend on.
+``invalidate(tag)`` (called from the model signals) moves a tag to a new
+generation, so the stale entries are never read again and expire on their
+own. The TTL of a response is the smallest TTL of its fields.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from graphql import FieldNode, OperationDefinitionNode, OperationType, print_ast
+
+from .cache_utils import increment
+from .metrics import CACHE_LOOKUPS
+
+# فیلد: (TTL به ثانیه، داده‌هایی که با تغییرشان پاسخ باطل می‌شود)
+CACHEABLE_FIELDS = {
+    'allFaqs': (3600, ('faq',)),
+    'activeNotices': (300, ('notice',)),
+    'recentEvents': (60, ('event',)),
+    'searchEventsByCity': (120, ('event',)),
+    'searchEventsByCityPage': (120, ('event',)),
+    'filteredEvents': (120, ('event',)),
+    'filteredEventsPage': (120, ('event',)),
+}
+
+KEY_PREFIX = 'graphql:response'
+STATS = ('hit', 'miss')
+
+
+def _generation_key(tag):
+    return f'{KEY_PREFIX}:generation:{tag}'
+
+
+def invalidate(tag):
+    # مقدار یکتا (نه شمارنده) تا پاک شدن کلید از کش، نسخه‌های قدیمی را زنده نکند
+    cache.set(_generation_key(tag), time.time_ns(), timeout=None)
+
+
+def record(stat):
+    increment(f'{KEY_PREFIX}:stats:{stat}')
+    CACHE_LOOKUPS.labels('graphql_response', stat).inc()
+
+
+def stats():
+    counts = cache.get_many([f'{KEY_PREFIX}:stats:{stat}' for stat in STATS])
+    result = {stat: counts.get(f'{KEY_PREFIX}:stats:{stat}', 0) for stat in STATS}
+    lookups = result['hit'] + result['miss']
+    result['hit_ratio'] = result['hit'] / lookups if lookups else None
+    return result
+
+
+def cache_policy(document, operation_name=None):
+    """Return ``(ttl, tags)`` if the operation can be cached, otherwise None."""
+    operations = [
+        definition for definition in document.definitions
+        if isinstance(definition, OperationDefinitionNode)
+    ]
+    if operation_name:
+        operations = [op for op in operations if op.name and op.name.value == operation_name]
+    if len(operations) != 1 or operations[0].operation != OperationType.QUERY:
+        return None
+
+    ttl = None
+    tags = set()
+    for selection in operations[0].selection_set.selections:
+        # fragment در ریشه پشتیبانی نمی‌شود؛ چنین کوئری‌هایی کش نمی‌شوند
+        if not isinstance(selection, FieldNode):
+            return None
+        name = selection.name.value
+        if name == '__typename':
+            continue
+        if name not in CACHEABLE_FIELDS:
+            return None
+        field_ttl, field_tags = CACHEABLE_FIELDS[name]
+        ttl = field_ttl if ttl is None else min(ttl, field_ttl)
+        tags.update(field_tags)
+    if ttl is None:
+        return None
+    return ttl, sorted(tags)
+
+
+def cache_key(document, variables, operation_name, tags):
+    generations = cache.get_many([_generation_key(tag) for tag in tags])
+    for tag in tags:
+        if _generation_key(tag) not in generations:
+            cache.add(_generation_key(tag), time.time_ns(), timeout=None)
+            generations[_generation_key(tag)] = cache.get(_generation_key(tag))
+    payload = json.dumps(
+        [print_ast(document), operation_name, variables or {}],
+        sort_keys=True, default=str,
+    )
+    digest = hashlib.sha256(payload.encode()).hexdigest()
+    versions = '.'.join(str(generations[_generation_key(tag)]) for tag in tags)
+    return f'{KEY_PREFIX}:{digest}:{versions}'
+
+
+def is_enabled(request):
+    if not settings.GRAPHQL_RESPONSE_CACHE:
+        return False
+    user = getattr(request, 'user', None)
+    return not (user is not None and user.is_authenticated)
@@ -2,6 +2,7 @@ import graphene
 import userapp.schema  # اضافه کردن schema اپلیکیشن userapp
 import Eventapp.schema  # اضافه کردن schema اپلیکیشن Eventapp
 import Support.schema  # اضافه کردن schema اپلیکیشن Support
+from Eventapp.loaders import DataLoaderMiddleware
 
 
 class Query(userapp.schema.Query, Eventapp.schema.Query, Support.schema.Query, graphene.ObjectType):
@@ -13,3 +14,6 @@ class Mutation(userapp.schema.Mutation,Support.schema.Mutation,Eventapp.schema.M
 
 
 schema = graphene.Schema(query=Query, mutation=Mutation)
+
+# middleware های اجرای کوئری؛ کلاس‌ها برای هر درخواست دوباره ساخته می‌شوند
+middleware = [DataLoaderMiddleware]
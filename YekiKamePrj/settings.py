@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -22,7 +25,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-y50j*)hrzriga5nih9ef#x=u40aq8g$sw(u=*t$h+=$d+7kj-w'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# در docker-compose با DEBUG=False اجرا می‌شود؛ در محیط توسعه پیش‌فرض True است
+DEBUG = os.environ.get('DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = ['*']
 
@@ -36,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # My Apps
     'userapp',
@@ -45,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'YekiKamePrj.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -53,6 +59,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'YekiKamePrj.profiling.GraphQLProfilingMiddleware',
 ]
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_METHODS = [
@@ -110,14 +117,39 @@ WSGI_APPLICATION = 'YekiKamePrj.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'Yekikame',
-        'USER': 'postgres',
-        'PASSWORD': 'postgres',
-        'HOST': 'db',  # یا آدرس IP سرور پایگاه داده
-        'PORT': '5432',  # برای استفاده از پورت پیش‌فرض (5432) می‌توانید خالی بگذارید
+        'NAME': os.environ.get('DB_NAME', 'Yekikame'),
+        'USER': os.environ.get('DB_USER', 'postgres'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
+        'HOST': os.environ.get('DB_HOST', 'db'),  # یا آدرس IP سرور پایگاه داده
+        'PORT': os.environ.get('DB_PORT', '5432'),  # برای استفاده از پورت پیش‌فرض (5432) می‌توانید خالی بگذارید
+        'OPTIONS': {},
     }
 }
 
+# نحوه نگهداری اتصال‌های دیتابیس:
+#   none: برای هر درخواست اتصال جدید باز و در پایان بسته می‌شود
+#   persistent: هر thread اتصال خود را تا DB_CONN_MAX_AGE ثانیه نگه می‌دارد
+#   pool: pool داخلی psycopg3 (نیاز به نصب psycopg[binary,pool])
+DB_CONNECTION_MODE = os.environ.get('DB_CONNECTION_MODE', 'persistent')
+
+if DB_CONNECTION_MODE == 'persistent':
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+    # اتصالی که سرور دیتابیس بسته است قبل از استفاده دوباره بررسی و جایگزین می‌شود
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+elif DB_CONNECTION_MODE == 'pool':
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        # حداقل برابر GUNICORN_THREADS تا threadهای یک worker منتظر اتصال نمانند
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 4)),
+        # حداکثر زمان انتظار برای گرفتن اتصال از pool
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+    }
+elif DB_CONNECTION_MODE != 'none':
+    raise ImproperlyConfigured(f"Unknown DB_CONNECTION_MODE: {DB_CONNECTION_MODE}")
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -165,6 +197,74 @@ DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# کش مشترک بین workerها (کدهای OTP و محدودیت ارسال در آن نگهداری می‌شوند)
+#   locmem: فقط داخل همان process؛ پیش‌فرض هنگام اجرای تست‌ها
+#   file: پوشه مشترک روی همان سرور (پیش‌فرض)
+#   db: جدول yekikame_cache (با manage.py createcachetable ساخته می‌شود)
+#   redis: برای production با چند سرور؛ آدرس در REDIS_URL
+RUNNING_TESTS = sys.argv[1:2] == ['test']
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem' if RUNNING_TESTS else 'file')
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'yekikame_cache',
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://redis:6379/0'),
+    },
+}
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+
+CACHES = {
+    'default': {
+        **CACHE_BACKENDS[CACHE_BACKEND],
+        # پیشوند کلیدها تا چند پروژه بتوانند از یک Redis استفاده کنند؛
+        # با افزایش CACHE_VERSION همه کلیدهای قبلی نادیده گرفته می‌شوند
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'yekikame'),
+        'VERSION': int(os.environ.get('CACHE_VERSION', 1)),
+    }
+}
+
+# کش کامل پاسخ کوئری‌های عمومی GraphQL (YekiKamePrj/response_cache.py)
+GRAPHQL_RESPONSE_CACHE = os.environ.get('GRAPHQL_RESPONSE_CACHE', 'True') == 'True'
+# تعداد سندهای parse و validate شده‌ای که هر پروسه نگه می‌دارد (YekiKamePrj/persisted_queries.py)
+GRAPHQL_DOCUMENT_CACHE_SIZE = int(os.environ.get('GRAPHQL_DOCUMENT_CACHE_SIZE', 500))
+# کوئری‌های گران‌تر یا عمیق‌تر از این قبل از اجرا رد می‌شوند (YekiKamePrj/query_cost.py)
+GRAPHQL_MAX_QUERY_COST = int(os.environ.get('GRAPHQL_MAX_QUERY_COST', 5000))
+GRAPHQL_MAX_QUERY_DEPTH = int(os.environ.get('GRAPHQL_MAX_QUERY_DEPTH', 10))
+# پروفایل تعداد و زمان کوئری‌های SQL و زمان resolverها برای درصدی از درخواست‌ها (YekiKamePrj/profiling.py)
+GRAPHQL_PROFILING = os.environ.get('GRAPHQL_PROFILING', 'False') == 'True'
+GRAPHQL_PROFILING_SAMPLE_RATE = float(os.environ.get('GRAPHQL_PROFILING_SAMPLE_RATE', 0.01))
+# پروفایل در extensions پاسخ برگردانده شود (فقط برای توسعه)
+GRAPHQL_PROFILING_EXTENSIONS = os.environ.get('GRAPHQL_PROFILING_EXTENSIONS', str(DEBUG)) == 'True'
+
+# متریک‌های Prometheus در /metrics (YekiKamePrj/metrics.py)؛ با DEBUG=False فقط وقتی METRICS_TOKEN تنظیم شده باشد در دسترس است و
+# درخواست باید هدر Authorization: Bearer <token> داشته باشد
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# ارسال پیامک در پس‌زمینه؛ FakeSMSProvider پیام را فقط لاگ می‌کند
+SMS_PROVIDER = os.environ.get('SMS_PROVIDER', 'userapp.sms.FakeSMSProvider')
+SMS_DISPATCH_WORKERS = int(os.environ.get('SMS_DISPATCH_WORKERS', 2))
+
+# حداکثر حجم هر فایل آپلودی در /graphql/ (YekiKamePrj/upload_handlers.py)؛ client_max_body_size در nginx.conf بزرگ‌تر است
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 10 * 1024 * 1024))
+
+# تصویر رویداد (Eventapp/images.py): حداکثر تعداد پیکسل و عرض نسخه‌های کوچکی که در پس‌زمینه ساخته می‌شوند
+IMAGE_MAX_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', 40_000_000))
+IMAGE_VARIANT_WIDTHS = [int(width) for width in os.environ.get('IMAGE_VARIANT_WIDTHS', '320,640,1280').split(',')]
+IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 2))
+
 # تعیین سطح لاگینگ بر اساس متغیر محیطی (پیش‌فرض: INFO)
 LOG_LEVEL = os.environ.get('DJANGO_LOG_LEVEL', 'INFO')
 
@@ -174,6 +274,11 @@ LOG_FILE_PATH = os.environ.get('DJANGO_LOG_FILE', os.path.join(BASE_DIR, 'logs',
 # ایجاد دایرکتوری لاگ‌ها در صورت عدم وجود
 os.makedirs(os.path.dirname(LOG_FILE_PATH), exist_ok=True)
 
+# sync: نوشتن فایل لاگ روی thread درخواست با RotatingFileHandler
+# queue: صف محدود و thread جدا، خطوط JSON و چرخش فایل امن بین چند worker (YekiKamePrj/log_handlers.py)
+LOG_MODE = os.environ.get('DJANGO_LOG_MODE', 'queue')
+LOG_QUEUE_SIZE = int(os.environ.get('DJANGO_LOG_QUEUE_SIZE', 10000))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -187,6 +292,9 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'YekiKamePrj.log_handlers.JSONFormatter',
+        },
     },
     'handlers': {
         'console': {
@@ -210,5 +318,23 @@ LOGGING = {
             'level': LOG_LEVEL,
             'propagate': True,
         },
+        'userapp': {
+            'handlers': ['console', 'file'],
+            'level': LOG_LEVEL,
+        },
     },
 }
+
+if LOG_MODE == 'queue':
+    LOGGING['handlers']['file'] = {
+        'level': 'DEBUG',
+        'class': 'YekiKamePrj.log_handlers.QueueFileHandler',
+        'filename': LOG_FILE_PATH,
+        'max_bytes': 5 * 1024 * 1024,
+        'backup_count': 5,
+        'encoding': 'utf8',
+        'queue_size': LOG_QUEUE_SIZE,
+        'formatter': 'json',
+    }
+elif LOG_MODE != 'sync':
+    raise ImproperlyConfigured(f"Unknown DJANGO_LOG_MODE {LOG_MODE!r}; use 'sync' or 'queue'.")
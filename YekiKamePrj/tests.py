@@ -0,0 +1,688 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from graphql import parse, validate
+from PIL import Image
+from prometheus_client import REGISTRY, CollectorRegistry, multiprocess
+
+from Eventapp.models import Event, UserEventRole
+from Support.models import FAQ
+from Support.outbox import enqueue_email
+from userapp.models import User as AppUser
+from . import document_cache, persisted_queries, profiling, query_cost
+from .cache_utils import increment
+from .log_handlers import JSONFormatter, QueueFileHandler
+from .schema import schema
+
+
+class TestDbStatsView(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # پنل ادمین با مدل User خود django کار می‌کند
+        cls.staff = User.objects.create_user(username="staff", password="password123", is_staff=True)
+        cls.user = User.objects.create_user(username="user", password="password123")
+
+    def test_requires_staff(self):
+        response = self.client.get('/db-stats/')
+        self.assertEqual(response.status_code, 302)
+
+        self.client.force_login(self.user)
+        response = self.client.get('/db-stats/')
+        self.assertEqual(response.status_code, 302)
+
+    def test_reports_connection_stats(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/db-stats/')
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()
+        self.assertIn('mode', stats)
+        default = stats['databases']['default']
+        self.assertIn('connections_opened', default)
+        self.assertIn('conn_max_age', default)
+        self.assertNotIn('pool', default)
+
+
+class TestGraphQLResponseCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = AppUser.objects.create_user(phone="09123456789", password="password123")
+        cls.staff = User.objects.create_user(username="staff", password="password123", is_staff=True)
+        start_date = timezone.now() + timedelta(days=2)
+        cls.event = Event.objects.create(
+            title="Chess night",
+            city="Tehran",
+            start_date=start_date,
+            end_date=start_date + timedelta(hours=3),
+            registration_end_date=start_date - timedelta(days=1),
+            max_subscribers=10,
+            event_owner=cls.owner
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def post(self, query, variables=None):
+        response = self.client.post(
+            '/graphql/', {'query': query, 'variables': variables}, content_type='application/json'
+        )
+        return response, response.headers.get('X-GraphQL-Cache')
+
+    def test_repeated_query_is_served_from_cache(self):
+        query = 'query { recentEvents { id title } }'
+        first, status = self.post(query)
+        self.assertEqual(status, 'MISS')
+        with self.assertNumQueries(0):
+            second, status = self.post(query)
+        self.assertEqual(status, 'HIT')
+        self.assertEqual(first.json(), second.json())
+
+    def test_key_uses_normalized_document_and_variables(self):
+        query = 'query ($city: String!) { searchEventsByCity(city: $city) { id } }'
+        self.post(query, {'city': 'Tehran'})
+        _, status = self.post(
+            'query ($city: String!) {\n  searchEventsByCity(city: $city) {\n    id\n  }\n}', {'city': 'Tehran'}
+        )
+        self.assertEqual(status, 'HIT')
+        _, status = self.post(query, {'city': 'Shiraz'})
+        self.assertEqual(status, 'MISS')
+
+    def test_model_changes_invalidate(self):
+        query = 'query { recentEvents { id title } }'
+        self.post(query)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.title = "Chess tournament"
+            self.event.save()
+        response, status = self.post(query)
+        self.assertEqual(status, 'MISS')
+        self.assertEqual(response.json()['data']['recentEvents'][0]['title'], "Chess tournament")
+
+        # تغییر FAQ پاسخ رویدادها را باطل نمی‌کند
+        with self.captureOnCommitCallbacks(execute=True):
+            FAQ.objects.create(question_title="Q", question_answer="A", created_by=self.owner)
+        _, status = self.post(query)
+        self.assertEqual(status, 'HIT')
+
+    def test_approving_a_join_request_invalidates(self):
+        member = AppUser.objects.create_user(phone="09120000001", password="password123")
+        role = UserEventRole.objects.create(user=member, event=self.event, role='regular', is_approved=None)
+        query = 'query { recentEvents { id subscriberCount } }'
+        self.post(query)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(role.approve())
+        response, status = self.post(query)
+        self.assertEqual(status, 'MISS')
+        self.assertEqual(response.json()['data']['recentEvents'][0]['subscriberCount'], 2)
+
+    def test_uncacheable_requests(self):
+        # فیلدهای وابسته به کاربر کش نمی‌شوند
+        _, status = self.post('query { eventsByOwner(phone: "09123456789") { id } }')
+        self.assertIsNone(status)
+
+        # پاسخ دارای خطا کش نمی‌شود
+        self.post('query { filteredEvents(city: "Tehran", hasImage: "x") { id } }')
+        _, status = self.post('query { filteredEvents(city: "Tehran", hasImage: "x") { id } }')
+        self.assertNotEqual(status, 'HIT')
+
+        # کاربران وارد شده همیشه پاسخ تازه می‌گیرند
+        self.client.force_login(self.staff)
+        _, status = self.post('query { recentEvents { id } }')
+        self.assertIsNone(status)
+
+    def test_stats(self):
+        query = 'query { allFaqs { questionTitle } }'
+        self.post(query)
+        self.post(query)
+        self.post(query)
+        self.client.force_login(self.staff)
+        stats = self.client.get('/graphql-cache-stats/').json()
+        self.assertEqual(stats['hit'], 2)
+        self.assertEqual(stats['miss'], 1)
+        self.assertAlmostEqual(stats['hit_ratio'], 2 / 3)
+
+
+class TestPersistedQueries(TestCase):
+    query = 'query ($phone: String!) { eventsByOwner(phone: $phone) { title } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = AppUser.objects.create_user(phone="09123456789", password="password123")
+        start_date = timezone.now() + timedelta(days=2)
+        Event.objects.create(
+            title="Chess night",
+            city="Tehran",
+            start_date=start_date,
+            end_date=start_date + timedelta(hours=3),
+            registration_end_date=start_date - timedelta(days=1),
+            max_subscribers=10,
+            event_owner=cls.owner
+        )
+
+    def setUp(self):
+        cache.clear()
+        document_cache.documents.clear()
+        self.sha = persisted_queries.query_hash(self.query)
+
+    def post(self, sha, query=None):
+        body = {
+            'variables': {'phone': "09123456789"},
+            'extensions': {'persistedQuery': {'version': 1, 'sha256Hash': sha}},
+        }
+        if query:
+            body['query'] = query
+        return self.client.post('/graphql/', body, content_type='application/json')
+
+    def test_unknown_hash_is_registered_on_first_use(self):
+        response = self.post(self.sha)
+        self.assertEqual(response.status_code, 200)
+        error = response.json()['errors'][0]
+        self.assertEqual(error['message'], "PersistedQueryNotFound")
+        self.assertEqual(error['extensions']['code'], 'PERSISTED_QUERY_NOT_FOUND')
+
+        response = self.post(self.sha, self.query)
+        self.assertEqual(response.json()['data']['eventsByOwner'], [{'title': "Chess night"}])
+
+        response = self.post(self.sha)
+        self.assertEqual(response.json()['data']['eventsByOwner'], [{'title': "Chess night"}])
+
+    def test_document_is_parsed_once(self):
+        with mock.patch('YekiKamePrj.document_cache.parse', wraps=parse) as parse_mock:
+            self.post(self.sha, self.query)
+            self.post(self.sha)
+            self.post(self.sha)
+        self.assertEqual(parse_mock.call_count, 1)
+
+    def test_hash_must_match_query(self):
+        response = self.post('0' * 64, self.query)
+        self.assertEqual(response.status_code, 400)
+        response = self.post('0' * 64)
+        self.assertEqual(response.json()['errors'][0]['message'], "PersistedQueryNotFound")
+
+    def test_validation_errors_are_returned(self):
+        query = '{ eventsByOwner { title } }'
+        response = self.post(persisted_queries.query_hash(query), query)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('phone', response.json()['errors'][0]['message'])
+
+
+class TestDocumentCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="staff", password="password123", is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        document_cache.documents.clear()
+
+    def post(self, query):
+        return self.client.post('/graphql/', {'query': query}, content_type='application/json')
+
+    def test_each_query_text_is_parsed_and_validated_once(self):
+        query = 'query { recentEvents { id title } }'
+        with mock.patch('YekiKamePrj.document_cache.validate', wraps=validate) as validate_mock:
+            for _ in range(3):
+                self.assertEqual(self.post(query).status_code, 200)
+            self.post('query { allFaqs { questionTitle } }')
+        self.assertEqual(validate_mock.call_count, 2)
+        stats = document_cache.stats()
+        self.assertEqual((stats['hit'], stats['miss'], stats['size']), (2, 2, 2))
+
+    def test_validation_errors_are_cached_too(self):
+        for _ in range(2):
+            response = self.post('query { recentEvents { noSuchField } }')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(document_cache.stats()['hit'], 1)
+
+    def test_syntax_errors_are_not_cached(self):
+        response = self.post('query { recentEvents { id }')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(document_cache.documents), 0)
+
+    def test_get_mutation_is_rejected(self):
+        response = self.client.get('/graphql/', {'query': 'mutation { loginUser(phone: "1", password: "2") { success } }'})
+        self.assertEqual(response.status_code, 405)
+
+    def test_lru_is_bounded(self):
+        lru = document_cache.DocumentLRU(maxsize=2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual((lru.get('a'), lru.get('c')), (1, 3))
+
+    def test_stats_view(self):
+        self.post('query { allFaqs { questionTitle } }')
+        self.client.force_login(self.staff)
+        stats = self.client.get('/graphql-cache-stats/').json()
+        self.assertEqual(stats['documents']['size'], 1)
+
+
+class TestQueryCost(TestCase):
+    def setUp(self):
+        cache.clear()
+        document_cache.documents.clear()
+
+    def analyze(self, query):
+        costs = query_cost.analyze(schema.graphql_schema, parse(query))
+        return costs[None] if None in costs else next(iter(costs.values()))
+
+    def post(self, query, variables=None):
+        return self.client.post(
+            '/graphql/', {'query': query, 'variables': variables}, content_type='application/json'
+        )
+
+    def test_scalars_are_free(self):
+        self.assertEqual(self.analyze('{ user(phone: "1") { id phone } }'), (1, 2))
+
+    def test_lists_multiply_by_their_size(self):
+        # recentEvents حداکثر 10 رویداد برمی‌گرداند، هر کدام با یک owner
+        self.assertEqual(self.analyze('{ recentEvents { id eventOwner { id } } }'), (10 * (1 + 1), 3))
+
+    def test_page_limit_is_passed_to_the_list(self):
+        cost, _ = self.analyze('{ filteredEventsPage(city: "Tehran", limit: 5) { events { id } } }')
+        self.assertEqual(cost, 1 + 5)
+        # مقدار پیش‌فرض limit
+        cost, _ = self.analyze('{ filteredEventsPage(city: "Tehran") { events { id } } }')
+        self.assertEqual(cost, 1 + 20)
+        # بیشتر از MAX_PAGE_SIZE برگردانده نمی‌شود
+        cost, _ = self.analyze('{ filteredEventsPage(city: "Tehran", limit: 1000) { events { id } } }')
+        self.assertEqual(cost, 1 + 100)
+
+    def test_variables_count_as_the_maximum(self):
+        # پیش‌فرض متغیر را کلاینت تعیین می‌کند، پس در هزینه به حساب نمی‌آید
+        query = 'query ($limit: Int%s) { filteredEventsPage(city: "T", limit: $limit) { events { id } } }'
+        self.assertEqual(self.analyze(query % ' = 3')[0], 1 + 100)
+        self.assertEqual(self.analyze(query % '')[0], 1 + 100)
+
+    def test_small_variable_default_does_not_hide_a_large_value(self):
+        query = '''
+        query Q($n: Int = 1) {
+            filteredEventsPage(city: "x", limit: $n) { events { subscribers { joinedEvents { id } } } }
+        }
+        '''
+        with self.assertNumQueries(0):
+            response = self.post(query, {'n': 100})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['extensions']['code'], 'QUERY_TOO_EXPENSIVE')
+
+    def test_fragments_are_counted(self):
+        query = '{ recentEvents { ...Card } } fragment Card on EventType { eventOwner { id } }'
+        self.assertEqual(self.analyze(query), (20, 3))
+
+    def test_introspection_is_free(self):
+        self.assertEqual(self.analyze('{ __schema { types { name fields { name } } } }'), (0, 0))
+
+    def test_cost_is_reported_in_extensions(self):
+        response = self.post('{ recentEvents { id eventOwner { id } } }')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['extensions']['cost'], {'requested': 20, 'maximum': 5000, 'depth': 3})
+
+    def test_fan_out_query_is_rejected_before_execution(self):
+        query = '''
+        { recentEvents { subscribers { joinedEvents { reviews { id } } } } }
+        '''
+        with self.assertNumQueries(0):
+            response = self.post(query)
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertEqual(body['errors'][0]['extensions']['code'], 'QUERY_TOO_EXPENSIVE')
+        self.assertNotIn('data', body)
+        self.assertGreater(body['extensions']['cost']['requested'], 5000)
+
+    @override_settings(GRAPHQL_MAX_QUERY_DEPTH=3)
+    def test_deep_query_is_rejected(self):
+        response = self.post('{ recentEvents { eventOwner { createdEvents { id } } } }')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'][0]['extensions']['code'], 'QUERY_TOO_DEEP')
+
+
+@override_settings(GRAPHQL_PROFILING=True, GRAPHQL_PROFILING_SAMPLE_RATE=1.0, GRAPHQL_PROFILING_EXTENSIONS=True)
+class TestGraphQLProfiling(TestCase):
+    query = '''
+    query OwnerEvents {
+      eventsByOwnerPage(phone: "09123456789", limit: 10) { events { title subscribers { id } } }
+    }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = AppUser.objects.create_user(phone="09123456789", password="password123")
+        cls.staff = User.objects.create_user(username="staff", password="password123", is_staff=True)
+        start_date = timezone.now() + timedelta(days=2)
+        for title in ("Chess night", "Book club"):
+            Event.objects.create(
+                title=title,
+                city="Tehran",
+                start_date=start_date,
+                end_date=start_date + timedelta(hours=3),
+                registration_end_date=start_date - timedelta(days=1),
+                max_subscribers=10,
+                event_owner=cls.owner
+            )
+
+    def setUp(self):
+        cache.clear()
+        profiling.histogram.clear()
+
+    def post(self, query):
+        return self.client.post('/graphql/', {'query': query}, content_type='application/json')
+
+    def test_profile_is_reported_in_extensions(self):
+        profile = self.post(self.query).json()['extensions']['profile']
+        self.assertGreater(profile['sqlQueries'], 0)
+        resolvers = {resolver['field']: resolver for resolver in profile['resolvers']}
+        self.assertEqual(resolvers['Query.eventsByOwnerPage']['calls'], 1)
+        # N+1: یک کوئری subscribers برای هر رویداد
+        self.assertEqual(resolvers['EventType.subscribers']['calls'], 2)
+        self.assertEqual(resolvers['EventType.subscribers']['sqlQueries'], 2)
+
+    def test_operations_are_aggregated(self):
+        self.post(self.query)
+        self.post(self.query)
+        self.post('{ recentEvents { id } }')
+        self.client.force_login(self.staff)
+        operations = self.client.get('/graphql-profile-stats/').json()['operations']
+        self.assertEqual(operations['OwnerEvents']['count'], 2)
+        self.assertEqual(operations['OwnerEvents']['buckets']['+Inf'], 2)
+        self.assertGreater(operations['OwnerEvents']['meanSqlQueries'], 0)
+        self.assertEqual(operations['anonymous']['count'], 1)
+
+    @override_settings(GRAPHQL_PROFILING=False)
+    def test_disabled(self):
+        with mock.patch.object(profiling.ResolverTimingMiddleware, 'resolve') as resolve:
+            body = self.post(self.query).json()
+        resolve.assert_not_called()
+        self.assertNotIn('profile', body.get('extensions', {}))
+        self.assertEqual(profiling.histogram.snapshot(), {})
+
+    @override_settings(GRAPHQL_PROFILING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_not_profiled(self):
+        body = self.post(self.query).json()
+        self.assertNotIn('profile', body.get('extensions', {}))
+
+    def test_histogram_window(self):
+        histogram = profiling.RollingHistogram(buckets=(10, 100), window=120, slot=60)
+        histogram.observe('op', 5, now=0)
+        histogram.observe('op', 50, now=61)
+        histogram.observe('op', 500, now=121)
+        snapshot = histogram.snapshot(now=121)['op']
+        # مقدار لحظه 0 از پنجره دو دقیقه‌ای بیرون رفته است
+        self.assertEqual(snapshot['count'], 2)
+        self.assertEqual(snapshot['buckets'], {'10': 0, '100': 1, '+Inf': 2})
+
+
+class TestPrometheusMetrics(TestCase):
+    WORKER_SCRIPT = '''
+import django
+django.setup()
+from YekiKamePrj.metrics import REQUEST_LATENCY, REQUESTS
+
+REQUESTS.labels('RecentEvents', 'ok').inc()
+REQUEST_LATENCY.labels('RecentEvents').observe(0.02)
+'''
+
+    def setUp(self):
+        cache.clear()
+
+    def sample(self, name, labels=None):
+        return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+    def post(self, query):
+        return self.client.post('/graphql/', {'query': query}, content_type='application/json')
+
+    def test_requests_are_recorded_by_operation(self):
+        ok = {'operation': 'RecentEvents', 'status': 'ok'}
+        before = self.sample('graphql_requests_total', ok)
+        queries_before = self.sample('graphql_db_queries_count', {'operation': 'RecentEvents'})
+        self.post('query RecentEvents { recentEvents { id } }')
+        self.assertEqual(self.sample('graphql_requests_total', ok), before + 1)
+        self.assertEqual(self.sample('graphql_db_queries_count', {'operation': 'RecentEvents'}), queries_before + 1)
+
+        error = {'operation': 'invalid', 'status': 'error'}
+        before = self.sample('graphql_requests_total', error)
+        self.post('query { recentEvents { id }')
+        self.assertEqual(self.sample('graphql_requests_total', error), before + 1)
+
+        with override_settings(DEBUG=True):
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'graphql_request_duration_seconds_bucket{le="0.005",operation="RecentEvents"}', response.content)
+
+    def test_cache_lookups(self):
+        miss = {'cache': 'graphql_response', 'result': 'miss'}
+        hit = {'cache': 'graphql_response', 'result': 'hit'}
+        before = self.sample('cache_lookups_total', miss), self.sample('cache_lookups_total', hit)
+        self.post('{ allFaqs { questionTitle } }')
+        self.post('{ allFaqs { questionTitle } }')
+        self.assertEqual(
+            (self.sample('cache_lookups_total', miss), self.sample('cache_lookups_total', hit)),
+            (before[0] + 1, before[1] + 1),
+        )
+
+    def test_outbox_depth(self):
+        enqueue_email("Subject", "Body", "noreply@example.com", ["user@example.com"])
+        enqueue_email("Subject", "Body", "noreply@example.com", ["user@example.com"])
+        self.assertEqual(self.sample('mail_outbox_emails', {'status': 'pending'}), 2)
+        self.assertEqual(self.sample('mail_outbox_emails', {'status': 'failed'}), 0)
+
+    def test_requires_token_without_debug(self):
+        with override_settings(DEBUG=False, METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_workers_are_aggregated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory}
+            for _ in range(2):
+                result = subprocess.run(
+                    [sys.executable, '-c', self.WORKER_SCRIPT],
+                    env=env, cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=60,
+                )
+                self.assertEqual(result.returncode, 0, result.stderr)
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry, path=directory)
+            labels = {'operation': 'RecentEvents'}
+            self.assertEqual(registry.get_sample_value('graphql_requests_total', {**labels, 'status': 'ok'}), 2)
+            self.assertEqual(registry.get_sample_value('graphql_request_duration_seconds_count', labels), 2)
+
+
+class TestLogHandlers(TestCase):
+    WORKER_SCRIPT = '''
+import logging
+import sys
+from YekiKamePrj.log_handlers import JSONFormatter, SharedRotatingFileHandler
+
+handler = SharedRotatingFileHandler(sys.argv[1], maxBytes=20000, backupCount=1000, encoding='utf8')
+handler.setFormatter(JSONFormatter())
+logger = logging.getLogger('worker')
+logger.addHandler(handler)
+logger.setLevel(logging.INFO)
+for number in range(int(sys.argv[2])):
+    logger.info("line %s of worker %s", number, sys.argv[3])
+'''
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'app.log')
+        self.logger = logging.getLogger(f'test.{self.id()}')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+
+    def tearDown(self):
+        for handler in self.logger.handlers:
+            handler.close()
+            self.logger.removeHandler(handler)
+        self.directory.cleanup()
+
+    def read_lines(self):
+        with open(self.path, encoding='utf8') as log_file:
+            return [json.loads(line) for line in log_file]
+
+    def queue_handler(self, queue_size=100):
+        handler = QueueFileHandler(self.path, encoding='utf8', queue_size=queue_size)
+        handler.setFormatter(JSONFormatter())
+        self.logger.addHandler(handler)
+        return handler
+
+    def test_records_are_written_as_json_lines(self):
+        handler = self.queue_handler()
+        self.logger.info("سلام %s", "دنیا", extra={'status_code': 200})
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            self.logger.exception("failed")
+        handler.flush()
+        first, second = self.read_lines()
+        self.assertEqual(first['message'], "سلام دنیا")
+        self.assertEqual(first['level'], 'INFO')
+        self.assertEqual(first['status_code'], 200)
+        self.assertIn('ValueError: boom', second['exception'])
+
+    def test_full_queue_drops_and_reports(self):
+        handler = self.queue_handler(queue_size=2)
+        # بدون listener صف خالی نمی‌شود
+        handler.listener.stop()
+        for number in range(5):
+            self.logger.info("record %s", number)
+        self.assertEqual(handler.dropped, 3)
+        handler.listener.start()
+        handler.flush()
+        self.logger.info("after")
+        handler.flush()
+        messages = [line['message'] for line in self.read_lines()]
+        self.assertEqual(messages, [
+            "record 0", "record 1",
+            "Dropped 3 log records because the logging queue was full", "after",
+        ])
+
+    def test_rotation_is_safe_across_processes(self):
+        workers = [
+            subprocess.Popen(
+                [sys.executable, '-c', self.WORKER_SCRIPT, self.path, '3000', str(worker)],
+                cwd=settings.BASE_DIR, stderr=subprocess.PIPE, text=True,
+            )
+            for worker in range(4)
+        ]
+        for worker in workers:
+            _, stderr = worker.communicate(timeout=60)
+            self.assertEqual(worker.returncode, 0, stderr)
+            self.assertNotIn('Traceback', stderr)
+
+        lines = []
+        for name in os.listdir(self.directory.name):
+            if name.startswith('app.log') and not name.endswith('.lock'):
+                with open(os.path.join(self.directory.name, name), encoding='utf8') as log_file:
+                    lines.extend(json.loads(line)['message'] for line in log_file)
+                self.assertLessEqual(os.path.getsize(os.path.join(self.directory.name, name)), 20000)
+        # هیچ خطی گم یا تکه‌تکه نشده است
+        self.assertEqual(len(lines), 12000)
+        self.assertEqual(len(set(lines)), 12000)
+
+
+class TestStreamingUploads(TestCase):
+    MUTATION = '''
+        mutation ($image: Upload) {
+            createEvent(
+                title: "Upload", eventCategory: "social", aboutEvent: "About", image: $image,
+                startDate: "2030-01-02T09:00:00Z", endDate: "2030-01-02T17:00:00Z",
+                registrationStartDate: "2029-12-01T09:00:00Z", registrationEndDate: "2030-01-01T09:00:00Z",
+                province: "تهران", city: "تهران", fullDescription: "Full", maxSubscribers: 10,
+                eventOwnerPhone: "09123456789"
+            ) { event { id image } }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        AppUser.objects.create_user(phone="09123456789", password="password123")
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=self.media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def upload(self, content, **extra):
+        return self.client.post('/graphql/', {
+            'operations': json.dumps({'query': self.MUTATION, 'variables': {'image': None}}),
+            'map': json.dumps({'0': ['variables.image']}),
+            '0': SimpleUploadedFile('photo.png', content, content_type='image/png'),
+        }, **extra)
+
+    def image_bytes(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 48), 'blue').save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def stored_files(self):
+        directory = os.path.join(self.media.name, 'event_images')
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def test_file_is_named_by_its_content_hash(self):
+        content = self.image_bytes()
+        with self.captureOnCommitCallbacks(execute=False):
+            first = self.upload(content).json()['data']['createEvent']['event']
+            second = self.upload(content).json()['data']['createEvent']['event']
+
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(first['image'], f'/media/event_images/{digest}.png')
+        self.assertEqual(second['image'], first['image'])
+        self.assertEqual(self.stored_files(), [f'{digest}.png'])
+
+    @override_settings(UPLOAD_MAX_BYTES=1000)
+    def test_too_large_file_is_refused_while_streaming(self):
+        response = self.upload(b'x' * 5000)
+        self.assertEqual(response.status_code, 413)
+        self.assertIn('larger than 1000 bytes', response.json()['errors'][0]['message'])
+        self.assertFalse(Event.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    @override_settings(UPLOAD_MAX_BYTES=1000, DATA_UPLOAD_MAX_MEMORY_SIZE=None)
+    def test_content_length_is_checked_before_reading_the_body(self):
+        with mock.patch('YekiKamePrj.upload_handlers.HashingUploadHandler.receive_data_chunk') as receive:
+            response = self.upload(b'x' * 5000)
+        self.assertEqual(response.status_code, 413)
+        receive.assert_not_called()
+
+
+class TestIncrement(TestCase):
+    def file_cache(self, location):
+        return override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }})
+
+    def test_parallel_increments_are_not_lost(self):
+        with tempfile.TemporaryDirectory() as location, self.file_cache(location):
+            with ThreadPoolExecutor(8) as pool:
+                values = list(pool.map(lambda _: increment('counter', 60), range(80)))
+            self.assertEqual(sorted(values), list(range(1, 81)))
+
+    def test_timeout_counts_from_the_first_increment(self):
+        with tempfile.TemporaryDirectory() as location, self.file_cache(location):
+            with mock.patch('time.time', return_value=1000.0):
+                increment('counter', 600)
+            with mock.patch('time.time', return_value=1500.0):
+                self.assertEqual(increment('counter', 600), 2)
+            with mock.patch('time.time', return_value=1601.0):
+                self.assertEqual(increment('counter', 600), 1)
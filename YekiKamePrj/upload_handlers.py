@@ -0,0 +1,62 @@
+"""
+Streaming multipart uploads for ``/graphql/``.
+
+``HashingUploadHandler`` replaces Django's default handlers. Those handlers
+keep files under ``FILE_UPLOAD_MAX_MEMORY_SIZE`` completely in memory.
+This handler writes every file to a temporary file on disk, one
+``chunk_size`` chunk at a time, so the memory used per upload does not
+depend on the file size. On the way it computes the SHA-256 of the
+content (``uploaded_file.sha256``), so the file does not have to be read
+again to name it by its content.
+
+``UPLOAD_MAX_BYTES`` is enforced twice. ``check_content_length`` rejects a
+request whose ``Content-Length`` is already too large, before the body is
+read. The handler stops reading as soon as one file gets larger than the
+limit and sets ``request.upload_too_large``.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def max_request_bytes():
+    # یک فایل به اندازه حداکثر به علاوه فیلدهای عادی فرم (operations و map)
+    return settings.UPLOAD_MAX_BYTES + (settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0)
+
+
+def check_content_length(request):
+    try:
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        content_length = 0
+    if content_length > max_request_bytes():
+        raise UploadTooLarge(f"The upload is larger than {settings.UPLOAD_MAX_BYTES} bytes.")
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Streams each file to a temporary file and computes its SHA-256."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.UPLOAD_MAX_BYTES:
+            if self.request is not None:
+                self.request.upload_too_large = True
+            # فایل موقت توسط parser بسته و حذف می‌شود و بقیه بدنه خوانده نمی‌شود
+            raise StopUpload(connection_reset=True)
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
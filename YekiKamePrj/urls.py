@@ -4,7 +4,6 @@ from django.shortcuts import redirect
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
 from django.conf.urls.static import static
-from graphene_file_upload.django import FileUploadGraphQLView
 """
 URL configuration for YekiKamePrj project.
 
@@ -26,15 +25,19 @@ from django.urls import path
 from django.urls import path
 from graphene_django.views import GraphQLView
 from django.views.decorators.csrf import csrf_exempt
-from .schema import schema
+from .schema import schema, middleware
+from .graphql_view import GraphQLView
+from .views import db_stats, graphql_cache_stats, graphql_profile_stats, prometheus_metrics
 from django.shortcuts import redirect
 urlpatterns = [
     path('', lambda request: redirect('/admin/')),
     path('admin/', admin.site.urls),
-    path("graphql/", csrf_exempt(FileUploadGraphQLView.as_view(graphiql=True, schema=schema))),
+    path('db-stats/', db_stats),
+    path('graphql-cache-stats/', graphql_cache_stats),
+    path('graphql-profile-stats/', graphql_profile_stats),
+    path('metrics', prometheus_metrics),
+    path("graphql/", csrf_exempt(GraphQLView.as_view(graphiql=True, schema=schema, middleware=middleware))),
 
 ]
-urlpatterns.extend(static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT))
-
-if settings.DEBUG:  # True میشه چون DEBUG = True
+if settings.DEBUG:  # در production فایل‌های media توسط nginx سرو می‌شوند
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
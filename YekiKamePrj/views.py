@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from . import document_cache, metrics, profiling, response_cache
+from .db_metrics import connection_stats
+
+
+@staff_member_required
+def db_stats(request):
+    # آمار مربوط به همین process (worker) است
+    return JsonResponse(connection_stats())
+
+
+@staff_member_required
+def graphql_cache_stats(request):
+    # شمارنده‌ها در کش مشترک نگهداری می‌شوند و مربوط به همه workerها هستند
+    stats = response_cache.stats()
+    # کش سندها در حافظه هر process است
+    stats['documents'] = document_cache.stats()
+    return JsonResponse(stats)
+
+
+@staff_member_required
+def graphql_profile_stats(request):
+    # هیستوگرام درخواست‌های نمونه‌برداری شده همین process در چند دقیقه اخیر
+    return JsonResponse({
+        'enabled': settings.GRAPHQL_PROFILING,
+        'sample_rate': settings.GRAPHQL_PROFILING_SAMPLE_RATE,
+        'operations': profiling.histogram.snapshot(),
+    })
+
+
+def prometheus_metrics(request):
+    # بدون توکن فقط در حالت DEBUG باز است؛ در production بدون METRICS_TOKEN وجود ندارد
+    if not settings.METRICS_TOKEN and not settings.DEBUG:
+        raise Http404
+    if settings.METRICS_TOKEN and not constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(metrics.scrape_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,68 @@
+"""
+Benchmark for the ``checkToken`` query.
+
+Fills ``django_session`` with a growing number of login sessions and shows
+that token validation latency stays flat because it goes through the
+``UserSession`` index instead of decoding every session::
+
+    python -m benchmarks.check_token --sizes 1000 10000 100000 1000000
+"""
+import argparse
+from datetime import timedelta
+
+from benchmarks.runner import measure, print_row, test_database
+
+BATCH_SIZE = 5000
+
+
+def fill_sessions(target, user):
+    from django.contrib.sessions.backends.db import SessionStore
+    from django.contrib.sessions.models import Session
+    from django.utils import timezone
+    from django.utils.crypto import get_random_string
+    from userapp.models import UserSession
+
+    store = SessionStore()
+    expire_date = timezone.now() + timedelta(days=14)
+    session_data = store.encode({'user_id': user.id, 'phone': user.phone})
+    current = Session.objects.count()
+    while current < target:
+        size = min(BATCH_SIZE, target - current)
+        sessions = [
+            Session(session_key=get_random_string(32), session_data=session_data, expire_date=expire_date)
+            for _ in range(size)
+        ]
+        Session.objects.bulk_create(sessions)
+        UserSession.objects.bulk_create(
+            [UserSession(session=session, user=user, phone=user.phone) for session in sessions]
+        )
+        current += size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with test_database():
+        from graphene.test import Client
+        from userapp.models import User
+        from userapp.schema import schema
+
+        client = Client(schema)
+        # کاربری که در انتها بررسی می‌شود و session آن بین بقیه session ها قرار دارد
+        target_user = User.objects.create_user(phone='09120000000', password='password123')
+        filler_user = User.objects.create_user(phone='09120000001', password='password123')
+        query = 'query { checkToken(phone: "%s", userId: %d) }' % (target_user.phone, target_user.id)
+
+        for size in sorted(args.sizes):
+            fill_sessions(size - 1, filler_user)
+            fill_sessions(size, target_user)
+            result = client.execute(query)
+            assert result['data']['checkToken'] == "Token is valid.", result
+            print_row(f"{size} sessions", measure(lambda: client.execute(query), repeat=args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark for the database connection modes (``DB_CONNECTION_MODE``).
+
+Sends the same GraphQL query through the full WSGI request cycle, the same
+way gunicorn does, so Django opens and closes connections exactly as in
+production. Compares a new connection per request (``none``) with persistent
+connections and, when psycopg3 with psycopg_pool is installed, the native
+pool::
+
+    python -m benchmarks.db_connections --repeat 500
+
+The difference is only visible on PostgreSQL. SQLite test databases live in
+memory and are never closed.
+"""
+import argparse
+import io
+import json
+from wsgiref.util import setup_testing_defaults
+
+from benchmarks.runner import measure, print_row, test_database
+
+QUERY = '{ recentEvents { id title city startDate } }'
+
+MODES = {
+    'none': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True},
+}
+POOL_OPTIONS = {'min_size': 2, 'max_size': 4, 'timeout': 10}
+
+
+def pool_available(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return is_psycopg3
+
+
+def graphql_request(handler, body):
+    environ = {}
+    setup_testing_defaults(environ)
+    environ.update({
+        'REQUEST_METHOD': 'POST',
+        'PATH_INFO': '/graphql/',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+    })
+    statuses = []
+    response = handler(environ, lambda status, headers: statuses.append(status))
+    try:
+        b''.join(response)
+    finally:
+        # مثل سرور WSGI؛ request_finished و بستن اتصال‌ها اینجا اجرا می‌شود
+        response.close()
+    if not statuses[0].startswith('200'):
+        raise RuntimeError(f"GraphQL request failed: {statuses[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=300)
+    args = parser.parse_args()
+
+    with test_database() as connection:
+        from django.core.handlers.wsgi import WSGIHandler
+        from django.db.backends.signals import connection_created
+        from userapp.models import User
+        from benchmarks.search_events import generate_events
+
+        owner = User.objects.create_user(phone='09120000000', password='password123')
+        generate_events(args.events, owner)
+        print(f"{args.events} events on {connection.vendor}")
+
+        opened = []
+        connection_created.connect(
+            lambda sender, connection, **kwargs: opened.append(connection.alias), weak=False
+        )
+        handler = WSGIHandler()
+        body = json.dumps({'query': QUERY}).encode()
+        original = {key: connection.settings_dict[key] for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        original_options = connection.settings_dict['OPTIONS']
+
+        for mode, mode_settings in MODES.items():
+            if mode == 'pool' and not pool_available(connection):
+                print(f"{mode:>24}  skipped (needs PostgreSQL with psycopg[pool])")
+                continue
+            connection.close()
+            connection.settings_dict.update(mode_settings)
+            options = dict(original_options)
+            options.pop('pool', None)
+            if mode == 'pool':
+                options['pool'] = POOL_OPTIONS
+            connection.settings_dict['OPTIONS'] = options
+            opened.clear()
+            try:
+                stats = measure(lambda: graphql_request(handler, body), repeat=args.repeat)
+            finally:
+                connection.close()
+                if mode == 'pool':
+                    connection.close_pool()
+            print_row(mode, stats)
+            print(f"{'':>24}  connections opened: {len(opened)}")
+
+        connection.settings_dict.update(original)
+        connection.settings_dict['OPTIONS'] = original_options
+
+
+if __name__ == '__main__':
+    main()
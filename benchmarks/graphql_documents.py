@@ -0,0 +1,105 @@
+"""
+Benchmark for the GraphQL document cache (``YekiKamePrj/document_cache.py``).
+
+Sends a few of the frontend's hot operations to ``/graphql/`` and measures the
+CPU time per request with the document cache disabled (every request parses
+and validates the query) and enabled. Parsing and validating on its own is
+measured too. The public response cache is turned off so every request runs
+its resolvers::
+
+    python -m benchmarks.graphql_documents --repeat 500
+"""
+import argparse
+import json
+import time
+
+from benchmarks.runner import measure, print_row, test_database
+
+EVENT_FIELDS = '''
+fragment EventCard on EventType {
+  id title aboutEvent city neighborhood eventCategory startDate endDate
+  registrationEndDate maxSubscribers subscriberCount image
+  eventOwner { id phone fullname }
+}
+'''
+QUERIES = {
+    'filteredEventsPage': (
+        'query FilteredEvents($city: String!, $after: String) {'
+        '  filteredEventsPage(city: $city, limit: 10, after: $after) {'
+        '    nextCursor hasNextPage events { ...EventCard }'
+        '  }'
+        '}' + EVENT_FIELDS,
+        {'city': 'Tehran'},
+    ),
+    'eventDetails': (
+        'query EventDetails($eventId: ID!) {'
+        '  eventDetails(eventId: $eventId) {'
+        '    error event { id title fullDescription city startDate endDate subscriberCount'
+        '      eventCategory eventOwner { id phone fullname } }'
+        '  }'
+        '  relatedEvents(eventId: $eventId) { ...EventCard }'
+        '  reviewsByEventPage(eventId: $eventId, limit: 5) {'
+        '    nextCursor reviews { id rating commentText createdAt user { id fullname } }'
+        '  }'
+        '}' + EVENT_FIELDS,
+        None,
+    ),
+    'recentEvents': ('query RecentEvents { recentEvents { ...EventCard } }' + EVENT_FIELDS, None),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=300)
+    args = parser.parse_args()
+
+    with test_database():
+        from django.conf import settings
+        from django.test import Client
+        from graphene_django.settings import graphene_settings
+        from graphql import parse, validate
+        from userapp.models import User
+        from Eventapp.models import Event
+        from YekiKamePrj import document_cache
+        from YekiKamePrj.schema import schema
+        from benchmarks.search_events import generate_events
+
+        settings.GRAPHQL_RESPONSE_CACHE = False
+        owner = User.objects.create_user(phone='09120000000', password='password123')
+        generate_events(args.events, owner)
+        Event.objects.update(city='Tehran')
+        event_id = Event.objects.order_by('id').values_list('id', flat=True).first()
+
+        client = Client()
+        graphql_schema = schema.graphql_schema
+        maxsize = document_cache.documents.maxsize
+
+        for name, (query, variables) in QUERIES.items():
+            variables = variables or {'eventId': event_id}
+            body = json.dumps({'query': query, 'variables': variables})
+
+            def request():
+                response = client.post('/graphql/', body, content_type='application/json')
+                if response.status_code != 200 or 'errors' in response.json():
+                    raise RuntimeError(f"{name} failed: {response.content[:300]}")
+
+            def parse_and_validate():
+                validate(graphql_schema, parse(query), None, graphene_settings.MAX_VALIDATION_ERRORS)
+
+            print(f"{name} ({len(query)} chars)")
+            print_row('parse + validate', measure(parse_and_validate, args.repeat, clock=time.process_time))
+            document_cache.documents.clear()
+            document_cache.documents.maxsize = 0
+            uncached = measure(request, args.repeat, clock=time.process_time)
+            print_row('request, no cache', uncached)
+            document_cache.documents.maxsize = maxsize
+            cached = measure(request, args.repeat, clock=time.process_time)
+            print_row('request, cached', cached)
+            print(f"{'':>24}  CPU saved per request: {uncached['mean'] - cached['mean']:.3f}ms (mean)")
+
+        print(f"document cache: {document_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
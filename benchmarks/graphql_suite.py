@@ -0,0 +1,387 @@
+"""
+Latency and SQL query baseline for the main GraphQL operations.
+
+Fills a throwaway test database with ``generate_synthetic_data`` (or, with
+``--existing``, uses the configured database, for example after running the
+command there with millions of rows) and replays the main queries and
+mutations through ``/graphql/``. Each operation runs ``--repeat`` times with
+arguments drawn from the data: popular and quiet events, organisers with many
+and few events, and so on. Mutations run in a transaction that is rolled
+back, so every run sees the same data. The response cache is turned off so
+every request runs its resolvers.
+
+The p50/p95/p99 latency and the SQL queries per operation are written to a
+JSON baseline. ``--compare`` prints the change against an older baseline and
+exits with status 1 when an operation's p95 grew by more than
+``--threshold`` or it runs more queries. Latencies are only comparable on the
+same machine, database and dataset::
+
+    python -m benchmarks.graphql_suite --users 20000 --events 50000 --output baseline.json
+    python -m benchmarks.graphql_suite --users 20000 --events 50000 --compare baseline.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from benchmarks.runner import print_row, setup_django, summarize, test_database
+
+EVENT_CARD = '''
+fragment EventCard on EventType {
+  id title aboutEvent city neighborhood eventCategory startDate endDate
+  registrationEndDate maxSubscribers subscriberCount image rating { count average }
+  eventOwner { id phone fullname }
+}
+'''
+
+# نام عملیات: (متن، نوع نمونه‌ای که متغیرها از آن ساخته می‌شوند)
+OPERATIONS = {
+    'recentEvents': ('query RecentEvents { recentEvents { ...EventCard } }' + EVENT_CARD, None),
+    'filteredEventsPage': (
+        'query FilteredEvents($city: String!, $category: String) {'
+        '  filteredEventsPage(city: $city, eventCategory: $category, limit: 10) {'
+        '    nextCursor hasNextPage events { ...EventCard }'
+        '  }'
+        '}' + EVENT_CARD,
+        'city',
+    ),
+    'eventDetails': (
+        'query EventDetails($eventId: ID!) {'
+        '  eventDetails(eventId: $eventId) {'
+        '    error event { id title fullDescription city startDate endDate subscriberCount'
+        '      eventCategory eventOwner { id phone fullname } }'
+        '  }'
+        '  relatedEvents(eventId: $eventId) { ...EventCard }'
+        '  reviewsByEventPage(eventId: $eventId, limit: 5) {'
+        '    nextCursor reviews { id rating commentText createdAt user { id fullname } }'
+        '  }'
+        '}' + EVENT_CARD,
+        'event',
+    ),
+    'searchEvents': (
+        'query SearchEvents($text: String!) {'
+        '  searchEvents(text: $text, limit: 10) { nextCursor events { ...EventCard } }'
+        '}' + EVENT_CARD,
+        'search',
+    ),
+    'eventsByOwnerPage': (
+        'query OwnerEvents($phone: String!) {'
+        '  eventsByOwnerPage(phone: $phone, limit: 20) { nextCursor events { ...EventCard } }'
+        '}' + EVENT_CARD,
+        'owner',
+    ),
+    'pastEventsPage': (
+        'query PastEvents($phone: String!) {'
+        '  pastEventsPage(phone: $phone, limit: 20) { nextCursor events { id title startDate city role } }'
+        '}',
+        'member',
+    ),
+    'userNotifications': (
+        'query Notifications($phone: String!) {'
+        '  userNotifications(phone: $phone) { id eventTitle statusMessage eventId isApproved role createdAt }'
+        '}',
+        'member',
+    ),
+    'pendingJoinRequestsPage': (
+        'query PendingRequests($eventId: ID!, $ownerPhone: String!) {'
+        '  pendingJoinRequestsPage(eventId: $eventId, ownerPhone: $ownerPhone, limit: 20) {'
+        '    nextCursor requests { id role isApproved createdAt user { id phone fullname } }'
+        '  }'
+        '}',
+        'pending',
+    ),
+    'commentsByReviewPage': (
+        'query Comments($reviewId: ID!) {'
+        '  commentsByReviewPage(reviewId: $reviewId, limit: 20) {'
+        '    nextCursor comments { id commentText createdAt level isActive user { id fullname } }'
+        '  }'
+        '}',
+        'review',
+    ),
+    'commentThread': (
+        'query CommentThread($reviewId: ID!) {'
+        '  commentThread(reviewId: $reviewId) {'
+        '    id commentText createdAt user { id fullname }'
+        '    replies { id commentText createdAt user { id fullname }'
+        '      replies { id commentText createdAt user { id fullname } } }'
+        '  }'
+        '}',
+        'review',
+    ),
+    'userTicketsPage': (
+        'query Tickets($phone: String!) {'
+        '  userTicketsPage(phone: $phone, limit: 20) { nextCursor tickets { id title status priority createdAt } }'
+        '}',
+        'ticket',
+    ),
+    'ticketMessagesPage': (
+        'query TicketMessages($ticketId: ID!) {'
+        '  ticketMessagesPage(ticketId: $ticketId, limit: 20) {'
+        '    nextCursor messages { id message createdAt user { id fullname } }'
+        '  }'
+        '}',
+        'ticket',
+    ),
+    'requestJoinEvent': (
+        'mutation Join($eventId: ID!, $phone: String!) {'
+        '  requestJoinEvent(eventId: $eventId, phone: $phone) { success message }'
+        '}',
+        'join',
+    ),
+    'reviewJoinRequest': (
+        'mutation Approve($eventId: ID!, $userId: ID!, $ownerPhone: String!) {'
+        '  reviewJoinRequest(eventId: $eventId, userId: $userId, action: "approve", ownerPhone: $ownerPhone) {'
+        '    success message'
+        '  }'
+        '}',
+        'pending',
+    ),
+    'createEvent': (
+        'mutation CreateEvent($title: String!, $city: String!, $phone: String!, $start: DateTime!,'
+        '    $end: DateTime!, $registrationStart: DateTime!, $registrationEnd: DateTime!) {'
+        '  createEvent(title: $title, eventCategory: "social", aboutEvent: "benchmark",'
+        '      fullDescription: "benchmark", startDate: $start, endDate: $end,'
+        '      registrationStartDate: $registrationStart, registrationEndDate: $registrationEnd,'
+        '      province: $city, city: $city, maxSubscribers: 50, eventOwnerPhone: $phone) {'
+        '    event { id }'
+        '  }'
+        '}',
+        'new_event',
+    ),
+    'createReview': (
+        'mutation Review($eventId: ID!, $userId: ID!) {'
+        '  createReview(eventId: $eventId, userId: $userId, rating: 4, commentText: "خوب بود") { review { id } }'
+        '}',
+        'member',
+    ),
+    'createComment': (
+        'mutation Comment($reviewId: ID!, $userId: ID!) {'
+        '  createComment(reviewId: $reviewId, userId: $userId, commentText: "موافقم") { comment { id } }'
+        '}',
+        'review',
+    ),
+    'createTicketMessage': (
+        'mutation TicketMessage($ticketId: ID!, $phone: String!) {'
+        '  createTicketMessage(ticketId: $ticketId, phone: $phone, message: "پیگیری") { ticketMessage { id } }'
+        '}',
+        'ticket',
+    ),
+}
+SEARCH_TEXTS = ['شطرنج', 'کارگاه پایتون', 'کوهنوردی آخرهفته', 'کنسرت', 'دورهمی شبانه']
+
+
+@contextmanager
+def configured_database():
+    setup_django()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    try:
+        yield connection
+    finally:
+        teardown_test_environment()
+
+
+def sample_rows(model, count, rng, **filters):
+    """Up to ``count`` rows matching ``filters``, starting at random ids."""
+    from django.db.models import Max, Min
+
+    bounds = model.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return []
+    rows = []
+    for _ in range(count):
+        start = rng.randint(bounds['low'], bounds['high'])
+        row = model.objects.filter(id__gte=start, **filters).order_by('id').first()
+        row = row or model.objects.filter(**filters).order_by('id').first()
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+def build_variables(rng, count):
+    """Return ``{sample kind: [variables, ...]}`` drawn from the database."""
+    from django.db.models import Count
+    from django.utils import timezone
+    from Eventapp.models import Comment, Event, Review, UserEventRole
+    from Support.models import Ticket
+    from userapp.models import User
+
+    now = timezone.now()
+    events = sample_rows(Event, count, rng)
+    # پرکارترین برگزارکننده‌ها و چند برگزارکننده تصادفی
+    busy_owners = list(
+        Event.objects.values('event_owner').annotate(events=Count('id')).order_by('-events')
+        .values_list('event_owner__phone', flat=True)[:5]
+    )
+    owners = busy_owners + [event.event_owner.phone for event in events[:count - len(busy_owners)]]
+    members = sample_rows(UserEventRole, count, rng, is_approved=True)
+    pending = sample_rows(UserEventRole, count, rng, is_approved=None)
+    reviews = [comment.review_id for comment in sample_rows(Comment, count, rng)]
+    reviews += [review.id for review in sample_rows(Review, count, rng)]
+    tickets = sample_rows(Ticket, count, rng)
+    users = sample_rows(User, count, rng)
+    upcoming = sample_rows(Event, count, rng, start_date__gt=now)
+    cities = [event.city for event in events]
+
+    return {
+        None: [None],
+        'city': [
+            {'city': city, 'category': rng.choice([None, 'education', 'sport', 'social'])} for city in cities
+        ],
+        'event': [{'eventId': event.id} for event in events],
+        'search': [{'text': text} for text in SEARCH_TEXTS],
+        'owner': [{'phone': phone} for phone in owners],
+        'member': [
+            {'phone': role.user.phone, 'userId': role.user_id, 'eventId': role.event_id} for role in members
+        ],
+        'pending': [
+            {'eventId': role.event_id, 'userId': role.user_id, 'ownerPhone': role.event.event_owner.phone}
+            for role in pending
+        ],
+        'review': [{'reviewId': review_id, 'userId': users[i % len(users)].id} for i, review_id in enumerate(reviews)],
+        'ticket': [{'phone': ticket.created_by.phone, 'ticketId': ticket.id} for ticket in tickets],
+        'join': [
+            {'eventId': event.id, 'phone': users[i % len(users)].phone} for i, event in enumerate(upcoming)
+        ],
+        'new_event': [
+            {
+                'title': f'رویداد آزمایشی {i}',
+                'city': city,
+                'phone': owners[i % len(owners)],
+                'start': (now + timedelta(days=30)).isoformat(),
+                'end': (now + timedelta(days=30, hours=3)).isoformat(),
+                'registrationStart': now.isoformat(),
+                'registrationEnd': (now + timedelta(days=29)).isoformat(),
+            }
+            for i, city in enumerate(cities)
+        ],
+    }
+
+
+def run_operation(client, connection, name, query, variables_list, repeat):
+    from django.db import transaction
+
+    is_mutation = query.startswith('mutation')
+    timings = []
+    queries = []
+
+    def count_query(execute, sql, params, many, context):
+        queries[-1] += 1
+        return execute(sql, params, many, context)
+
+    for i in range(repeat + 1):
+        variables = variables_list[i % len(variables_list)]
+        body = json.dumps({'query': query, 'variables': variables})
+        queries.append(0)
+        with transaction.atomic(), connection.execute_wrapper(count_query):
+            start = time.perf_counter()
+            response = client.post('/graphql/', body, content_type='application/json')
+            elapsed = time.perf_counter() - start
+            # داده‌ها بین تکرارها و اجراها یکسان می‌ماند
+            transaction.set_rollback(is_mutation)
+        if response.status_code != 200 or 'errors' in response.json():
+            raise RuntimeError(f"{name} failed: {response.content[:300]}")
+        timings.append(elapsed * 1000)
+    # اجرای اول (ساختن document و گرم شدن کش‌ها) حساب نمی‌شود
+    timings, queries = timings[1:], queries[1:]
+    stats = summarize(timings)
+    stats['queries'] = {'mean': sum(queries) / len(queries), 'max': max(queries)}
+    return stats
+
+
+def compare(baseline, result, threshold):
+    """Print the change per operation and return the names of the regressed ones."""
+    if baseline.get('dataset') != result['dataset']:
+        print("warning: the baseline was recorded on a different dataset")
+    regressions = []
+    print(f"{'':>24}  {'p95 before':>11}  {'p95 now':>9}  {'change':>7}  {'queries':>9}")
+    for name, stats in result['operations'].items():
+        old = baseline['operations'].get(name)
+        if old is None:
+            print(f"{name:>24}  (new)")
+            continue
+        change = stats['p95'] / old['p95'] - 1 if old['p95'] else 0
+        queries = f"{old['queries']['max']}->{stats['queries']['max']}"
+        slower = change > threshold
+        more_queries = stats['queries']['max'] > old['queries']['max']
+        flag = '  REGRESSION' if slower or more_queries else ''
+        print(f"{name:>24}  {old['p95']:9.3f}ms  {stats['p95']:7.3f}ms  {change:+7.1%}  {queries:>9}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--existing', action='store_true',
+                        help="Use the data already in the configured database instead of generating it.")
+    parser.add_argument('--operations', nargs='*', choices=list(OPERATIONS), help="Only run these operations.")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--compare', help="Compare the results with this JSON baseline.")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed p95 growth (default 0.2 = 20%%).")
+    args = parser.parse_args()
+
+    database = configured_database() if args.existing else test_database()
+    with database as connection:
+        from django.conf import settings
+        from django.test import Client
+        from Eventapp.models import Comment, Event, Review, UserEventRole
+        from Eventapp.synthetic_data import generate
+        from Support.models import Ticket, TicketMessage
+        from userapp.models import User
+
+        settings.GRAPHQL_RESPONSE_CACHE = False
+        if not args.existing:
+            generate(args.users, args.events, args.users // 20, seed=args.seed)
+        dataset = {
+            model.__name__: model.objects.count()
+            for model in (User, Event, UserEventRole, Review, Comment, Ticket, TicketMessage)
+        }
+        print(f"{connection.vendor}: " + ', '.join(f'{count} {name}' for name, count in dataset.items()))
+
+        rng = random.Random(args.seed)
+        variables = build_variables(rng, 50)
+        client = Client()
+        operations = {}
+        for name in args.operations or OPERATIONS:
+            query, kind = OPERATIONS[name]
+            if not variables[kind]:
+                print(f"{name:>24}  skipped (no data)")
+                continue
+            stats = run_operation(client, connection, name, query, variables[kind], args.repeat)
+            print_row(name, stats)
+            print(f"{'':>24}  SQL queries: mean {stats['queries']['mean']:.1f}, max {stats['queries']['max']}")
+            operations[name] = {
+                key: round(value, 3) if isinstance(value, float) else value for key, value in stats.items()
+            }
+
+        result = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'database': connection.vendor,
+            'dataset': dataset,
+            'repeat': args.repeat,
+            'operations': operations,
+        }
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as file:
+                json.dump(result, file, ensure_ascii=False, indent=2)
+            print(f"results written to {args.output}")
+        if args.compare:
+            with open(args.compare, encoding='utf-8') as file:
+                regressions = compare(json.load(file), result, args.threshold)
+            if regressions:
+                print(f"regressed: {', '.join(regressions)}")
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+HTTP load test for the GraphQL endpoint.
+
+Starts each server in turn on a free local port (``runserver``, gunicorn with
+the threaded WSGI workers from ``gunicorn.conf.py`` and gunicorn with uvicorn
+ASGI workers), sends the same GraphQL query from ``--concurrency`` keep-alive
+connections for ``--duration`` seconds and prints requests per second and
+latency percentiles::
+
+    python -m benchmarks.load_test --duration 20 --concurrency 32
+
+The servers use the configured ``DATABASES`` and the query is read only. To
+load test a server that is already running (for example through nginx), pass
+its URL instead::
+
+    python -m benchmarks.load_test --url http://localhost/graphql/
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from benchmarks.runner import print_row, summarize
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_QUERY = '{ recentEvents { id title city startDate } }'
+
+# نام سرور: (دستور اجرا، متغیرهای محیطی اضافه)
+SERVERS = {
+    'runserver': (['manage.py', 'runserver', '127.0.0.1:{port}', '--noreload'], {}),
+    'gunicorn': (['-m', 'gunicorn', '--bind', '127.0.0.1:{port}'], {}),
+    # gunicorn.conf.py با این worker به جای wsgi.py از asgi.py استفاده می‌کند
+    'uvicorn': (
+        ['-m', 'gunicorn', '--bind', '127.0.0.1:{port}'],
+        {'GUNICORN_WORKER_CLASS': 'uvicorn.workers.UvicornWorker'},
+    ),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def post(connection, path, body):
+    connection.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def wait_until_ready(url, body, timeout=30):
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=5)
+            try:
+                if post(connection, parts.path, body) == 200:
+                    return
+            finally:
+                connection.close()
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become ready in {timeout}s")
+
+
+def run_load(url, body, concurrency, duration):
+    """Send ``body`` to ``url`` from ``concurrency`` connections; return (requests, errors, timings)."""
+    parts = urlsplit(url)
+    deadline = time.monotonic() + duration
+    timings = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def client():
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+        local_timings = []
+        local_errors = 0
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status = post(connection, parts.path, body)
+            except (OSError, http.client.HTTPException):
+                # سرور اتصال را بسته است؛ اتصال جدید ساخته می‌شود
+                connection.close()
+                connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+                local_errors += 1
+                continue
+            if status == 200:
+                local_timings.append((time.perf_counter() - start) * 1000)
+            else:
+                local_errors += 1
+        connection.close()
+        with lock:
+            timings.extend(local_timings)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(timings), errors[0], timings
+
+
+def report(label, url, body, args):
+    # گرم کردن سرور (import ها، اتصال دیتابیس هر worker) قبل از اندازه‌گیری
+    run_load(url, body, args.concurrency, min(2, args.duration))
+    requests, errors, timings = run_load(url, body, args.concurrency, args.duration)
+    if not timings:
+        print(f"{label:>24}  no successful requests ({errors} errors)")
+        return
+    print(f"{label:>24}  {requests / args.duration:10.1f} req/s  errors={errors}")
+    print_row(label, summarize(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='load test this running server instead of starting one')
+    parser.add_argument('--servers', nargs='+', choices=SERVERS, default=list(SERVERS))
+    parser.add_argument('--query', default=DEFAULT_QUERY)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+    body = json.dumps({'query': args.query})
+
+    if args.url:
+        wait_until_ready(args.url, body)
+        report(args.url, args.url, body, args)
+        return
+
+    env = {**os.environ, 'DEBUG': 'False'}
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'YekiKamePrj.settings')
+    for name in args.servers:
+        port = free_port()
+        url = f'http://127.0.0.1:{port}/graphql/'
+        arguments, extra_env = SERVERS[name]
+        process = subprocess.Popen(
+            [sys.executable, *(argument.format(port=port) for argument in arguments)],
+            cwd=BASE_DIR, env={**env, **extra_env},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(url, body)
+            report(name, url, body, args)
+        finally:
+            process.terminate()
+            process.wait(timeout=60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark for the logging modes (``DJANGO_LOG_MODE``).
+
+Several threads (like gthread workers) send GraphQL requests through the full
+WSGI cycle. Every request also writes a few log records, as a busy view
+would. The per-request latency is compared with no file logging, with the
+synchronous ``RotatingFileHandler`` and with ``QueueFileHandler``. A small
+``--max-bytes`` makes rollovers frequent::
+
+    python -m benchmarks.logging_pipeline --threads 8 --requests 300
+"""
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.db_connections import graphql_request
+from benchmarks.runner import print_row, summarize, test_database
+
+QUERY = '{ recentEvents { id title city startDate } }'
+
+
+def sync_handler(path, max_bytes):
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=5, encoding='utf8')
+    handler.setFormatter(logging.Formatter('[{asctime}] {levelname} {name} {message}', style='{'))
+    return handler
+
+
+def queue_handler(path, max_bytes):
+    from YekiKamePrj.log_handlers import JSONFormatter, QueueFileHandler
+
+    handler = QueueFileHandler(path, max_bytes=max_bytes, backup_count=5, encoding='utf8')
+    handler.setFormatter(JSONFormatter())
+    return handler
+
+
+MODES = {
+    'no file logging': None,
+    'sync': sync_handler,
+    'queue': queue_handler,
+}
+
+
+def run(handler, wsgi_handler, body, threads, requests, records):
+    logger = logging.getLogger('benchmarks.request')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.handlers = [handler] if handler else [logging.NullHandler()]
+
+    timings = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for number in range(requests):
+            start = time.perf_counter()
+            for step in range(records):
+                logger.info("request %s step %s phone=%s", number, step, '09120000000', extra={'status_code': 200})
+            graphql_request(wsgi_handler, body)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            timings.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return summarize(timings), len(timings) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help="requests per thread")
+    parser.add_argument('--records', type=int, default=20, help="log records per request")
+    parser.add_argument('--max-bytes', type=int, default=1024 * 1024)
+    args = parser.parse_args()
+
+    with test_database():
+        from django.core.handlers.wsgi import WSGIHandler
+        from userapp.models import User
+        from benchmarks.search_events import generate_events
+
+        owner = User.objects.create_user(phone='09120000000', password='password123')
+        generate_events(200, owner)
+        wsgi_handler = WSGIHandler()
+        body = json.dumps({'query': QUERY}).encode()
+
+        for mode, factory in MODES.items():
+            with tempfile.TemporaryDirectory() as directory:
+                handler = factory(os.path.join(directory, 'app.log'), args.max_bytes) if factory else None
+                stats, throughput = run(handler, wsgi_handler, body, args.threads, args.requests, args.records)
+                dropped = getattr(handler, 'dropped', 0)
+                if handler:
+                    handler.close()
+            print_row(mode, stats)
+            print(f"{'':>24}  {throughput:.0f} requests/s, {dropped} records dropped")
+
+
+if __name__ == '__main__':
+    main()
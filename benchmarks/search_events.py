@@ -0,0 +1,85 @@
+"""
+Benchmark for event search.
+
+Generates synthetic events and compares the old ``title__icontains`` scan
+with ``Eventapp.search.search_events``. The numbers only mean something on
+PostgreSQL, where the GIN indexes from migration 0011 exist::
+
+    python -m benchmarks.search_events --events 1000000
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from benchmarks.runner import measure, print_row, test_database
+
+BATCH_SIZE = 10000
+WORDS = [
+    'کنسرت', 'موسیقی', 'شطرنج', 'فوتبال', 'کوهنوردی', 'کتابخوانی', 'برنامه‌نویسی', 'عکاسی',
+    'نقاشی', 'سینما', 'تئاتر', 'یوگا', 'دوچرخه', 'آشپزی', 'زبان', 'انگلیسی', 'پایتون', 'جنگو',
+    'دورهمی', 'کارگاه', 'آموزشی', 'تهران', 'شیراز', 'اصفهان', 'مشهد', 'تبریز', 'شبانه', 'آخرهفته',
+]
+QUERIES = ['شطرنج', 'کارگاه پایتون', 'کوهنوردی آخرهفته', 'شترنج', 'عکاسی شبانه تهران']
+
+
+def sentence(rng, size):
+    return ' '.join(rng.choice(WORDS) for _ in range(size))
+
+
+def generate_events(count, owner, seed=0):
+    from django.utils import timezone
+    from Eventapp.models import Event
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    created = 0
+    while created < count:
+        size = min(BATCH_SIZE, count - created)
+        Event.objects.bulk_create([
+            Event(
+                title=sentence(rng, 3),
+                about_event=sentence(rng, 8),
+                full_description=sentence(rng, 30),
+                start_date=now + timedelta(days=rng.randint(1, 60)),
+                end_date=now + timedelta(days=rng.randint(61, 90)),
+                registration_end_date=now + timedelta(days=rng.randint(0, 30)),
+                max_subscribers=rng.randint(5, 500),
+                event_owner=owner,
+            )
+            for _ in range(size)
+        ])
+        created += size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with test_database() as connection:
+        from django.db.models import Q
+        from django.utils import timezone
+        from Eventapp.models import Event
+        from Eventapp.search import search_events
+        from userapp.models import User
+
+        owner = User.objects.create_user(phone='09120000000', password='password123')
+        generate_events(args.events, owner)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE "Eventapp_event"')
+        print(f"{args.events} events on {connection.vendor}")
+
+        for text in QUERIES:
+            def legacy():
+                return list(Event.objects.filter(
+                    Q(title__icontains=text) & Q(registration_end_date__gte=timezone.now())
+                ).order_by('-start_date')[:10])
+
+            print_row(f"icontains '{text}'", measure(legacy, repeat=args.repeat, warmup=2))
+            print_row(f"search '{text}'", measure(lambda: search_events(text, 10), repeat=args.repeat, warmup=2))
+
+
+if __name__ == '__main__':
+    main()
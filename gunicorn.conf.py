@@ -0,0 +1,76 @@
+"""
+Gunicorn settings for serving YekiKamePrj in production.
+
+Gunicorn picks this file up automatically when started from the project root::
+
+    gunicorn
+
+Every value can be overridden with an environment variable, so the same image
+works on machines of any size. By default the WSGI app runs on threaded
+workers (the resolvers are synchronous). Set
+``GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker`` to serve
+``YekiKamePrj/asgi.py`` through uvicorn instead.
+
+Send ``SIGHUP`` to the master process to reload the code and replace the
+workers one by one without dropping in-flight requests.
+
+Workers share their Prometheus metrics through ``PROMETHEUS_MULTIPROC_DIR``
+(see ``YekiKamePrj/metrics.py``); the directory is emptied when gunicorn
+starts.
+"""
+import multiprocessing
+import os
+import shutil
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# تعداد worker بر اساس تعداد هسته‌های CPU (فرمول پیشنهادی gunicorn)
+workers = env_int('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = env_int('GUNICORN_THREADS', 4)
+
+if worker_class.startswith('uvicorn'):
+    wsgi_app = 'YekiKamePrj.asgi:application'
+else:
+    wsgi_app = 'YekiKamePrj.wsgi:application'
+
+# nginx اتصال‌های upstream را تا 60 ثانیه باز نگه می‌دارد؛ keepalive اینجا باید
+# بیشتر باشد تا gunicorn اتصالی را که nginx هنوز استفاده می‌کند نبندد
+keepalive = env_int('GUNICORN_KEEPALIVE', 75)
+backlog = env_int('GUNICORN_BACKLOG', 2048)
+
+# درخواست‌هایی که بیشتر از timeout طول بکشند worker را restart می‌کنند
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+# مهلت تمام کردن درخواست‌های در حال اجرا هنگام restart یا shutdown
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+
+# restart دوره‌ای workerها برای جلوگیری از رشد حافظه؛ jitter تا همه با هم restart نشوند
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+# مقدار خالی لاگ دسترسی را غیرفعال می‌کند
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+# پشت nginx آدرس واقعی کلاینت از X-Forwarded-For خوانده شود
+forwarded_allow_ips = os.environ.get('GUNICORN_FORWARDED_ALLOW_IPS', '*')
+
+# باید قبل از import شدن prometheus_client در workerها تنظیم شود
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/yekikame-metrics')
+
+
+def on_starting(server):
+    # فایل‌های متریک اجرای قبلی شمارنده‌ها را اشتباه نشان می‌دهند
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class UserappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'userapp'
-    verbose_name = 'جدول کاربران'
\ No newline at end of file
+    verbose_name = 'جدول کاربران'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_user_sessions(apps, schema_editor):
+    from django.contrib.sessions.backends.db import SessionStore
+
+    Session = apps.get_model('sessions', 'Session')
+    User = apps.get_model('userapp', 'User')
+    UserSession = apps.get_model('userapp', 'UserSession')
+
+    user_ids = set(User.objects.values_list('id', flat=True))
+    store = SessionStore()
+    batch = []
+    for session in Session.objects.iterator(chunk_size=2000):
+        session_data = store.decode(session.session_data)
+        user_id = session_data.get('user_id')
+        phone = session_data.get('phone')
+        if user_id in user_ids and phone is not None:
+            batch.append(UserSession(session_id=session.session_key, user_id=user_id, phone=phone))
+        if len(batch) >= 2000:
+            UserSession.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    UserSession.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sessions', '0001_initial'),
+        ('userapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSession',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='user_session', serialize=False, to='sessions.session', verbose_name='نشست')),
+                ('phone', models.CharField(max_length=11, verbose_name='تلفن همراه')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='userapp.user', verbose_name='کاربر')),
+            ],
+            options={
+                'verbose_name': 'نشست کاربر',
+                'verbose_name_plural': 'نشست\u200cهای کاربران',
+                'indexes': [models.Index(fields=['user', 'phone'], name='usersession_user_phone_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_user_sessions, migrations.RunPython.noop),
+    ]
@@ -66,3 +66,24 @@ class User(AbstractBaseUser):
         "Is the user a member of staff?"
         # Simplest possible answer: All admins are staff
         return self.is_admin
+
+
+class UserSession(models.Model):
+    """
+    Index of login sessions by user and phone, so token checks don't have to
+    decode every row of django_session.
+    """
+    session = models.OneToOneField('sessions.Session', on_delete=models.CASCADE, primary_key=True,
+                                   related_name='user_session', verbose_name="نشست")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sessions', verbose_name="کاربر")
+    phone = models.CharField(verbose_name="تلفن همراه", max_length=11)
+
+    class Meta:
+        verbose_name = "نشست کاربر"
+        verbose_name_plural = "نشست‌های کاربران"
+        indexes = [
+            models.Index(fields=['user', 'phone'], name='usersession_user_phone_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.phone} - {self.session_id}'
@@ -1,5 +1,3 @@
-import random
-from django.core.cache import cache
 import graphene
 from django.contrib.sessions.models import Session
 from datetime import datetime, timedelta
@@ -8,7 +6,9 @@ from .models import User
 from django.contrib.auth.hashers import check_password
 from graphene_django.types import DjangoObjectType
 from django.contrib.sessions.backends.db import SessionStore
-import os
+from .otp import OTPRateLimited, check_send_allowed, issue_otp, verify_otp
+
+RATE_LIMITED_MESSAGE = "Too many OTP requests. Please try again later."
 
 
 class RegisterUser(graphene.Mutation):
@@ -17,11 +17,13 @@ class RegisterUser(graphene.Mutation):
         password = graphene.String(required=True)
 
     success = graphene.Boolean()
+    message = graphene.String()
 
     def mutate(self, info, phone, password):
-        # ایجاد کد OTP و ذخیره آن در کش
-        otp = random.randint(10000, 99999)
-        cache.set(f'otp_{phone}', otp, timeout=300)  # کد OTP به مدت 5 دقیقه ذخیره می‌شود
+        try:
+            check_send_allowed(phone)
+        except OTPRateLimited:
+            return RegisterUser(success=False, message=RATE_LIMITED_MESSAGE)
 
         # ایجاد کاربر در حالت غیرفعال
         user = User(phone=phone)
@@ -29,19 +31,10 @@ class RegisterUser(graphene.Mutation):
         user.is_active = False
         user.save()
 
-        # ارسال کد OTP به کاربر (اینجا فرضی است و باید به کمک API پیامک انجام شود)
-        print(f"OTP Code: {otp}")  # فقط برای تست
+        # کد OTP به مدت 5 دقیقه در کش ذخیره و در پس‌زمینه پیامک می‌شود
+        issue_otp('register', phone)
 
-        # ذخیره کد OTP در فایل
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        otp_dir = os.path.join(base_dir, "Register-Otp-Code")
-        os.makedirs(otp_dir, exist_ok=True)
-        otp_file_path = os.path.join(otp_dir, "register-otp.txt")
-
-        with open(otp_file_path, "w") as otp_file:
-            otp_file.write(f"OTP Code for {phone}: {otp}\n")
-
-        return RegisterUser(success=True)
+        return RegisterUser(success=True, message="OTP sent successfully.")
 
 
 class VerifyOTP(graphene.Mutation):
@@ -53,8 +46,7 @@ class VerifyOTP(graphene.Mutation):
     token = graphene.String()
 
     def mutate(self, info, phone, otp):
-        cached_otp = cache.get(f'otp_{phone}')
-        if cached_otp == otp:
+        if verify_otp('register', phone, otp):
             try:
                 user = User.objects.get(phone=phone)
                 user.is_active = True  # فعال کردن کاربر
@@ -106,27 +98,16 @@ class RequestLoginOTP(graphene.Mutation):
     def mutate(self, info, phone):
         try:
             # بررسی اینکه شماره موبایل ثبت شده باشد
-            user = User.objects.get(phone=phone)
-
-            # ایجاد و ذخیره کد OTP جدید
-            otp = random.randint(10000, 99999)
-            cache.set(f'login_otp_{phone}', otp, timeout=300)
-
-            # ارسال کد OTP به کاربر (اینجا فرضی است و باید به کمک API پیامک انجام شود)
-            print(f"Login OTP Code: {otp}")
-
-            # ذخیره کد OTP در فایل
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            otp_dir = os.path.join(base_dir, "Login-Otp-Code")
-            os.makedirs(otp_dir, exist_ok=True)
-            otp_file_path = os.path.join(otp_dir, "login-otp.txt")
-
-            with open(otp_file_path, "w") as otp_file:
-                otp_file.write(f"OTP Code for {phone}: {otp}\n")
-
-            return RequestLoginOTP(success=True, message="OTP sent successfully.")
+            User.objects.get(phone=phone)
+            check_send_allowed(phone)
         except User.DoesNotExist:
             return RequestLoginOTP(success=False, message="User with this phone number does not exist.")
+        except OTPRateLimited:
+            return RequestLoginOTP(success=False, message=RATE_LIMITED_MESSAGE)
+
+        # ایجاد کد OTP جدید و ارسال آن در پس‌زمینه
+        issue_otp('login', phone)
+        return RequestLoginOTP(success=True, message="OTP sent successfully.")
 
 
 class VerifyLoginOTP(graphene.Mutation):
@@ -138,8 +119,7 @@ class VerifyLoginOTP(graphene.Mutation):
     token = graphene.String()
 
     def mutate(self, info, phone, otp):
-        cached_otp = cache.get(f'login_otp_{phone}')
-        if cached_otp == otp:
+        if verify_otp('login', phone, otp):
             try:
                 user = User.objects.get(phone=phone, is_active=True)
 
@@ -0,0 +1,73 @@
+"""
+One-time codes for registration and login.
+
+Codes live in the default cache (shared between workers, see ``CACHES``)
+under ``otp_<phone>`` / ``login_otp_<phone>``. A code is valid for
+``OTP_TIMEOUT`` seconds, is deleted once it has been used and is burnt after
+``MAX_VERIFY_ATTEMPTS`` wrong guesses. Sending is rate limited per phone: one
+code per ``SEND_COOLDOWN`` seconds and ``SEND_LIMIT`` codes per
+``SEND_WINDOW``.
+"""
+import secrets
+
+from django.core.cache import cache
+
+from YekiKamePrj.cache_utils import increment
+from YekiKamePrj.metrics import OTP_RATE_LIMITED, OTP_SENT
+from .sms import send_sms
+
+OTP_TIMEOUT = 300
+MAX_VERIFY_ATTEMPTS = 5
+SEND_COOLDOWN = 60
+SEND_LIMIT = 5
+SEND_WINDOW = 60 * 60
+
+# پیشوند کلید کش برای هر نوع کد
+PURPOSES = {
+    'register': 'otp',
+    'login': 'login_otp',
+}
+MESSAGES = {
+    'register': "کد تایید ثبت‌نام یکی‌کامه: {code}",
+    'login': "کد ورود یکی‌کامه: {code}",
+}
+
+
+class OTPRateLimited(Exception):
+    pass
+
+
+def check_send_allowed(phone):
+    """Reserve a send for ``phone`` or raise ``OTPRateLimited``."""
+    if not cache.add(f'otp_cooldown_{phone}', 1, timeout=SEND_COOLDOWN):
+        OTP_RATE_LIMITED.inc()
+        raise OTPRateLimited
+    if increment(f'otp_sends_{phone}', SEND_WINDOW) > SEND_LIMIT:
+        OTP_RATE_LIMITED.inc()
+        raise OTPRateLimited
+
+
+def issue_otp(purpose, phone):
+    """Create a code for ``phone`` and queue it for delivery by SMS."""
+    prefix = PURPOSES[purpose]
+    code = 10000 + secrets.randbelow(90000)
+    cache.set(f'{prefix}_{phone}', code, timeout=OTP_TIMEOUT)
+    cache.delete(f'{prefix}_attempts_{phone}')
+    send_sms(phone, MESSAGES[purpose].format(code=code))
+    OTP_SENT.labels(purpose).inc()
+    return code
+
+
+def verify_otp(purpose, phone, code):
+    prefix = PURPOSES[purpose]
+    key = f'{prefix}_{phone}'
+    attempts_key = f'{prefix}_attempts_{phone}'
+    if increment(attempts_key, OTP_TIMEOUT) > MAX_VERIFY_ATTEMPTS:
+        # بعد از تعداد مشخصی تلاش اشتباه کد باطل می‌شود
+        cache.delete(key)
+        return False
+    cached_code = cache.get(key)
+    if cached_code is None or cached_code != code:
+        return False
+    cache.delete_many([key, attempts_key])
+    return True
@@ -1,7 +1,7 @@
 import graphene
 from .mutations import RegisterUser, VerifyOTP, LoginUser, RequestLoginOTP, VerifyLoginOTP, UpdateEmailMutation, UpdateFullnameMutation, UpdatePasswordMutation
-from userapp.models import User
-from django.contrib.sessions.models import Session
+from userapp.models import User, UserSession
+from django.utils import timezone
 from datetime import datetime, timedelta
 import uuid
 from graphene_django.types import DjangoObjectType
@@ -24,19 +24,16 @@ class Query(graphene.ObjectType):
             return None
 
     def resolve_check_token(self, info, phone, user_id):
-        try:
-            # بررسی وجود کاربر
-            user = User.objects.get(phone=phone, id=user_id)
-
-            # بررسی session
-            sessions = Session.objects.all()
-            for session in sessions:
-                session_data = session.get_decoded()
-                if session_data.get('user_id') == user_id and session_data.get('phone') == phone:
-                    return "Token is valid."
-            return "You need to login."
-        except User.DoesNotExist:
-            return "You need to login."
+        # جستجوی session از طریق ایندکس UserSession به جای decode کردن همه session ها
+        token_exists = UserSession.objects.filter(
+            user_id=user_id,
+            phone=phone,
+            user__phone=phone,
+            session__expire_date__gt=timezone.now(),
+        ).exists()
+        if token_exists:
+            return "Token is valid."
+        return "You need to login."
 
 
 class Mutation(graphene.ObjectType):
@@ -0,0 +1,21 @@
+from django.contrib.sessions.models import Session
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import User, UserSession
+
+
+@receiver(post_save, sender=Session)
+def register_user_session(sender, instance, **kwargs):
+    # نگهداری ایندکس user_id/phone برای هر session که توسط LoginUser و VerifyOTP ساخته می‌شود
+    session_data = instance.get_decoded()
+    user_id = session_data.get('user_id')
+    phone = session_data.get('phone')
+    if user_id is None or phone is None:
+        return
+    if not User.objects.filter(id=user_id).exists():
+        return
+    UserSession.objects.update_or_create(
+        session=instance,
+        defaults={'user_id': user_id, 'phone': phone},
+    )
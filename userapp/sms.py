@@ -0,0 +1,89 @@
+"""
+Pluggable SMS delivery.
+
+``send_sms`` hands the message to a small thread pool and returns right away,
+so GraphQL mutations never wait on the SMS gateway. The provider class is set
+with ``settings.SMS_PROVIDER``. ``FakeSMSProvider`` is the local stand-in: it
+logs the message and keeps it in memory instead of calling a gateway.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from YekiKamePrj.metrics import SMS_MESSAGES
+
+logger = logging.getLogger(__name__)
+
+
+class SMSProvider:
+    def send(self, phone, message):
+        raise NotImplementedError
+
+
+class FakeSMSProvider(SMSProvider):
+    """Logs messages instead of sending them; the last ones are kept in ``outbox``."""
+    outbox = []
+    max_outbox = 100
+    _lock = threading.Lock()
+
+    def send(self, phone, message):
+        with self._lock:
+            self.outbox.append((phone, message))
+            del self.outbox[:-self.max_outbox]
+        logger.info("SMS to %s: %s", phone, message)
+
+
+class SMSDispatcher:
+    def __init__(self, provider, workers):
+        self.provider = provider
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sms')
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _deliver(self, phone, message):
+        try:
+            self.provider.send(phone, message)
+        except Exception:
+            SMS_MESSAGES.labels('failed').inc()
+            logger.exception("Sending SMS to %s failed", phone)
+        else:
+            SMS_MESSAGES.labels('sent').inc()
+
+    def submit(self, phone, message):
+        future = self.executor.submit(self._deliver, phone, message)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def _discard(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def flush(self, timeout=None):
+        """Wait for the messages submitted so far (used by tests)."""
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.result(timeout)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                provider = import_string(settings.SMS_PROVIDER)()
+                _dispatcher = SMSDispatcher(provider, settings.SMS_DISPATCH_WORKERS)
+    return _dispatcher
+
+
+def send_sms(phone, message):
+    return get_dispatcher().submit(phone, message)
@@ -1,16 +1,29 @@
-from django.test import TestCase
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from unittest import mock, skipUnless
 from graphene.test import Client
 from django.core.cache import cache
 from .schema import schema
-from .models import User
+from .models import User, UserSession
+from .mutations import RATE_LIMITED_MESSAGE
+from .otp import MAX_VERIFY_ATTEMPTS, SEND_COOLDOWN, SEND_LIMIT, OTPRateLimited, check_send_allowed
+from .sms import FakeSMSProvider, get_dispatcher
 from django.contrib.sessions.models import Session
 from datetime import datetime, timedelta
 from django.contrib.sessions.backends.db import SessionStore
+from django.utils import timezone
+from prometheus_client import REGISTRY
 
 
 
 class UserMutationsTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = Client(schema)
         self.phone = "09123456789"
         self.password = "testpassword"
@@ -159,6 +172,56 @@ class UserQueryTestCase(TestCase):
         print(response)
         self.assertEqual(response['data']['checkToken'], "You need to login.")
 
+    def test_check_token_uses_single_indexed_query(self):
+        # ساخت session های اضافی نباید تعداد کوئری‌ها را تغییر دهد
+        for _ in range(20):
+            session = SessionStore()
+            session['user_id'] = self.user.id
+            session['phone'] = self.user.phone
+            session.create()
+
+        query = '''
+            query {
+                checkToken(phone: "%s", userId: %d)
+            }
+        ''' % (self.user.phone, self.user.id)
+
+        with self.assertNumQueries(1):
+            response = self.client.execute(query)
+        self.assertEqual(response['data']['checkToken'], "Token is valid.")
+
+    def test_check_token_after_session_deleted(self):
+        UserSession.objects.filter(user=self.user).delete()
+        Session.objects.all().delete()
+
+        query = '''
+            query {
+                checkToken(phone: "%s", userId: %d)
+            }
+        ''' % (self.user.phone, self.user.id)
+
+        response = self.client.execute(query)
+        self.assertEqual(response['data']['checkToken'], "You need to login.")
+
+    def test_check_token_expired_session(self):
+        Session.objects.filter(user_session__user=self.user).update(
+            expire_date=timezone.now() - timedelta(minutes=1)
+        )
+
+        query = '''
+            query {
+                checkToken(phone: "%s", userId: %d)
+            }
+        ''' % (self.user.phone, self.user.id)
+
+        response = self.client.execute(query)
+        self.assertEqual(response['data']['checkToken'], "You need to login.")
+
+    def test_session_registered_for_user(self):
+        user_session = UserSession.objects.get(user=self.user)
+        self.assertEqual(user_session.user, self.user)
+        self.assertEqual(user_session.phone, self.user.phone)
+
     def test_user_query(self):
         # تعریف Query برای کاربر خاص
         query = '''
@@ -266,6 +329,7 @@ class UpdateUserInfoTests(TestCase):
 
 class RequestLoginOtpTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = Client(schema)
         self.phone = "09123456789"
         self.password = "testpassword"
@@ -308,4 +372,157 @@ class RequestLoginOtpTest(TestCase):
 
         # بررسی شکست درخواست
         self.assertFalse(response['data']['requestLoginOtp']['success'])
-        self.assertEqual(response['data']['requestLoginOtp']['message'], "User with this phone number does not exist.")
\ No newline at end of file
+        self.assertEqual(response['data']['requestLoginOtp']['message'], "User with this phone number does not exist.")
+
+class OTPStoreTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        FakeSMSProvider.outbox.clear()
+        self.client = Client(schema)
+        self.phone = "09123456789"
+        self.user = User.objects.create_user(phone=self.phone, password="testpassword")
+
+    def request_login_otp(self):
+        response = self.client.execute('''
+            mutation {
+                requestLoginOtp(phone: "%s") {
+                    success
+                    message
+                }
+            }
+        ''' % self.phone)
+        return response['data']['requestLoginOtp']
+
+    def verify_login_otp(self, otp):
+        response = self.client.execute('''
+            mutation {
+                verifyLoginOtp(phone: "%s", otp: %d) {
+                    success
+                }
+            }
+        ''' % (self.phone, otp))
+        return response['data']['verifyLoginOtp']['success']
+
+    def test_code_is_sent_by_sms_dispatcher(self):
+        self.assertTrue(self.request_login_otp()['success'])
+        get_dispatcher().flush(timeout=5)
+
+        otp = cache.get(f'login_otp_{self.phone}')
+        self.assertEqual(FakeSMSProvider.outbox[-1][0], self.phone)
+        self.assertIn(str(otp), FakeSMSProvider.outbox[-1][1])
+
+    def test_code_can_be_used_once(self):
+        self.request_login_otp()
+        otp = cache.get(f'login_otp_{self.phone}')
+        self.assertTrue(self.verify_login_otp(otp))
+        self.assertFalse(self.verify_login_otp(otp))
+
+    def test_code_is_burnt_after_max_attempts(self):
+        self.request_login_otp()
+        otp = cache.get(f'login_otp_{self.phone}')
+        wrong_otp = 10000 if otp != 10000 else 10001
+        for _ in range(MAX_VERIFY_ATTEMPTS):
+            self.assertFalse(self.verify_login_otp(wrong_otp))
+        self.assertFalse(self.verify_login_otp(otp))
+        self.assertIsNone(cache.get(f'login_otp_{self.phone}'))
+
+    def test_send_cooldown(self):
+        self.assertTrue(self.request_login_otp()['success'])
+        result = self.request_login_otp()
+        self.assertFalse(result['success'])
+        self.assertEqual(result['message'], RATE_LIMITED_MESSAGE)
+
+    def test_sends_are_counted_in_metrics(self):
+        sent = REGISTRY.get_sample_value('otp_sent_total', {'purpose': 'login'}) or 0
+        limited = REGISTRY.get_sample_value('otp_rate_limited_total') or 0
+        self.request_login_otp()
+        self.request_login_otp()
+        self.assertEqual(REGISTRY.get_sample_value('otp_sent_total', {'purpose': 'login'}), sent + 1)
+        self.assertEqual(REGISTRY.get_sample_value('otp_rate_limited_total'), limited + 1)
+
+    def test_send_limit_per_window(self):
+        for _ in range(SEND_LIMIT):
+            cache.delete(f'otp_cooldown_{self.phone}')
+            self.assertTrue(self.request_login_otp()['success'])
+        cache.delete(f'otp_cooldown_{self.phone}')
+        self.assertFalse(self.request_login_otp()['success'])
+
+    def test_send_limit_outlives_the_default_cache_timeout(self):
+        # روی کش فایلی incr پیش‌فرض زمان انقضا را به TIMEOUT پیش‌فرض (300 ثانیه) برمی‌گرداند
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            now = 1_000_000.0
+            with mock.patch('time.time', side_effect=lambda: now):
+                for _ in range(SEND_LIMIT):
+                    check_send_allowed(self.phone)
+                    now += SEND_COOLDOWN + 1
+                now += 400
+                with self.assertRaises(OTPRateLimited):
+                    check_send_allowed(self.phone)
+
+    def test_register_is_rate_limited(self):
+        cache.add('otp_cooldown_09120000000', 1)
+        response = self.client.execute('''
+            mutation {
+                registerUser(phone: "09120000000", password: "testpassword") {
+                    success
+                    message
+                }
+            }
+        ''')
+        self.assertFalse(response['data']['registerUser']['success'])
+        self.assertFalse(User.objects.filter(phone="09120000000").exists())
+
+
+class OTPSharedCacheTest(TestCase):
+    """Each worker is a separate process; they only share what is in the cache."""
+
+    WORKER_SCRIPT = '''
+import sys
+import django
+django.setup()
+from userapp.otp import issue_otp, verify_otp
+from userapp.sms import get_dispatcher
+
+if sys.argv[1] == 'issue':
+    print(issue_otp('login', sys.argv[2]))
+    get_dispatcher().flush()
+else:
+    print(verify_otp('login', sys.argv[2], int(sys.argv[3])))
+'''
+
+    def run_worker(self, cache_backend, location, *args):
+        env = {
+            **os.environ,
+            'CACHE_BACKEND': cache_backend,
+            'CACHE_LOCATION': location,
+            'CACHE_KEY_PREFIX': 'otp-test',
+        }
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'YekiKamePrj.settings')
+        result = subprocess.run(
+            [sys.executable, '-c', self.WORKER_SCRIPT, *args],
+            env=env, cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return result.stdout.strip().splitlines()[-1]
+
+    def test_otp_from_one_worker_is_visible_to_another(self):
+        with tempfile.TemporaryDirectory() as location:
+            otp = self.run_worker('file', location, 'issue', '09123456789')
+            self.assertEqual(self.run_worker('file', location, 'verify', '09123456789', otp), 'True')
+
+    @skipUnless(os.environ.get('REDIS_URL'), "REDIS_URL is not set")
+    def test_otp_is_shared_through_redis(self):
+        otp = self.run_worker('redis', '', 'issue', '09123456789')
+        self.assertEqual(self.run_worker('redis', '', 'verify', '09123456789', otp), 'True')
+
+    def test_locmem_is_not_shared(self):
+        # دلیل خطاهای تصادفی VerifyOTP با بیش از یک worker
+        otp = self.run_worker('locmem', '', 'issue', '09123456789')
+        self.assertEqual(self.run_worker('locmem', '', 'verify', '09123456789', otp), 'False')
+
+    def test_keys_are_namespaced_and_versioned(self):
+        key = cache.make_key('otp_09123456789')
+        self.assertEqual(key, f"{settings.CACHES['default']['KEY_PREFIX']}:"
+                              f"{settings.CACHES['default']['VERSION']}:otp_09123456789")